@@ -3,125 +3,51 @@ import csv
 import json
 import os
 import pprint
-import re
+import time
 from datetime import datetime
 
 import requests
-from bs4 import BeautifulSoup as bs
 
 from defs import FBS, WEEKS
+from fetch import Fetcher
+from index import GameIndex
+from model import Season
+from names import TeamNames, clean
+from parse import Parser
 from poll import APPoll
-from utils import Utils
+from registry import TeamRegistry
+from scenario import Scenario
+from store import SeasonStore
 
 
 class Schedule(object):
     def __init__(self, file):
         self.file = file
-        with open(file, 'r', encoding='utf8') as infile:
-            self.data = json.load(infile)
+        # a directory is a columnar season store (see store.py), which loads much faster than the JSON file; the logos
+        # stay on disk until a graph asks for them
+        if os.path.isdir(file):
+            self.data = SeasonStore(file).to_schedule(logos=False)
+        else:
+            with open(file, 'r', encoding='utf8') as infile:
+                self.data = json.load(infile)
+        self.index = GameIndex(self.data)
+        self.names = TeamNames(self.data)
+
+    def get_index(self):
+        # the game index and the name table follow self.data; when the data is replaced wholesale (cull, a reload)
+        # they start over
+        if self.index.schedule is not self.data:
+            self.index.rebuild(self.data)
+            self.names = TeamNames(self.data)
+        return self.index
 
     def clean_team_name(self, name):
         # various data sources uses different aliases for the same team (much to my irritation) or special characters
         # this method will try to enforce some kind of sensible naming standard
 
-        result = name.lower()
-
-        # a dictionary of states or other abbreviations
-        abbrv = {
-            '&': '',
-            'ak': 'alaska',
-            'al': 'alabama',
-            'ar': 'arkansas',
-            'as': 'american samoa',
-            'az': 'arizona',
-            'ca': 'california',
-            'caro': 'carolina',
-            'co': 'colorado',
-            'ct': 'connecticut',
-            'conn': 'connecticut',
-            'dc': 'district of columbia',
-            'de': 'delaware',
-            'fl': 'florida',
-            '(fla.)': '',
-            'ga': 'georgia',
-            'gu': 'guam',
-            'hi': 'hawaii',
-            'ia': 'iowa',
-            'id': 'idaho',
-            'il': 'illinois',
-            'ill': 'illinois',
-            'in': 'indiana',
-            'ks': 'kansas',
-            'ky': 'kentucky',
-            'la': 'louisiana',
-            'ma': 'massachusetts',
-            'md': 'maryland',
-            'me': 'maine',
-            'mi': 'michigan',
-            'miss': 'mississippi',
-            'mn': 'minnesota',
-            'mo': 'missouri',
-            'mp': 'northern mariana islands',
-            'ms': 'mississippi',
-            'mt': 'montana',
-            'na': 'national',
-            'nc': 'north caroli;na',
-            'nd': 'north dakota',
-            'ne': 'nebraska',
-            'nh': 'new hampshire',
-            'nj': 'new jersey',
-            'nm': 'new mexico',
-            'n.m.': 'new mexico',
-            'nv': 'nevada',
-            'ny': 'new york',
-            'oh': 'ohio',
-            'ok': 'oklahoma',
-            'or': 'oregon',
-            'pa': 'pennsylvania',
-            'pr': 'puerto rico',
-            'ri': 'rhode island',
-            'sc': 'south carolina',
-            'sd': 'south dakota',
-            'st': 'state',
-            'tn': 'tennessee',
-            'tenn': 'tennessee',
-            'tx': 'texas',
-            'univ': '',
-            'ut': 'utah',
-            'va': 'virginia',
-            'vi': 'virgin islands',
-            'vt': 'vermont',
-            'wa': 'washington',
-            'wi': 'wisconsin',
-            'wv': 'west virginia',
-            'wy': 'wyoming',
-            's': 'south',
-            'se': 'southeastern'
-        }
-
-        for x in abbrv:
-            result = re.sub(r'\b%s\b' % x, abbrv[x], result)
-
-        # trim out any weird special characters (most likely periods) and convert to lower case
-        result = re.sub(r'[^\w\s]', ' ', result).lower().strip()
-
-        # remove any leading, trailing, or consecutive whitespaces
-        result = re.sub(' +', ' ', result).strip()
-
-        # TODO: build a structure of aliases so we can reference them
-        '''
-        # take the dictionary of aliases and attempt to find the best match
-        for team, alts in enumerate(aliases):
-            try:
-                if len(get_close_matches(name, alts, n=1, cutoff=1)) > 0:
-                    return team
-                else:
-                    raise Exception("No matches found for {}.".format(name))
-            except Exception as error:
-                print("An error occured: ".format(error))
-                return None
-        '''
-        return result
+        # all the abbreviations are expanded in a single compiled pass and the result is cached; to map a name onto
+        # its key in the schedule, use self.names.resolve(name) which also consults the alias table in names.py
+        return clean(name)
 
     def cull(self):
         new = {}
@@ -139,45 +65,75 @@ class Schedule(object):
         self.data = new
 
     @staticmethod
-    def download_schedules(year=datetime.now().year) -> None:
+    def download_schedules(year=datetime.now().year, root='http://data.ncaa.com', file='new schedule.json',
+                           workers=16, status=False) -> None:
+        start_time = time.monotonic()
         result = []
-        # Quick and dirty method to scrape schedule data
-        for week in range(1, 20):
-            # Pull the scoreboard, which contains links to the details for each game
-            url = "http://data.ncaa.com/jsonp/scoreboard/football/fbs/{}/{}/scoreboard.json".format(year,
-                                                                                                    "%02d" % week)
-            response = requests.get(url)
-            if response.status_code == 404:
-                continue
-            else:
-                # look in the scoreboard dictionary, iterate over the days with games that week
-                for day in json.loads(response.text[response.text.index("(") + 1: response.text.rindex(")")])[
-                    'scoreboard']:
+        with Fetcher(workers=workers, cache=Fetcher.shared().cache) as fetcher:
+            # Pull the scoreboards, which contain links to the details for each game
+            urls = ["{}/jsonp/scoreboard/football/fbs/{}/{}/scoreboard.json".format(root, year, "%02d" % week)
+                    for week in range(1, 20)]
+            games = []
+            for url, response, error in fetcher.fetch_all(urls):
+                # weeks past the end of the season are 404s
+                if not error and response.status_code == 404:
+                    continue
+                try:
+                    if error:
+                        raise error
+                    response.raise_for_status()
+                    # look in the scoreboard dictionary, iterate over the days with games that week
+                    days = json.loads(response.text[response.text.index("(") + 1: response.text.rindex(")")])[
+                        'scoreboard']
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    print("problem with {}: {}".format(url, e))
+                    continue
+                for day in days:
                     # iterate over the games for that day
-                    for game in day['games']:
-                        url = "http://data.ncaa.com/jsonp/{}".format(game)
-                        response = requests.get(url)
-                        if response.status_code == 404:
-                            continue
-                        else:
-                            result += [json.loads(response.text)]
-        with open('new schedule.json', 'w+') as file:
-            json.dump(result, file, indent=4, sort_keys=True)
+                    games.extend("{}/jsonp/{}".format(root, game) for game in day['games'])
+
+            # fetch the games concurrently, parsing each one as it lands; a page that isn't a game is reported and left
+            # out rather than ending the download
+            for url, response, error in fetcher.fetch_all(games):
+                if not error and response.status_code == 404:
+                    continue
+                try:
+                    if error:
+                        raise error
+                    response.raise_for_status()
+                    game = json.loads(response.text)
+                    if not isinstance(game, dict):
+                        raise ValueError('not a game: {!r}'.format(response.text[:40]))
+                    result.append(game)
+                except (requests.RequestException, ValueError) as e:
+                    print("problem with {}: {}".format(url, e))
+
+        # the games arrive in whatever order the server answers; put them in date and id order so a pull is repeatable,
+        # then write them to a temporary file next to the output and swap it in, so an interrupted download never
+        # leaves a truncated file behind
+        result.sort(key=lambda x: (x.get('startDate') or '', str(x.get('id', '')).rjust(16)))
+        temp = '{}.tmp'.format(file)
+        try:
+            with open(temp, 'w') as outfile:
+                outfile.write('[')
+                for i, game in enumerate(result):
+                    outfile.write(',\n' if i else '\n')
+                    json.dump(game, outfile, indent=4, sort_keys=True)
+                outfile.write('\n]')
+            os.replace(temp, file)
+        except BaseException:
+            os.remove(temp)
+            raise
+
+        if status:
+            print("Downloaded {} games".format(len(result)), end='\n')
+            print("Elapsed time: {} seconds".format(round(time.monotonic() - start_time, 3)), end='\n')
         return result
 
     def normalize_schedule(self, method='spplus', week=-1):
         # A method to ensure that all games have a total win probability equal to one
 
-        # local helper function to locate the opponent within the schedule
-        def find(lst, team, opp):
-            try:
-                for i, dict in enumerate(lst[team]['schedule']):
-                    if dict['opponent'] == opp:
-                        return i
-            except KeyError:
-                return -2
-            return -1
-
+        index = self.get_index()
         for team in self.data:
             for i in range(len(self.data[team]['schedule'])):
                 try:
@@ -192,7 +148,9 @@ class Schedule(object):
                     opp_win_prob = round(1 - win_prob[week], 3)
                     # We have to find the correct index for the opponent
                     # because they may not play in the same order due to byes
-                    j = find(self.data, opponent, team)
+                    j = index.opponent_slot(team, i)
+                    if j is None:
+                        continue
 
                     try:
                         if self.data[opponent]['schedule'][j][method][week] != opp_win_prob:
@@ -204,6 +162,10 @@ class Schedule(object):
                     except TypeError:
                         print('problem with {}, {}'.format(team, opponent))
 
+    def to_season(self):
+        # an integer-id model of the current data for the Team, Conference and Cluster projections
+        return Season.from_schedule(self.data)
+
     def populate_URIs(self):
         for file in os.listdir("./Resources"):
             if file.endswith(".jpg"):
@@ -226,6 +188,10 @@ class Schedule(object):
                     file += '.json'
                 raise TypeError
 
+        if os.path.isdir(file):
+            SeasonStore.from_schedule(self.data, file)
+            return
+
         with open(file, 'w+', encoding='utf8') as outfile:
             json.dump(self.data, outfile, indent=4, sort_keys=True, ensure_ascii=False)
 
@@ -234,9 +200,9 @@ class Schedule(object):
             url='https://www.footballoutsiders.com/stats/ncaa2018'):
         result = []
 
-        r = requests.get(url, headers=Utils.headers)
+        r = Fetcher.shared().get(url)
 
-        for row in bs(r.text).findAll('tr')[1:]:
+        for row in Parser.parse(r.text, 'sp+').findAll('tr')[1:]:
             cells = row.findAll('td')
             if cells[0].text != 'Team':
                 result.append({'name': cells[0].text, 'sp+': float(cells[4].text)})
@@ -244,155 +210,88 @@ class Schedule(object):
         return result
 
     def swap_teams(self, team_a, team_b):
-        # TODO: Tidy up this code
-        data = dict(self.data)
-
-        for team in self.data:
-            if team == team_a:
-                data[team_b]['schedule'] = self.data[team]['schedule']
-            elif team == team_b:
-                data[team_a]['schedule'] = self.data[team]['schedule']
-
-        tmp = sp[team_a]['sp+']
-        data[team_b]['sp+'] = sp[team_b]['sp+']
-        data[team_a]['sp+'] = tmp
-
-        tmp = self.data[team_a]['logoURI']
-        data[team_b]['logoURI'] = self.data[team_b]['logoURI']
-        data[team_a]['logoURI'] = tmp
-
-        for team in data:
-            for game in range(len(data[team]['schedule'])):
-                if data[team]['schedule'][game]['opponent'] == team_a:
-                    data[team]['schedule'][game]['opponent'] = team_b
-                elif data[team]['schedule'][game]['opponent'] == team_b:
-                    data[team]['schedule'][game]['opponent'] = team_a
-                try:
-                    team_a_spplus = sp[team]['sp+']
-                except KeyError:
-                    team_a_spplus = -10
-                try:
-                    team_b_spplus = sp[data[team]['schedule'][game]['opponent']]['sp+']
-                except KeyError:
-                    team_b_spplus = -10
-                loc = data[team]['schedule'][game]['home-away']
-                if loc == 'home':
-                    data[team]['schedule'][game]['sp+'] = [
-                        Utils.calculate_win_prob_from_spplus(team_a_spplus, team_b_spplus, 'home')]
-                else:
-                    data[team]['schedule'][game]['sp+'] = [
-                        Utils.calculate_win_prob_from_spplus(team_a_spplus, team_b_spplus, 'away')]
+        """Return a scenario in which the two teams trade schedules; self.data itself is left untouched."""
+        return Scenario(self.data).swap(team_a, team_b)
 
-    def update_from_NCAA(self, new=None):
-        def find(t):
-            for x in self.data:
-                if t == self.data[x]['nameRaw']:
-                    return x
-            return None
+    def update_from_NCAA(self, new=None, status=True):
+        """Merge an NCAA pull into the schedule and return a report of what changed.
 
+        Each game is upserted by id into both participants' schedules: known games have their date, time, score,
+        rank and result refreshed, unknown ones are added. The report holds 'updated' as [(id, team, field, old,
+        new)], 'added' as [(id, team)] and 'unmatched' as the NCAA names that aren't in the schedule."""
         if not new:
             new = Schedule.download_schedules()
         else:
             with open(new, 'r') as infile:
                 new = json.load(infile)
 
+        index = self.get_index()
+        report = {'updated': [], 'added': [], 'unmatched': set()}
         keys = {'canceled', 'home-away', 'location', 'opponent', 'scoreBreakdown', 'startDate', 'startTime', 'winner'}
         for game in new:
-            away = find(game['away']['nameRaw'])
-            if away and self.data[away]['conference'] in FBS:
-                found = False
-                try:
-                    for i in range(len(self.data[away]['schedule'])):
-                        if self.data[away]['schedule'][i]['id'] == game['id']:
-                            found = True
-                            for key in ['startDate', 'startTime']:
-                                self.data[away]['schedule'][i][key] = game[key]
-                            for key in ['scoreBreakdown', 'teamRank', 'winner']:
-                                self.data[away]['schedule'][i][key] = game['away'][key]
-                            try:
-                                self.data[away]['schedule'][i]['scoreBreakdown'] = [int(x) if len(x) > 0 else 0
-                                                                                    for x in
-                                                                                    self.data[away]['schedule'][i][
-                                                                                        'scoreBreakdown']]
-                            except ValueError as e:
-                                print("problem with scores for {}".format(away))
-                                pass
-                            break
-                except KeyError as e:
-                    print("couldn't find {}".format(e))
-                    pass
-                if not found:
-                    foo = {x: None for x in keys}
-                    foo['canceled'] = 'false'
-                    foo['home-away'] = 'away'
-                    foo['location'] = game['location']
-                    foo['opponent'] = game['home']['nameSeo']
-                    foo['scoreBreakdown'] = [int(x) if len(x) > 0 else 0 for x in game[away]['scoreBreakdown']]
-                    foo['startDate'] = game['startDate']
-                    foo['startTime'] = game['startTime']
-                    foo['winner'] = game['away']['winner']
-                    self.data[away]['schedule'].append(foo)
+            for side, other in (('away', 'home'), ('home', 'away')):
+                team = self.names.resolve(game[side]['nameRaw'])
+                if not team:
+                    report['unmatched'].add(game[side]['nameRaw'])
+                    continue
+                if self.data[team]['conference'] not in FBS:
+                    continue
 
-            home = find(game['home']['nameRaw'])
-            if home and self.data[home]['conference'] in FBS:
-                found = False
                 try:
-                    for i in range(len(self.data[home]['schedule'])):
-                        if self.data[home]['schedule'][i]['id'] == game['id']:
-                            found = True
-                            for key in ['startDate', 'startTime']:
-                                self.data[home]['schedule'][i][key] = game[key]
-                            for key in ['scoreBreakdown', 'teamRank', 'winner']:
-                                self.data[home]['schedule'][i][key] = game['home'][key]
-                            try:
-                                self.data[home]['schedule'][i]['scoreBreakdown'] = [int(x) if len(x) > 0 else 0
-                                                                                    for x in
-                                                                                    self.data[home]['schedule'][i][
-                                                                                        'scoreBreakdown']]
-                            except ValueError as e:
-                                print("problem with scores for {}".format(away))
-                                pass
-
-                            break
-                except KeyError as e:
-                    print("couldn't find {}".format(e))
-                    pass
-                if not found:
+                    scores = [int(x) if len(x) > 0 else 0 for x in game[side]['scoreBreakdown']]
+                except ValueError:
+                    print("problem with scores for {}".format(team))
+                    scores = game[side]['scoreBreakdown']
+
+                i = index.find(game['id'], team)
+                if i is None:
                     foo = {x: None for x in keys}
+                    foo['id'] = game['id']
                     foo['canceled'] = 'false'
-                    foo['home-away'] = 'home'
+                    foo['home-away'] = side
                     foo['location'] = game['location']
-                    foo['opponent'] = game['away']['nameSeo']
-                    foo['scoreBreakdown'] = [int(x) if len(x) > 0 else 0 for x in game[home]['scoreBreakdown']]
+                    foo['opponent'] = self.names.resolve(game[other]['nameRaw']) or game[other]['nameSeo']
+                    foo['scoreBreakdown'] = scores
                     foo['startDate'] = game['startDate']
                     foo['startTime'] = game['startTime']
-                    foo['winner'] = game['home']['winner']
-                    self.data[away]['schedule'].append(foo)
+                    foo['teamRank'] = game[side]['teamRank']
+                    foo['winner'] = game[side]['winner']
+                    index.add(team, foo)
+                    report['added'].append((game['id'], team))
+                    continue
 
-    def update_game(self, game_id, field, new_val):
-        c = 0
+                entry = self.data[team]['schedule'][i]
+                for key, value in (('startDate', game['startDate']), ('startTime', game['startTime']),
+                                   ('scoreBreakdown', scores), ('teamRank', game[side]['teamRank']),
+                                   ('winner', game[side]['winner'])):
+                    if entry.get(key) != value:
+                        report['updated'].append((game['id'], team, key, entry.get(key), value))
+                        entry[key] = value
 
-        def find_game(t, g):
-            for j in range(len(self.data[t]['schedule'])):
-                if self.data[t]['schedule'][j]['id'] == str(g):
-                    if field in self.data[t]['schedule'][j]:
-                        self.data[t]['schedule'][j][field] = new_val
-                        return 1
-                    else:
-                        return -1
-            return 0
+        report['unmatched'] = sorted(report['unmatched'])
+        if status:
+            print('{} games merged: {} fields updated, {} games added, {} NCAA teams not in the schedule'.format(
+                len(new), len(report['updated']), len(report['added']), len(report['unmatched'])))
+        return report
 
-        for team in self.data:
-            res = find_game(team, game_id)
-            c += res
-            if res >= 0:
-                continue
-            else:
+    def update_game(self, game_id, field, new_val):
+        index = self.get_index()
+        slots = dict(index.games.get(str(game_id), {}))
+
+        c = 0
+        for team, i in slots.items():
+            if field not in self.data[team]['schedule'][i]:
                 print('Not a valid field choice: {}'.format(field))
                 return
+            self.data[team]['schedule'][i][field] = new_val
+            c += 1
 
-        print('Found {} occurrences of game id {} '.format(c, game_id))
+        # a game that changed its id has to move in the index
+        if field == 'id':
+            for team in slots:
+                index.reindex(team)
 
+        print('Found {} occurrences of game id {} '.format(c, game_id))
 
     def update_rankings(self, year=datetime.now().year, week=None) -> None:
         if not week:
@@ -411,22 +310,17 @@ class Schedule(object):
         print('poll published on {}'.format(date))
         not_in_poll = []
         copy = dict(ap.ballots['results'])
+        # cross reference the AP's spellings to the schedule keys
+        keys = {}
+        for name in ap.ballots['results']:
+            team = self.names.resolve(name)
+            if team:
+                keys[team] = name
         for team in self.data:
             if date not in self.data[team]['rankings']['AP'].keys():
                 self.data[team]['rankings']['AP'][date] = {'overall': -1, 'voters': {}}
 
-            # cross reference the teams to the keys used by the AP
-            if team == 'texas am':
-                key = 'Texas A&M'
-            elif team == 'byu':
-                key = 'Brigham Young'
-            elif team == 'ole miss':
-                key = 'Mississippi'
-            elif team.split()[0] != 'utah' and (team[0] == 'u' or team[-1] == 'u'):
-                key = team.upper()
-            else:
-                key = team.title()
-
+            key = keys.get(team)
             try:
                 self.data[team]['rankings']['AP'][date]['overall'] = ap.ballots['results'][key]['rank']
                 for v in ap.ballots['voters']:
@@ -453,10 +347,13 @@ class Schedule(object):
         new = Schedule.scrape_spplus()
 
         for team in new:
-            try:
-                self.data[team['name'].lower()]['sp+'][datetime.now().strftime("%Y-%m-%d")] = team['sp+']
-            except KeyError:
+            key = self.names.resolve(team['name'])
+            if key is None:
                 print(team)
+                continue
+            self.data[key]['sp+'][datetime.now().strftime("%Y-%m-%d")] = team['sp+']
+            # a second update on the same day changes the rating in place
+            TeamRegistry.shared(self.data).invalidate(key)
 
 
     def to_csv(self, csv_file):
@@ -482,6 +379,7 @@ class Schedule(object):
                     csvwriter.writerow(row)
 
 
-s = Schedule('schedule.json')
-s.update_from_NCAA()
-s.save_to_file()
+if __name__ == '__main__':
+    s = Schedule('schedule.json')
+    s.update_from_NCAA()
+    s.save_to_file()
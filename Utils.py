@@ -6,28 +6,24 @@ import urllib.parse
 from colorsys import hls_to_rgb
 from datetime import datetime
 
-from subprocess import Popen
-
-import requests
-from bs4 import BeautifulSoup as bs
-from scipy.stats import norm
+from fetch import Fetcher
+from parse import Parser
+from winprob import WinProbability
 
 
 class Utils:
     headers = {'User-Agent': 'Mozilla/5.0'}
 
     @staticmethod
-    def calculate_win_prob_from_spplus(a, b, loc):
-        if loc == 'home':
-            return norm.cdf((a - b + 2.5) / 17)
-        else:
-            return norm.cdf((a - b - 2.5) / 17)
+    def calculate_win_prob_from_spplus(a, b, loc, home_advantage=None, stdev=None):
+        # for whole schedules at once, use WinProbability.batch
+        return WinProbability.single(a, b, loc, home_advantage=home_advantage, stdev=stdev)
 
     @staticmethod
     def download_logos(width=40, height=40):
         # Quick and dirty method to scrape logos from ESPN; they need minor editorial cleanup afterward
-        r = requests.get('http://www.espn.com/college-football/teams')
-        results = bs(r.text).findAll('a', href=re.compile('^/college-football/team/_/id/'))
+        r = Fetcher.shared().get('http://www.espn.com/college-football/teams')
+        results = Parser.parse(r.text, 'links').findAll('a', href=re.compile('^/college-football/team/_/id/'))
         if not os.path.exists('./Resources/'):
             os.makedirs('./Resources/')
 
@@ -39,7 +35,7 @@ class Utils:
                                                                                                           height,
                                                                                                           width)
             with open(os.path.join('./Resources/', '{}.png'.format(name.lower())), 'wb') as handle:
-                response = requests.get(pic_url, stream=True)
+                response = Fetcher.shared().get(pic_url, stream=True)
 
                 if not response.ok:
                     print(response)
@@ -131,11 +127,11 @@ class Utils:
         out = ''
         for j in scale:
             url = 'https://github.com/EvRoHa/SP-plus-Visualizations/tree/master/png output/sp+ - {}/'.format(j)
-            r = requests.get(url, headers=Utils.headers)
+            r = Fetcher.shared().get(url, headers=Utils.headers)
 
             search_url = urllib.parse.quote(
                 '/EvRoHa/SP-plus-Visualizations/blob/master/png output/sp+ - {}/'.format(j))
-            links = bs(r.text).findAll('a', href=re.compile(search_url + '*'))
+            links = Parser.parse(r.text, 'links').findAll('a', href=re.compile(search_url + '*'))
 
             for x in links:
                 name = x.text.split('-')[0].strip().title()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class HTTPCache:
+    # An on-disk HTTP cache for the scrapers. Each URL is stored as '<sha1>.body' with a '<sha1>.json' sidecar
+    # holding the validators (ETag / Last-Modified) and when it was fetched.
+    #
+    #   fresh (younger than ttl)   served from disk, no request at all
+    #   stale                      revalidated with a conditional GET; a 304 refreshes the entry and serves it
+    #   offline                    served from disk whatever its age; a URL that was never cached is an error
+    #
+    # When the bodies grow past max_size bytes the least recently used entries are evicted, down to 90% of max_size.
+    # The total is counted once and then kept up to date by each store, so the directory is only listed again when
+    # eviction is due, which is at most once per tenth of max_size stored.
+
+    def __init__(self, path='http cache', ttl=6 * 60 * 60, max_size=512 * 1024 * 1024, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.size = None
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+
+    def get_paths(self, url):
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.path, key + '.json'), os.path.join(self.path, key + '.body')
+
+    def load(self, url):
+        meta_file, body_file = self.get_paths(url)
+        try:
+            with open(meta_file, 'r', encoding='utf8') as infile:
+                meta = json.load(infile)
+            with open(body_file, 'rb') as infile:
+                body = infile.read()
+        except (OSError, ValueError):
+            return None, None
+        # bump the body's mtime, which is what eviction orders by
+        os.utime(body_file)
+        return meta, body
+
+    def store(self, url, response):
+        meta_file, body_file = self.get_paths(url)
+        try:
+            replaced = os.stat(body_file).st_size
+        except OSError:
+            replaced = 0
+        meta = {'url': url, 'status': response.status_code, 'fetched': time.time(),
+                'headers': {x: response.headers[x] for x in ('Content-Type', 'ETag', 'Last-Modified') if
+                            x in response.headers}}
+        for file, mode, data in ((body_file, 'wb', response.content), (meta_file, 'w', json.dumps(meta))):
+            tmp = '{}.{}.tmp'.format(file, threading.get_ident())
+            with open(tmp, mode) as outfile:
+                outfile.write(data)
+            os.replace(tmp, file)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(x[1] for x in self.bodies())
+            else:
+                self.size += len(response.content) - replaced
+            full = self.size > self.max_size
+        if full:
+            self.evict()
+        return meta
+
+    def touch(self, url, meta):
+        meta['fetched'] = time.time()
+        with open(self.get_paths(url)[0], 'w', encoding='utf8') as outfile:
+            json.dump(meta, outfile)
+
+    def bodies(self):
+        """Return (mtime, size, file) for every cached body."""
+        bodies = []
+        for file in os.listdir(self.path):
+            if file.endswith('.body'):
+                try:
+                    stat = os.stat(os.path.join(self.path, file))
+                except OSError:
+                    continue
+                bodies.append((stat.st_mtime, stat.st_size, file))
+        return bodies
+
+    def evict(self):
+        with self.lock:
+            bodies = self.bodies()
+            total = sum(x[1] for x in bodies)
+            for mtime, size, file in sorted(bodies):
+                if total <= 0.9 * self.max_size:
+                    break
+                for ext in ('.body', '.json'):
+                    try:
+                        os.remove(os.path.join(self.path, file[:-5] + ext))
+                    except OSError:
+                        pass
+                total -= size
+            self.size = total
+
+    @staticmethod
+    def to_response(url, meta, body):
+        response = requests.models.Response()
+        response.url = url
+        response.status_code = meta['status']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def get(self, fetch, url, **kwargs):
+        """Return the response for url, from disk when possible, otherwise by calling fetch(url, **kwargs)."""
+        meta, body = self.load(url)
+
+        if meta and (self.offline or time.time() - meta['fetched'] < self.ttl):
+            return HTTPCache.to_response(url, meta, body)
+        if self.offline:
+            raise requests.ConnectionError('offline and {} is not cached'.format(url))
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta:
+            if 'ETag' in meta['headers']:
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if 'Last-Modified' in meta['headers']:
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        kwargs.pop('stream', None)
+        response = fetch(url, headers=headers, **kwargs)
+        if response.status_code == 304 and meta:
+            self.touch(url, meta)
+            return HTTPCache.to_response(url, meta, body)
+        if response.ok:
+            self.store(url, response)
+        response.from_cache = False
+        return response
@@ -1,37 +1,81 @@
 import csv
 import os
-from datetime import datetime
 
+from colors import ColorScale
 from graph import Graph
+from projection import Projection
+from registry import TeamRegistry
+from sos import ScheduleStrength
 from team import Team
-from utils import Utils
 
 
 class Cluster:
     # A cluster is just a group of teams, not necessarily any particular conference or division
     def __init__(self, schedule, teams):
-        self.teams = [Team(name=x, schedule=schedule) for x in schedule if x in teams]
+        registry = TeamRegistry.shared(schedule)
+        self.ratings = registry.ratings
+        self.history = registry.history
+        self.teams = [registry.get(x) for x in schedule if x in teams]
         self.schedule = self.teams[0].schedule
 
     def get_avg_spplus(self, lower, upper):
         sp = []
 
         for team in self.schedule:
-            date = max(datetime.strptime(dt, '%Y-%m-%d') for dt in self.schedule[team]['sp+'].keys()).strftime(
-                '%Y-%m-%d')
-            sp.append(self.schedule[team]['sp+'][date])
+            sp.append(self.ratings.latest(team))
         sp.sort(reverse=True)
         if upper == -1:
             return sum(sp[lower - 1:upper]) / (len(sp) - lower + 1)
         else:
             return sum(sp[lower:upper]) / (upper - lower)
 
+    def get_reference(self, spplus):
+        """Return (rating, description, short description) for 'top25', 'bottom25', 'top5'... or a plain number."""
+        if isinstance(spplus, (int, float)):
+            return spplus, 'SP+ {}'.format(round(spplus, 1)), None
+        if spplus.lower()[0:3] == 'top':
+            try:
+                upper = int(spplus[3:])
+            except ValueError:
+                upper = 25
+            x = self.get_avg_spplus(0, upper)
+            return x, 'average SP+ of top {}'.format(upper), 'sp+ {}'.format(round(x, 1))
+        elif spplus.lower()[0:6] == 'bottom':
+            try:
+                lower = int(spplus[6:])
+            except ValueError:
+                lower = 25
+            x = self.get_avg_spplus(len(self.schedule) - lower, len(self.schedule))
+            return x, 'average SP+ of bottom {}'.format(lower), 'sp+ {}'.format(round(x, 1))
+        return 0.0, 'spplus 0', None
+
+    def get_schedule_strength(self, date=None):
+        """Return the SOS engine over every team's schedule, with opponents rated as of each team's latest rating."""
+        dates = date if date else [x.get_best_sp_match(-1) for x in self.teams]
+        return ScheduleStrength(self.teams, self.ratings, dates=dates)
+
+    def get_schedule_strengths(self, references=('top5', 'top25', 'bottom25'), sos=None):
+        """Return (teams, reference ratings, 'teams' x 'references' expected wins) for several SOS variants at once."""
+        sos = sos if sos else self.get_schedule_strength()
+        values = [self.get_reference(x)[0] for x in references]
+        return [x.name for x in sos.teams], values, sos.expected_wins(values)
+
     def get_record_array(self, week=None):
         # get the records for the final week for each team
         record = []
 
-        for t in self.teams:
-            record.append([t, t.project_win_totals(week=week)[-1], t.project_win_totals(week=week - 1)[-1]])
+        # read both weeks from the projection history, projecting whatever isn't in it in a single batched pass
+        lookups = [(t, w, self.history.get(t, w, 'wins')) for w in (week, week - 1) for t in self.teams]
+        missing = [(t, w) for t, w, found in lookups if not found]
+        totals = Projection.final_win_totals([t.get_win_probabilities(w) for t, w in missing])
+        projected = {}
+        for (t, w), wins in zip(missing, totals):
+            wins = [float(x) for x in wins]
+            self.history.append(t, w, wins=wins, expected=Team.expected_wins(wins))
+            projected[(t.name, w)] = wins
+        totals = [found['wins'] if found else projected[(t.name, w)] for t, w, found in lookups]
+        for i in range(len(self.teams)):
+            record.append([self.teams[i], totals[i], totals[len(self.teams) + i]])
 
         # sort teams by their weighted average number of wins
         record.sort(key=lambda x: sum([x[1][z] * z for z in range(len(x[1]))]), reverse=True)
@@ -40,34 +84,13 @@ class Cluster:
 
     def make_schedule_ranking_graph(self, file=None, week=None, hstep=50, vstep=50, margin=5, logowidth=40,
                                     absolute=False, old=None, method='sp+', logoheight=40, scale='red-green',
-                                    record=None, spplus='top25'):
-        date = datetime.now()
-        if not isinstance(spplus, int):
-            if spplus.lower()[0:3] == 'top':
-                try:
-                    upper = int(spplus[3:])
-                except ValueError:
-                    upper = 25
-                x = self.get_avg_spplus(0, upper)
-                txt = 'average SP+ of top {}'.format(upper)
-                stxt = 'sp+ {}'.format(round(x, 1))
-            elif spplus.lower()[0:3] == 'bottom':
-                try:
-                    lower = int(spplus[3:])
-                except ValueError:
-                    lower = 25
-                x = self.get_avg_spplus(lower, -1)
-                txt = 'average SP+ of bottom {}'.format(lower)
-                stxt = 'sp+ {}'.format(round(x, 1))
-            else:
-                x = 0.0
-                txt = 'spplus 0'
-        else:
-            x = spplus
-            txt = 'SP+ {}'.format(round(spplus, 1))
-            stxt = None
+                                    record=None, spplus='top25', logo_dir=None):
+        x, txt, stxt = self.get_reference(spplus)
 
-        record = self.rank_schedules(spplus=x)
+        # one SOS engine serves both the ranking and the per-game cells of the table
+        sos = self.get_schedule_strength()
+        record = self.rank_schedules(spplus=x, sos=sos)
+        schedules = dict(zip([t.name for t in sos.teams], sos.schedules(x)))
 
         if not file:
             file = 'Strength of Schedule using {}'.format(txt)
@@ -81,155 +104,146 @@ class Cluster:
         else:
             rows, cols = len(record) + 2, max([len(x[1]) for x in record]) + 2
 
-        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin)
+        # cluster tables can run to all of FBS, so stream them to disk instead of holding them in memory
+        with Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin,
+                   logo_dir=logo_dir, stream=True) as graph:
+
+            # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
+            if stxt:
+                offset = 8
+                graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 + offset, size=13,
+                               alignment='middle', text='({})'.format(stxt))
+            else:
+                offset = 0
+            graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 - offset, size=13, alignment='middle',
+                           text='Strength of Schedule as projected by {} using {}'.format(method.upper(), txt))
+
+            foo = []
+            for i in range(len(record)):
+                foo.append(sum([x * record[i][1][x] for x in range(len(record[i][1]))]))
+
+            lower = min(foo)
+            upper = max(foo)
+            expected_fills, expected_text = ColorScale.get(scale).row(foo, lower, upper)
+            # Add column labels for the Team Name
+            graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5 - 8, alignment='middle', size=10, text='Team')
+            graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5 + 8, alignment='middle', size=10, text='Schedule')
+
+            # This set of loops fills in the body of the table
+            for i in range(0, rows - 2):
+                # Add the team logo
+                graph.add_image(margin + (hstep - logowidth) / 2,
+                                vstep * (2 + i) + margin + (vstep - logoheight) / 2,
+                                logowidth,
+                                logoheight,
+                                record[i][0].logo_URI, name=record[i][0].name)
+
+                # Add the rank in the upper left of the logo box
+                graph.add_text(2.5 * margin, vstep * (2 + i) + 2.5 * margin, alignment='middle', size=8, text=i + 1)
+
+                team = record[i][0].name
+
+                win_probabilities = schedules[team]
+                fills, text_colors = ColorScale.get(scale).row(win_probabilities)
+                for j in range(0, cols - 1):
+                    if i == 0:
+                        if j == cols - 2:
+                            # Add the column label
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * 1.5 - 10,
+                                           size=10,
+                                           alignment='middle',
+                                           text='Schedule')
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * 1.5,
+                                           size=10,
+                                           alignment='middle',
+                                           text='Expected')
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * 1.5 + 10,
+                                           size=10,
+                                           alignment='middle',
+                                           text='Wins')
+                        elif j <= len(record[i][1]):
+                            # Add the column label
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * 1.5 - 7,
+                                           size=13,
+                                           alignment='middle',
+                                           text='Opp.')
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * 1.5 + 7,
+                                           size=13,
+                                           alignment='middle',
+                                           text=j + 1)
+
+                    if j < len(win_probabilities):
+                        r, g, b = fills[j]
+
+                        # Draw the color-coded box
+                        graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep, color='none',
+                                       fill=(r, g, b))
+                        # Add the opponent logo
+                        opponent = self.schedule[team]['schedule'][j]['opponent']
+                        graph.add_image(margin + hstep * (2 + j) - (hstep + logowidth * 0.8) / 2,
+                                        vstep * (2 + i) + margin + (vstep - logoheight * 0.8) / 2,
+                                        logowidth * 0.8,
+                                        logoheight * 0.8,
+                                        self.schedule[opponent]['logoURI'], name=opponent)
+
+                        # Should the text be white or black?
+                        text_color = text_colors[j]
+
+                        # Write the probability in the box
+                        graph.add_text(margin + hstep * (1 + j) + 3,
+                                       2 * margin + vstep * (2 + i) + 3,
+                                       alignment='middle', anchor='left', size=8,
+                                       color=tuple(text_color),
+                                       text=str(round(100 * win_probabilities[j], 1)) + '%')
+
+                        # Add the cumulative probability text
+                        graph.add_text(0.8 * margin + hstep * (2 + j),
+                                       vstep * (3 + i),
+                                       alignment='middle', anchor='end', size=8,
+                                       color=tuple(text_color),
+                                       text=str(round(abs(100 * (1 - sum(record[i][1][x] for x in range(0, j)))),
+                                                      1)) + '%')
+
+                    elif j == cols - 2:
+                        # Calculate the win expectation
+                        xw = sum(x * record[i][1][x] for x in range(len(record[i][1])))
+
+                        r, g, b = expected_fills[i]
+
+                        # Draw the color-coded box
+                        graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep, color='none',
+                                       fill=(r, g, b))
+
+                        # Should the text be white or black?
+                        text_color = expected_text[i]
 
-        # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
-        if stxt:
-            offset = 8
-            graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 + offset, size=13,
-                           alignment='middle', text='({})'.format(stxt))
-        else:
-            offset = 0
-        graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 - offset, size=13, alignment='middle',
-                       text='Strength of Schedule as projected by {} using {}'.format(method.upper(), txt))
-
-        foo = []
-        for i in range(len(record)):
-            foo.append(sum([x * record[i][1][x] for x in range(len(record[i][1]))]))
-
-        lower = min(foo)
-        upper = max(foo)
-        # Add column labels for the Team Name
-        graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5 - 8, alignment='middle', size=10, text='Team')
-        graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5 + 8, alignment='middle', size=10, text='Schedule')
-
-        # This set of loops fills in the body of the table
-        for i in range(0, rows - 2):
-            # Add the team logo
-            graph.add_image(margin + (hstep - logowidth) / 2,
-                            vstep * (2 + i) + margin + (vstep - logoheight) / 2,
-                            logowidth,
-                            logoheight,
-                            record[i][0].logo_URI)
-
-            # Add the rank in the upper left of the logo box
-            graph.add_text(2.5 * margin, vstep * (2 + i) + 2.5 * margin, alignment='middle', size=8, text=i + 1)
-
-            team = record[i][0].name
-
-            cur = x
-            win_probabilities = []
-            for k in range(len(self.schedule[team]['schedule'])):
-                # Get the opponent S&P+ value
-                opp_sp = self.schedule[self.schedule[team]['schedule'][k]['opponent']]['sp+']
-                # Use the most recent S&P+ values prior to the specified date
-                # Note there might be a misalignment between the S&P+ value dates for different teams, especially FCS teams
-                best_match = max(
-                    datetime.strptime(dt, '%Y-%m-%d') for dt in opp_sp.keys() if
-                    datetime.strptime(dt, '%Y-%m-%d') <= date).strftime('%Y-%m-%d')
-                osp = opp_sp[best_match]
-                # Who has the 2.5 point home field advantage?
-                loc = self.schedule[team]['schedule'][k]['home-away']
-                # Calculate the win probability and record it
-                win_probabilities.append(Utils.calculate_win_prob_from_spplus(cur, osp, loc))
-            for j in range(0, cols - 1):
-                if i == 0:
-                    if j == cols - 2:
-                        # Add the column label
-                        graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 - 10,
-                                       size=10,
-                                       alignment='middle',
-                                       text='Schedule')
-                        graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5,
-                                       size=10,
-                                       alignment='middle',
-                                       text='Expected')
-                        graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 + 10,
-                                       size=10,
-                                       alignment='middle',
-                                       text='Wins')
-                    elif j <= len(record[i][1]):
-                        # Add the column label
-                        graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 - 7,
-                                       size=13,
-                                       alignment='middle',
-                                       text='Opp.')
                         graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 + 7,
+                                       margin + vstep * (2.5 + i),
                                        size=13,
                                        alignment='middle',
-                                       text=j + 1)
-
-                if j < len(win_probabilities):
-                    r, g, b = Utils.gradient_color(0, 1, win_probabilities[j], scale=scale)
-
-                    # Draw the color-coded box
-                    graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep, color='none',
-                                   fill=(r, g, b))
-                    # Add the opponent logo
-                    opponent = self.schedule[team]['schedule'][j]['opponent']
-                    graph.add_image(margin + hstep * (2 + j) - (hstep + logowidth * 0.8) / 2,
-                                    vstep * (2 + i) + margin + (vstep - logoheight * 0.8) / 2,
-                                    logowidth * 0.8,
-                                    logoheight * 0.8,
-                                    self.schedule[opponent]['logoURI'])
-
-                    # Should the text be white or black?
-                    text_color = Utils.get_text_contrast_color(r, g, b)
-
-                    # Write the probability in the box
-                    graph.add_text(margin + hstep * (1 + j) + 3,
-                                   2 * margin + vstep * (2 + i) + 3,
-                                   alignment='middle', anchor='left', size=8,
-                                   color=tuple(text_color),
-                                   text=str(round(100 * win_probabilities[j], 1)) + '%')
-
-                    # Add the cumulative probability text
-                    graph.add_text(0.8 * margin + hstep * (2 + j),
-                                   vstep * (3 + i),
-                                   alignment='middle', anchor='end', size=8,
-                                   color=tuple(text_color),
-                                   text=str(round(abs(100 * (1 - sum(record[i][1][x] for x in range(0, j)))), 1)) + '%')
-
-                elif j == cols - 2:
-                    # Calculate the win expectation
-                    xw = sum(x * record[i][1][x] for x in range(len(record[i][1])))
-
-                    r, g, b = Utils.gradient_color(lower, upper, xw, scale=scale)
-
-                    # Draw the color-coded box
-                    graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep, color='none',
-                                   fill=(r, g, b))
-
-                    # Should the text be white or black?
-                    text_color = Utils.get_text_contrast_color(r, g, b)
-
-                    graph.add_text(margin + hstep * (1.5 + j),
-                                   margin + vstep * (2.5 + i),
-                                   size=13,
-                                   alignment='middle',
-                                   color=tuple(text_color),
-                                   text=round(xw, 3))
+                                       color=tuple(text_color),
+                                       text=round(xw, 3))
 
-                else:
-                    # Draw a gray box
-                    graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
-                                   color='none', fill=(150, 150, 150))
+                    else:
+                        # Draw a gray box
+                        graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
+                                       color='none', fill=(150, 150, 150))
 
-        # This set of loops draws the grid over the table.
-        for i in range(2, rows):
-            for j in range(1, cols):
-                # add the vertical lines between the columns
-                graph.add_line(x1=margin + hstep * j, y1=margin + vstep, x2=margin + hstep * j,
-                               y2=margin + vstep * rows)
+            # This set of loops draws the grid over the table.
+            for i in range(2, rows):
+                for j in range(1, cols):
+                    # add the vertical lines between the columns
+                    graph.add_line(x1=margin + hstep * j, y1=margin + vstep, x2=margin + hstep * j,
+                                   y2=margin + vstep * rows)
 
-            # add the horizontal lines between the rows
-            graph.add_line(x1=margin, y1=margin + vstep * i, x2=margin + hstep * cols,
-                           y2=margin + vstep * i)
+                # add the horizontal lines between the rows
+                graph.add_line(x1=margin, y1=margin + vstep * i, x2=margin + hstep * cols,
+                               y2=margin + vstep * i)
 
             # Draw the outline box for the table
             graph.add_rect(margin, margin + vstep, hstep * cols, vstep * (rows - 1), color=(0, 0, 0), fill='none',
@@ -245,194 +259,194 @@ class Cluster:
             # Draw the outline box for the win total header label
             graph.add_rect(margin + hstep, margin, hstep * (cols - 2), 2 * vstep, color=(0, 0, 0), fill='none',
                            stroke_width=2)
-            graph.write_file()
 
     def make_standings_projection_graph(self, file='out', week=None, hstep=50, vstep=50, margin=5, logowidth=40,
                                         old=None,
-                                        method='sp+', logoheight=40, absolute=False, scale='red-green', record=None):
+                                        method='sp+', logoheight=40, absolute=False, scale='red-green', record=None,
+                                        logo_dir=None):
         if not record:
             # get the records for the final week for each team
             record = self.get_record_array(week)
 
         if not os.path.exists(".\svg output\{} - {}".format(method, scale)):
             os.makedirs(".\svg output\{} - {}".format(method, scale))
-        path = os.path.join(".\svg output\{} - {}".format(method, scale),
-                            '{} - {} - {}.svg'.format(file, method, scale))
+        path = Graph.output_path(file, method, scale)
 
         if not old:
             rows, cols = len(record) + 2, max([len(x[1]) for x in record]) + 1
         else:
             rows, cols = len(record) + 2, max([len(x[1]) for x in record]) + 2
 
-        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin)
+        # cluster tables can run to all of FBS, so stream them to disk instead of holding them in memory
+        with Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin,
+                   logo_dir=logo_dir, stream=True) as graph:
 
-        # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
-        graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 - 4, size=13, alignment='middle',
-                       text='Total Wins as projected by {}'.format(method.upper()))
+            # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
+            graph.add_text(margin + hstep * (cols + 1) / 2, margin + vstep * 0.5 - 4, size=13, alignment='middle',
+                           text='Total Wins as projected by {}'.format(method.upper()))
 
-        if not week or week == 0:
-            first_week = 0
-        else:
-            first_week = week - 1
-
-        # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
-        if first_week > 0:
-            graph.add_text(margin + hstep * (cols + 1) / 2,
-                           margin + vstep * 0.5 + 9,
-                           size=13, alignment='middle',
-                           text='(change after week {} games)'.format(first_week))
-
-        # Add column labels for the Team Name
-        graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5, alignment='middle', size=13, text='Team')
-
-        # This set of loops fills in the body of the table
-        for i in range(0, rows - 2):
-            # Add the team logo
-            graph.add_image(margin + (hstep - logowidth) / 2,
-                            vstep * (2 + i) + margin + (vstep - logoheight) / 2,
-                            logowidth,
-                            logoheight,
-                            record[i][0].logo_URI)
-
-            # Add the rank in the upper left of the logo box
-            graph.add_text(2.5 * margin, vstep * (2 + i) + 2.5 * margin, alignment='middle', size=8, text=i + 1)
-
-            # find the max and min in this week to determine color of cell
-            if absolute:
-                upper, lower = 1, 0
+            if not week or week == 0:
+                first_week = 0
             else:
-                upper, lower = max(record[i][1]), min(record[i][1])
-
-            for j in range(0, cols - 1):
-                if i == 0:
-                    if j == cols - 2:
-                        if old:
+                first_week = week - 1
+
+            # Add the horizontal header label; it is at the very top of the svg and covers all but the first column, with centered text
+            if first_week > 0:
+                graph.add_text(margin + hstep * (cols + 1) / 2,
+                               margin + vstep * 0.5 + 9,
+                               size=13, alignment='middle',
+                               text='(change after week {} games)'.format(first_week))
+
+            # Add column labels for the Team Name
+            graph.add_text(margin + hstep * 0.5, margin + vstep * 1.5, alignment='middle', size=13, text='Team')
+
+            # This set of loops fills in the body of the table
+            for i in range(0, rows - 2):
+                # Add the team logo
+                graph.add_image(margin + (hstep - logowidth) / 2,
+                                vstep * (2 + i) + margin + (vstep - logoheight) / 2,
+                                logowidth,
+                                logoheight,
+                                record[i][0].logo_URI, name=record[i][0].name)
+
+                # Add the rank in the upper left of the logo box
+                graph.add_text(2.5 * margin, vstep * (2 + i) + 2.5 * margin, alignment='middle', size=8, text=i + 1)
+
+                # find the max and min in this week to determine color of cell
+                if absolute:
+                    upper, lower = 1, 0
+                else:
+                    upper, lower = max(record[i][1]), min(record[i][1])
+
+                # color the whole row in one lookup
+                fills, text_colors = ColorScale.get(scale, primaryColor=record[i][0].primary_color,
+                                                    secondaryColor=record[i][0].secondary_color).row(record[i][1],
+                                                                                                     lower, upper)
+
+                for j in range(0, cols - 1):
+                    if i == 0:
+                        if j == cols - 2:
+                            if old:
+                                # Add the column label
+                                graph.add_text(margin + hstep * (1.5 + j),
+                                               margin + vstep * 1.5 - 10,
+                                               size=10,
+                                               alignment='middle',
+                                               text='Expected')
+                                graph.add_text(margin + hstep * (1.5 + j),
+                                               margin + vstep * 1.5,
+                                               size=10,
+                                               alignment='middle',
+                                               text='Wins')
+                                graph.add_text(margin + hstep * (1.5 + j),
+                                               margin + vstep * 1.5 + 10,
+                                               alignment='middle',
+                                               size=10,
+                                               text='(Change)')
+                        elif j <= len(record[i][1]):
+                            if j != 1:
+                                txt = 'Wins'
+                            else:
+                                txt = 'Win'
                             # Add the column label
                             graph.add_text(margin + hstep * (1.5 + j),
-                                           margin + vstep * 1.5 - 10,
-                                           size=10,
-                                           alignment='middle',
-                                           text='Expected')
-                            graph.add_text(margin + hstep * (1.5 + j),
-                                           margin + vstep * 1.5,
-                                           size=10,
+                                           margin + vstep * 1.5 - 7,
+                                           size=13,
                                            alignment='middle',
-                                           text='Wins')
+                                           text=j)
                             graph.add_text(margin + hstep * (1.5 + j),
-                                           margin + vstep * 1.5 + 10,
+                                           margin + vstep * 1.5 + 7,
+                                           size=13,
                                            alignment='middle',
-                                           size=10,
-                                           text='(Change)')
-                    elif j <= len(record[i][1]):
-                        if j != 1:
-                            txt = 'Wins'
-                        else:
-                            txt = 'Win'
-                        # Add the column label
-                        graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 - 7,
-                                       size=13,
-                                       alignment='middle',
-                                       text=j)
+                                           text=txt)
+
+                    if j < len(record[i][1]):
+                        r, g, b = fills[j]
+
+                        # Draw the color-coded box
+                        graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
+                                       color='none', fill=(r, g, b))
+
+                        # Should the text be white or black?
+                        text_color = text_colors[j]
+
+                        # Write the probability in the box
                         graph.add_text(margin + hstep * (1.5 + j),
-                                       margin + vstep * 1.5 + 7,
-                                       size=13,
+                                       margin + vstep * (2.5 + i) - 2,
                                        alignment='middle',
-                                       text=txt)
+                                       color=tuple(text_color),
+                                       text=str(round(100 * record[i][1][j], 1)) + '%')
 
-                if j < len(record[i][1]):
-                    if absolute:
-                        r, g, b = Utils.gradient_color(0, 1, record[i][1][j], scale=scale,
-                                                       primaryColor=record[i][0].primary_color,
-                                                       secondaryColor=record[i][0].secondary_color)
-                    else:
-                        r, g, b = Utils.gradient_color(lower, upper, record[i][1][j], scale=scale,
-                                                       primaryColor=record[i][0].primary_color,
-                                                       secondaryColor=record[i][0].secondary_color)
-
-                    # Draw the color-coded box
-                    graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
-                                   color='none', fill=(r, g, b))
-
-                    # Should the text be white or black?
-                    text_color = Utils.get_text_contrast_color(r, g, b)
-
-                    # Write the probability in the box
-                    graph.add_text(margin + hstep * (1.5 + j),
-                                   margin + vstep * (2.5 + i) - 2,
-                                   alignment='middle',
-                                   color=tuple(text_color),
-                                   text=str(round(100 * record[i][1][j], 1)) + '%')
-
-                    # Add the cumulative probability text
-                    graph.add_text(0.8 * margin + hstep * (2 + j),
-                                   vstep * (3 + i),
-                                   alignment='middle', anchor='end', size=8,
-                                   color=tuple(text_color),
-                                   text=str(round(abs(100 * (1 - sum(record[i][1][x] for x in range(0, j)))), 1)) + '%')
-
-                    if old:
-                        diff = round(100 * (record[i][1][j] - record[i][2][j]), 1)
+                        # Add the cumulative probability text
+                        graph.add_text(0.8 * margin + hstep * (2 + j),
+                                       vstep * (3 + i),
+                                       alignment='middle', anchor='end', size=8,
+                                       color=tuple(text_color),
+                                       text=str(round(abs(100 * (1 - sum(record[i][1][x] for x in range(0, j)))),
+                                                      1)) + '%')
+
+                        if old:
+                            diff = round(100 * (record[i][1][j] - record[i][2][j]), 1)
+                            if diff > 0:
+                                txt = '(+{})%'.format(diff)
+                            elif diff < 0:
+                                txt = '(' + str(diff) + '%)'
+                            else:
+                                txt = '(+' + str(diff) + '%)'
+
+                            # Write the probability change in the box
+                            graph.add_text(margin + hstep * (1.5 + j),
+                                           margin + vstep * (2.5 + i) + 8,
+                                           size=10, alignment='middle',
+                                           color=tuple(text_color),
+                                           text=txt)
+
+                    elif j == cols - 2 and old:
+                        # Calculate the win expectation
+                        old_xw = sum(x * record[i][2][x] for x in range(len(record[i][2])))
+                        new_xw = sum(x * record[i][1][x] for x in range(len(record[i][1])))
+                        diff = round(new_xw - old_xw, 1)
                         if diff > 0:
-                            txt = '(+{})%'.format(diff)
+                            txt = '(+{})'.format(diff)
+                            r, g, b = 0, 205, 0
+                            weight = 'bolder'
                         elif diff < 0:
-                            txt = '(' + str(diff) + '%)'
+                            txt = '(' + str(diff) + ')'
+                            r, g, b = 255, 77, 77
+                            weight = 'bolder'
                         else:
-                            txt = '(+' + str(diff) + '%)'
+                            txt = '(+0.0)'
+                            r, g, b = 0, 0, 0
+                            weight = 'normal'
+
+                        graph.add_text(margin + hstep * (1.5 + j),
+                                       margin + vstep * (2.5 + i) - 2,
+                                       size=13,
+                                       text=round(new_xw, 1))
 
-                        # Write the probability change in the box
+                        # How did the win expectation change?
                         graph.add_text(margin + hstep * (1.5 + j),
                                        margin + vstep * (2.5 + i) + 8,
-                                       size=10, alignment='middle',
-                                       color=tuple(text_color),
+                                       alignment='middle',
+                                       size=10,
+                                       color=(r, g, b),
+                                       weight=weight,
                                        text=txt)
-
-                elif j == cols - 2 and old:
-                    # Calculate the win expectation
-                    old_xw = sum(x * record[i][2][x] for x in range(len(record[i][2])))
-                    new_xw = sum(x * record[i][1][x] for x in range(len(record[i][1])))
-                    diff = round(new_xw - old_xw, 1)
-                    if diff > 0:
-                        txt = '(+{})'.format(diff)
-                        r, g, b = 0, 205, 0
-                        weight = 'bolder'
-                    elif diff < 0:
-                        txt = '(' + str(diff) + ')'
-                        r, g, b = 255, 77, 77
-                        weight = 'bolder'
                     else:
-                        txt = '(+0.0)'
-                        r, g, b = 0, 0, 0
-                        weight = 'normal'
-
-                    graph.add_text(margin + hstep * (1.5 + j),
-                                   margin + vstep * (2.5 + i) - 2,
-                                   size=13,
-                                   text=round(new_xw, 1))
-
-                    # How did the win expectation change?
-                    graph.add_text(margin + hstep * (1.5 + j),
-                                   margin + vstep * (2.5 + i) + 8,
-                                   alignment='middle',
-                                   size=10,
-                                   color=(r, g, b),
-                                   weight=weight,
-                                   text=txt)
-                else:
-                    # Draw a gray box
-                    graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
-                                   color='none', fill=(150, 150, 150))
+                        # Draw a gray box
+                        graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
+                                       color='none', fill=(150, 150, 150))
 
-        # This set of loops draws the grid over the table.
-        for i in range(2, rows):
-            for j in range(1, cols):
-                # add the vertical lines between the columns
-                graph.add_line(x1=margin + hstep * j, y1=margin + vstep, x2=margin + hstep * j,
-                               y2=margin + vstep * rows)
+            # This set of loops draws the grid over the table.
+            for i in range(2, rows):
+                for j in range(1, cols):
+                    # add the vertical lines between the columns
+                    graph.add_line(x1=margin + hstep * j, y1=margin + vstep, x2=margin + hstep * j,
+                                   y2=margin + vstep * rows)
 
-            # add the horizontal lines between the rows
-            graph.add_line(x1=margin, y1=margin + vstep * i, x2=margin + hstep * cols,
-                           y2=margin + vstep * i)
+                # add the horizontal lines between the rows
+                graph.add_line(x1=margin, y1=margin + vstep * i, x2=margin + hstep * cols,
+                               y2=margin + vstep * i)
 
             # Draw the outline box for the table
             graph.add_rect(margin, margin + vstep, hstep * cols, vstep * (rows - 1), color=(0, 0, 0), fill='none',
@@ -448,39 +462,24 @@ class Cluster:
             # Draw the outline box for the win total header label
             graph.add_rect(margin + hstep, margin, hstep * (cols - 2), vstep, color=(0, 0, 0), fill='none',
                            stroke_width=2)
-            graph.write_file()
 
     def rank_schedules(self, file='out', week=None, hstep=40, vstep=40, margin=5, logowidth=30,
-                       method='sp+', logoheight=30, absolute=False, scale='red-green', spplus=0.0, txtoutput=False):
+                       method='sp+', logoheight=30, absolute=False, scale='red-green', spplus=0.0, txtoutput=False,
+                       sos=None):
         record = []
 
         # make sure the week is valid
-        if (not week) or (week < 1) or (week > max([len(x.win_probabilities[week]) for x in self.teams])):
+        if (not week) or (week < 1) or (week > max([len(x.schedule[x.name]['schedule']) for x in self.teams])):
             week = -1
 
-        # recalculate the win probabilities as though the team were average (S&P+ = 0.0)
-        modified_teams = self.teams
-        for team in modified_teams:
-            for x in team.spplus:
-                cur = spplus
-                team.win_probabilities[x] = []
-                date = datetime.strptime(x, "%Y-%m-%d")
-                for i in range(len(team.schedule[team.name]['schedule'])):
-                    # Get the opponent S&P+ value
-                    opp_sp = team.schedule[team.schedule[team.name]['schedule'][i]['opponent']]['sp+']
-                    # Use the most recent S&P+ values prior to the specified date
-                    # Note there might be a misalignment between the S&P+ value dates for different teams, especially FCS teams
-                    best_match = max(
-                        datetime.strptime(dt, '%Y-%m-%d') for dt in opp_sp.keys() if
-                        datetime.strptime(dt, '%Y-%m-%d') <= date).strftime('%Y-%m-%d')
-                    osp = opp_sp[best_match]
-                    # Who has the 2.5 point home field advantage?
-                    loc = team.schedule[team.name]['schedule'][i]['home-away']
-                    # Calculate the win probability and record it
-                    team.win_probabilities[x].append(Utils.calculate_win_prob_from_spplus(cur, osp, loc))
+        # win probabilities as though every team were rated 'spplus', for all schedules in one broadcast; the Team
+        # objects are shared through the registry, so they are left alone
+        sos = sos if sos else self.get_schedule_strength()
+        projections = Projection.win_distributions(Projection.pad(sos.schedules(spplus))[0])
 
         # sort teams by their weighted average number of wins and division
-        ordered_teams = sorted([[x, x.project_win_totals()[week]] for x in modified_teams],
+        ordered_teams = sorted([[x, Projection.ragged(y, n)[week]]
+                                for x, y, n in zip(sos.teams, projections, sos.lengths)],
                                key=lambda y: 12 * sum([y[1][z] * z for z in range(len(y[1]))]) / len(y[1]))
         record.extend(ordered_teams)
 
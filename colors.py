@@ -0,0 +1,67 @@
+import numpy as np
+
+from utils import Utils
+
+
+class ColorScale:
+    # Lookup tables for Utils.gradient_color. Each scale is sampled once at 'resolution' + 1 evenly spaced points along
+    # 0..1, together with the contrasting text color of every sample, and a whole row or matrix of probabilities is
+    # then mapped to fill and text colors with one array index. Tables are shared per (scale, resolution, colors).
+    _tables = {}
+
+    def __init__(self, scale='red-green', resolution=1024, primaryColor=None, secondaryColor=None):
+        if scale not in ('red-green', 'red-blue', 'black-red', 'team'):
+            raise ValueError('unknown color scale {}'.format(scale))
+        if scale == 'team' and not (primaryColor and secondaryColor):
+            raise ValueError('the team color scale needs a primary and a secondary color')
+
+        self.scale = scale
+        self.resolution = resolution
+        samples = [Utils.gradient_color(0, 1, x, scale=scale, primaryColor=primaryColor,
+                                        secondaryColor=secondaryColor) for x in np.linspace(0, 1, resolution + 1)]
+        # the team scale blends the raw colors, the hls scales are already rounded to integers
+        self.table = np.array(samples, dtype=np.float64 if scale == 'team' else np.int64)
+        self.text = ColorScale.contrast(self.table)
+
+    @staticmethod
+    def get(scale='red-green', resolution=1024, primaryColor=None, secondaryColor=None):
+        """Return the shared table for the scale, building it on first use."""
+        # only the team scale depends on the colors
+        if scale != 'team':
+            primaryColor = secondaryColor = None
+        key = (scale, resolution, tuple(primaryColor) if primaryColor else None,
+               tuple(secondaryColor) if secondaryColor else None)
+        try:
+            return ColorScale._tables[key]
+        except KeyError:
+            ColorScale._tables[key] = ColorScale(scale, resolution, primaryColor, secondaryColor)
+            return ColorScale._tables[key]
+
+    @staticmethod
+    def interpolate(lower, upper, values, method='linear'):
+        """Utils.interpolate over an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        if upper == lower:
+            return np.ones_like(values)
+        x = (values - lower) / (upper - lower)
+        if method.lower() == 'cubic':
+            return x ** 3 * (10 + x * (-15 + 6 * x))
+        return x
+
+    @staticmethod
+    def contrast(rgb):
+        """Utils.get_text_contrast_color over an (..., 3) array of colors: black on bright colors, white otherwise."""
+        rgb = np.asarray(rgb, dtype=np.float64)
+        brightness = (rgb[..., 0] * 299 + rgb[..., 1] * 587 + rgb[..., 2] * 114) / 1000
+        return np.where((brightness > 123)[..., None], 0, 255).repeat(3, axis=-1)
+
+    def map(self, values, lower=0, upper=1, method='linear'):
+        """Return (fill colors, text colors) for an array of values, as (..., 3) arrays."""
+        inter = np.clip(ColorScale.interpolate(lower, upper, values, method), 0, 1)
+        i = np.rint(inter * self.resolution).astype(np.int64)
+        return self.table[i], self.text[i]
+
+    def row(self, values, lower=0, upper=1, method='linear'):
+        """map() for one row of a table, as lists of (r, g, b) tuples ready for Graph."""
+        fill, text = self.map(values, lower, upper, method)
+        return [tuple(x) for x in fill.tolist()], [tuple(x) for x in text.tolist()]
@@ -1,14 +1,24 @@
 import os
 
+from colors import ColorScale
 from graph import Graph
+from model import Season
+from projection import Projection
+from registry import TeamRegistry
+from simulate import SeasonSimulator
 from team import Team
-from utils import Utils
 
 
 class Conference:
     def __init__(self, name, schedule):
         self.name = name
-        self.teams = {Team(name=x, schedule=schedule) for x in schedule if schedule[x]['conference'] == name}
+        self.schedule = schedule
+        registry = TeamRegistry.shared(schedule)
+        self.ratings = registry.ratings
+        self.history = registry.history
+        self.teams = {registry.get(x) for x in schedule if schedule[x]['conference'] == name}
+        # read after get(), which rebuilds the Season model if a rating changed since
+        self.season = registry.season
         self.divisions = {}
         for team in self.teams:
             if team.division not in self.divisions:
@@ -18,12 +28,52 @@ class Conference:
         if len(self.divisions) == 0:
             self.divisions['all'] = self.teams
 
-    def get_record_array(self, week=-1):
+    def get_division_odds(self, simulations=100000, date=None, seed=None, workers=1):
+        """Return {team: {'division': P(wins the division), 'ranks': [P(finishes k-th)], 'wins': [P(w wins)]}}.
+
+        Unlike the standings projection, the season is simulated as a whole, so head-to-head games are decided once
+        for both sides."""
+        season = self.season if self.season else Season.from_schedule(self.schedule)
+        result = SeasonSimulator(season, date=date).run(simulations, seed=seed, workers=workers)
+        return {x.name: {'division': result['division'].get(x.name), 'ranks': result['ranks'].get(x.name),
+                         'wins': result['wins'][x.name]} for x in self.teams}
+
+    def get_totals(self, *weeks):
+        """Return {week: {team: (wins distribution, conference wins distribution)}}.
+
+        Weeks already in the projection history are read from it; the rest are projected in one batched pass over the
+        joint (total wins x conference wins) table, whose two marginals are the two views, and appended to it."""
+        result = {w: {} for w in weeks}
+        missing = {}
+        for w in weeks:
+            for t in self.teams:
+                found = self.history.get(t, w, 'wins', 'conference_wins')
+                if found:
+                    result[w][t.name] = (found['wins'], found['conference_wins'])
+                else:
+                    missing.setdefault((t.name, t.get_rating_date(w)), []).append((w, t))
+
+        if missing:
+            first = [x[0] for x in missing.values()]
+            tables = Projection.final_joint_totals([t.get_win_probabilities(w) for w, t in first],
+                                                   [t.get_conference_games() for w, t in first])
+            for (w, t), table, weeks_of_date in zip(first, tables, missing.values()):
+                wins, conference_wins = table.sum(axis=1).tolist(), table.sum(axis=0).tolist()
+                self.history.append(t, w, wins=wins, conference_wins=conference_wins,
+                                    expected=Team.expected_wins(wins))
+                for x, y in weeks_of_date:
+                    result[x][t.name] = (wins, conference_wins)
+        return result
+
+    def get_record_array(self, week=-1, conference_only=False):
         # get the records for the final week for each team
         record = []
 
+        # both weeks come from the projection history, projecting only what isn't in it yet
+        totals = self.get_totals(week, week - 1)
+        view = 1 if conference_only else 0
         for t in self.teams:
-            record.append([t, t.project_win_totals(week=week)[-1], t.project_win_totals(week=week - 1)[-1]])
+            record.append([t, list(totals[week][t.name][view]), list(totals[week - 1][t.name][view])])
 
         # sort teams by their weighted average number of wins and division
         record.sort(key=lambda x: (x[0].division, sum([x[1][z] * z for z in range(len(x[1]))])), reverse=True)
@@ -38,30 +88,36 @@ class Conference:
                     new_rank = new.index(last[i]) % div_size + 1
                     old_rank = i % div_size + 1
                     y.append([new_rank, old_rank, old_rank - new_rank])
+
+        # keep the divisional ranks with the projections they came from
+        field = 'conference_rank' if conference_only else 'rank'
+        for y in record:
+            self.history.append(y[0], week, **{field: y[3][0]})
+            self.history.append(y[0], week - 1, **{field: y[3][1]})
         return record
 
     def make_standings_projection_graph(self, file='out', week=None, hstep=50, vstep=50, margin=5, logowidth=40,
                                         method='sp+', logoheight=40, absolute=False,
-                                        scale='red-green', old=None):
+                                        scale='red-green', old=None, conference_only=False, logo_dir=None):
 
         # get the records for the final week for each team
-        record = self.get_record_array(week=week)
+        record = self.get_record_array(week=week, conference_only=conference_only)
 
         if not os.path.exists(".\svg output\{} - {}".format(method, scale)):
             os.makedirs(".\svg output\{} - {}".format(method, scale))
-        path = os.path.join(".\svg output\{} - {}".format(method, scale),
-                            '{} - {} - {}.svg'.format(file, method, scale))
+        path = Graph.output_path(file, method, scale)
 
         if not old:
             rows, cols = len(record) + 2, max([len(x[1]) for x in record]) + 1
         else:
             rows, cols = len(record) + 2, max([len(x[1]) for x in record]) + 3
 
-        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin)
+        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 2 * margin, logo_dir=logo_dir)
 
         # Add the horizontal header label; it is at the very top of the svg and covers the win columns, with centered text
         graph.add_text(margin + hstep * (cols / 2), margin + vstep * 0.5 - 4, size=13, alignment='middle',
-                       text='Total Wins as projected by {}'.format(method.upper()))
+                       text='{} Wins as projected by {}'.format('Conference' if conference_only else 'Total',
+                                                                method.upper()))
 
         if not week or week == 0:
             first_week = 0
@@ -84,7 +140,7 @@ class Conference:
                             vstep * (2 + i) + margin + (vstep - logoheight) / 2,
                             logowidth,
                             logoheight,
-                            record[i][0].logo_URI)
+                            record[i][0].logo_URI, name=record[i][0].name)
 
             # find the max and min in this week to determine color of cell
             if absolute:
@@ -92,6 +148,11 @@ class Conference:
             else:
                 upper, lower = max(record[i][1]), min(record[i][1])
 
+            # color the whole row in one lookup
+            fills, text_colors = ColorScale.get(scale, primaryColor=record[i][0].primary_color,
+                                                secondaryColor=record[i][0].secondary_color).row(record[i][1], lower,
+                                                                                                 upper)
+
             for j in range(0, cols - 1):
                 if i == 0:
                     if j == cols - 3:
@@ -149,21 +210,14 @@ class Conference:
                                        text=txt)
 
                 if j < len(record[i][1]):
-                    if absolute:
-                        r, g, b = Utils.gradient_color(0, 1, record[i][1][j], scale=scale,
-                                                       primaryColor=record[i][0].primary_color,
-                                                       secondaryColor=record[i][0].secondary_color)
-                    else:
-                        r, g, b = Utils.gradient_color(lower, upper, record[i][1][j], scale=scale,
-                                                       primaryColor=record[i][0].primary_color,
-                                                       secondaryColor=record[i][0].secondary_color)
+                    r, g, b = fills[j]
 
                     # Draw the color-coded box
                     graph.add_rect(margin + hstep * (1 + j), margin + vstep * (2 + i), hstep, vstep,
                                    color='none', fill=(r, g, b))
 
                     # Should the text be white or black?
-                    text_color = Utils.get_text_contrast_color(r, g, b)
+                    text_color = text_colors[j]
 
                     # Write the probability in the box
                     graph.add_text(margin + hstep * (1.5 + j),
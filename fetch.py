@@ -0,0 +1,117 @@
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from cache import HTTPCache
+
+
+class TokenBucket:
+    # Allows 'rate' requests per second on average with bursts of up to 'capacity'; acquire() blocks until a token
+    # is available. Thread safe, so one bucket can pace every worker of a Fetcher.
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    # A pooled HTTP client for the scrapers. One requests.Session is shared by every request so connections are
+    # reused, failed requests are retried with exponential backoff (the same policy as Poll.scrape), and batches of
+    # URLs are fetched concurrently with at most 'workers' requests in flight. With an HTTPCache attached, requests
+    # are answered from disk or revalidated with conditional GETs (see cache.py).
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    clients = {}
+
+    def __init__(self, workers=8, retries=10, backoff_factor=0.3, status_forcelist=(500, 502, 504), timeout=30,
+                 cache=None, rate=None, burst=1):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = cache
+        # optional politeness limit on requests that actually go over the network; cache hits are free
+        self.limiter = TokenBucket(rate, burst) if rate else None
+        self.session = Fetcher.retry_session(retries=retries, backoff_factor=backoff_factor,
+                                             status_forcelist=status_forcelist, pool_size=workers)
+
+    @staticmethod
+    def retry_session(retries=10, backoff_factor=0.3, status_forcelist=(500, 502, 504), pool_size=10, session=None):
+        session = session or requests.Session()
+        retry = Retry(
+            total=retries,
+            read=retries,
+            connect=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(Fetcher.headers)
+        return session
+
+    @staticmethod
+    def shared(**config):
+        """Return the client the scrapers go through for a configuration, e.g. shared(retries=3).
+
+        One client is kept per distinct configuration (settings left at their defaults don't count), and every one of
+        them answers from the same on-disk cache in 'http cache/'."""
+        defaults = inspect.signature(Fetcher.__init__).parameters
+        key = tuple(sorted((x, v) for x, v in config.items() if v != defaults[x].default))
+        if key not in Fetcher.clients:
+            cache = Fetcher.shared().cache if key else HTTPCache()
+            Fetcher.clients[key] = Fetcher(cache=cache, **dict(key))
+        return Fetcher.clients[key]
+
+    @staticmethod
+    def set_offline(offline=True):
+        """Serve every scraper purely from the cache, e.g. to run the whole pipeline without a network."""
+        Fetcher.shared().cache.offline = offline
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self.cache:
+            return self.cache.get(self.request, url, **kwargs)
+        return self.request(url, **kwargs)
+
+    def request(self, url, **kwargs):
+        if self.limiter:
+            self.limiter.acquire()
+        return self.session.get(url, **kwargs)
+
+    def fetch_all(self, urls, **kwargs):
+        """Yield (url, response or None, error or None) for every url, in the order the responses arrive."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.get, url, **kwargs): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except requests.RequestException as e:
+                    yield futures[future], None, e
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
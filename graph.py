@@ -1,6 +1,27 @@
+import os
+import urllib.parse
+
+
 class Graph(object):
-    def __init__(self, path, width, height, background=(255, 255, 255)):
+    def __init__(self, path, width, height, background=(255, 255, 255), logo_dir=None, stream=False, sink=None):
         self.path = path
+        # When set, logos are linked from '<logo_dir>/<team>.png' (or .jpg) instead of embedded as base64
+        self.logo_dir = logo_dir
+
+        # In streaming mode elements are written to the sink (any object with write()) as they are added, instead of
+        # being held in self.content; with no sink given, a temporary file next to the output is the sink, and it only
+        # replaces the output once the document is complete, so a graph that fails halfway leaves the last good one
+        self.sink = sink
+        self.owns_sink = False
+        self.temp = None
+        if stream and not sink:
+            self.temp = '{}.{}.tmp'.format(self.path, os.getpid())
+            self.sink = open(self.temp, 'w', encoding='utf-8')
+            self.owns_sink = True
+        self.closed = False
+
+        # Each distinct image is emitted once as a <symbol> and referenced with <use> everywhere it is drawn
+        self.images = {}
 
         self.content = ["<svg version='1.1'\n\t" +
                         "baseProfile='full'\n\t" +
@@ -10,19 +31,62 @@ class Graph(object):
                         "xmlns:xlink='http://www.w3.org/1999/xlink'\n\t" +
                         "style='shape-rendering:crispEdges;'>\n",
                         "<rect width='100%' height='100%' style='fill:rgb({},{},{})' />\n".format(*background)]
+        if self.sink:
+            for x in self.content:
+                self.sink.write(x)
+            self.content = []
 
-    def add_image(self, x, y, width, height, uri):
-        s = "<image x='{}' y='{}'" \
-            " width='{}px' height='{}px'" \
-            " xlink:href='data:image/jpg;base64,{}'/>\n".format(x, y, width, height, uri)
-        self.content.append(s)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+
+    def append(self, s):
+        if self.sink:
+            self.sink.write(s)
+        else:
+            self.content.append(s)
+
+    @staticmethod
+    def output_path(file, method, scale):
+        """Return where the graph for 'file' drawn with the given method and color scale is written."""
+        return os.path.join(".\svg output\{} - {}".format(method, scale),
+                            '{} - {} - {}.svg'.format(file, method, scale))
+
+    def add_image(self, x, y, width, height, uri, name=None):
+        try:
+            ref = self.images[uri]
+        except KeyError:
+            ref = 'img{}'.format(len(self.images))
+            self.images[uri] = ref
+            s = "<defs><symbol id='{}' viewBox='0 0 1 1'>" \
+                "<image width='1' height='1' xlink:href='{}'/>" \
+                "</symbol></defs>\n".format(ref, self.get_image_href(uri, name))
+            self.append(s)
+
+        s = "<use xlink:href='#{}' x='{}' y='{}' width='{}px' height='{}px'/>\n".format(ref, x, y, width, height)
+        self.append(s)
+
+    def get_image_href(self, uri, name=None):
+        # Prefer a link to the logo file on disk, if asked to and if one exists, relative to the output file
+        if self.logo_dir and name:
+            for ext in ('.png', '.jpg'):
+                file = os.path.join(self.logo_dir, name + ext)
+                if os.path.exists(file):
+                    rel = os.path.relpath(os.path.abspath(file), os.path.dirname(os.path.abspath(self.path)))
+                    return urllib.parse.quote(rel.replace(os.sep, '/'))
+        return 'data:image/jpg;base64,{}'.format(uri)
 
     def add_line(self, x1, y1, x2, y2, color=(0, 0, 0), width=1):
         s = "<line x1='{}' y1='{}' x2='{}' y2='{}' style='".format(x1, y1, x2, y2)
         s += "stroke:rgb({},{},{});".format(*color)
         s += "stroke-width:{};".format(width)
         s += "'/>\n"
-        self.content.append(s)
+        self.append(s)
 
     def add_rect(self, x, y, width, height, color=(0, 0, 0), fill='none', stroke_width=1):
         s = "<rect x='{}' y='{}' width='{}' height='{}' style='stroke-width:{};stroke:".format(x, y, width, height,
@@ -38,7 +102,7 @@ class Graph(object):
             s += fill + ";"
         s += "'/>\n"
 
-        self.content.append(s)
+        self.append(s)
 
     def add_text(self, x, y, alignment='baseline', anchor='middle', color=(0, 0, 0), font='Arial', size=12, text='',
                  weight='normal'):
@@ -51,9 +115,35 @@ class Graph(object):
         s += "weight:{}".format(weight)
         s += "'>{}</text>\n".format(text)
 
-        self.content.append(s)
+        self.append(s)
+
+    def close(self):
+        # finalize the document; closing twice is harmless
+        if self.closed:
+            return
+        if self.sink:
+            self.sink.write("</svg>")
+            if self.owns_sink:
+                self.sink.close()
+                os.replace(self.temp, self.path)
+        else:
+            self.write_file()
+        self.closed = True
+
+    def abort(self):
+        # drop a half-drawn document, leaving whatever was at the output path before
+        if self.closed:
+            return
+        if self.owns_sink:
+            self.sink.close()
+            os.remove(self.temp)
+        self.closed = True
 
     def write_file(self):
+        if self.sink:
+            self.close()
+            return
+
         with open(self.path, 'w+', encoding='utf-8') as outfile:
             for x in self.content:
                 outfile.write(x)
@@ -0,0 +1,80 @@
+import json
+import os
+
+from ratings import RatingIndex
+
+
+class ProjectionHistory:
+    # An append-only log of the projections made for each team, one JSON line per write:
+    #
+    #   {"team": name, "date": rating date, "week": week, "p": [win probability per game], <fields>}
+    #
+    # where the fields are whichever of these the writer computed: 'table' (the ragged 'games' x 'wins' table),
+    # 'wins' and 'conference_wins' (season-end distributions), 'expected' (expected wins), 'rank' and
+    # 'conference_rank' (divisional rank in the total / conference-only standings). Lines for the same (team, rating
+    # date) merge on load, later fields winning, so every lookup is a dict hit. A record only counts while its 'p'
+    # matches the team's current win probabilities for that date; a corrected result or rating makes it stale, and
+    # the next write starts the record over. Writes that wouldn't change anything are skipped. Without a path the
+    # log only lives in memory.
+
+    def __init__(self, path=None):
+        self.path = path
+        self.records = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, 'rb') as infile:
+            lines = infile.read().split(b'\n')
+        offset = 0
+        for i, line in enumerate(lines):
+            try:
+                if line.strip():
+                    self.merge(json.loads(line.decode('utf8')))
+            except ValueError:
+                if any(x.strip() for x in lines[i + 1:]):
+                    raise ValueError('{}: line {} is not valid JSON'.format(self.path, i + 1))
+                # a writer was killed halfway through its last line; drop the fragment so the next append starts on
+                # a line of its own
+                with open(self.path, 'r+b') as outfile:
+                    outfile.truncate(offset)
+                break
+            offset += len(line) + 1
+
+    def merge(self, line):
+        key = (line['team'], line['date'])
+        if 'p' in line or key not in self.records:
+            self.records[key] = {}
+        self.records[key].update(line)
+
+    def get(self, team, week=-1, *fields):
+        """Return the team's record for the week if it is current and holds every field given, else None."""
+        date = team.get_rating_date(week)
+        record = self.records.get((team.name, date))
+        if record is None or record.get('p') != team.win_probabilities[date]:
+            return None
+        if any(x not in record for x in fields):
+            return None
+        return record
+
+    def append(self, team, week=-1, **fields):
+        """Add fields to the team's record for the week, starting a new record if the stored one is stale."""
+        date = team.get_rating_date(week)
+        record = self.get(team, week)
+        if record is not None:
+            fields = {x: v for x, v in fields.items() if record.get(x) != v}
+            if not fields:
+                return
+        line = dict(fields, team=team.name, date=date, week=week)
+        if record is None:
+            line['p'] = list(team.win_probabilities[date])
+        self.merge(line)
+        if self.path:
+            with open(self.path, 'a', encoding='utf8') as outfile:
+                outfile.write(json.dumps(line) + '\n')
+
+    def trend(self, name, field='expected'):
+        """Return [(rating date, value)] of one field for a team, in date order, e.g. its expected wins by week."""
+        values = [(date, record[field]) for (team, date), record in self.records.items()
+                  if team == name and field in record]
+        return sorted(values, key=lambda x: RatingIndex.ordinal(x[0]))
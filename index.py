@@ -0,0 +1,72 @@
+class GameIndex:
+    # Hash indexes over a schedule so merges and corrections don't have to scan it:
+    #
+    #   games    game id -> {schedule key: slot in that team's schedule list}, one entry per participant
+    #   ids      schedule key -> the game ids indexed for that team
+    #
+    # Games without an id (hand-entered ones) simply aren't indexed. The reverse direction, slot -> game id, is the
+    # game's own 'id' field. Anything that changes a game's id or removes games must reindex the team afterwards.
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.games = {}
+        self.ids = {}
+        self.rebuild()
+
+    def rebuild(self, schedule=None):
+        if schedule is not None:
+            self.schedule = schedule
+        self.games = {}
+        self.ids = {}
+        for team in self.schedule:
+            self.index_team(team)
+
+    def index_team(self, team):
+        ids = self.ids.setdefault(team, set())
+        for i, game in enumerate(self.schedule[team]['schedule']):
+            if game.get('id'):
+                self.games.setdefault(str(game['id']), {})[team] = i
+                ids.add(str(game['id']))
+
+    def reindex(self, team):
+        """Re-read one team's schedule, e.g. after games were removed from it."""
+        for game_id in self.ids.pop(team, ()):
+            slots = self.games.get(game_id, {})
+            slots.pop(team, None)
+            if not slots:
+                self.games.pop(game_id, None)
+        if team not in self.schedule:
+            return
+        self.index_team(team)
+
+    def find(self, game_id, team):
+        """Return the slot of the game in the team's schedule, or None."""
+        return self.games.get(str(game_id), {}).get(team)
+
+    def add(self, team, game):
+        """Append a game to the team's schedule and index it; returns its slot."""
+        self.schedule[team]['schedule'].append(game)
+        i = len(self.schedule[team]['schedule']) - 1
+        if game.get('id'):
+            self.games.setdefault(str(game['id']), {})[team] = i
+            self.ids.setdefault(team, set()).add(str(game['id']))
+        return i
+
+    def opponent_slot(self, team, i):
+        """Return the slot of the same game in the opponent's schedule, or None if the opponent doesn't have it."""
+        game = self.schedule[team]['schedule'][i]
+        opponent = game['opponent']
+        if game.get('id'):
+            # an indexed game is only ever matched by its id: teams can meet twice in a season (e.g. again in a
+            # conference championship), and a name match could pick the other game
+            return self.find(game['id'], opponent)
+        # games without an id fall back to matching on the opponent's name, and the date when there is a rematch
+        try:
+            games = self.schedule[opponent]['schedule']
+        except KeyError:
+            return None
+        matches = [j for j, x in enumerate(games) if x['opponent'] == team]
+        for j in matches:
+            if games[j].get('startDate') == game.get('startDate'):
+                return j
+        return matches[0] if matches else None
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from ratings import RatingIndex
+
+
+class RenderManifest:
+    # Records, for every output file, a hash of the inputs it was drawn from: the schedule entries and ratings of
+    # the teams on the graph, their opponents' ratings, the render options (week, scale, old, ...) and, when logos are
+    # linked from a directory, that directory and the contents of every logo file the graph links. A graph whose inputs
+    # hash to the same value as last time is up to date and doesn't need to be drawn again.
+
+    def __init__(self, file=os.path.join('svg output', 'render manifest.json')):
+        self.file = file
+        try:
+            with open(file, 'r', encoding='utf8') as infile:
+                self.entries = json.load(infile)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def digest(schedule, teams, logo_dir=None, now=None, **options):
+        """Return the hash of everything a graph of the teams given depends on ('now' is for testing)."""
+        inputs = {'options': options, 'teams': {}, 'opponents': {}, 'played': {}, 'logo_dir': logo_dir, 'logos': {}}
+        for team in teams:
+            entry = schedule[team]
+            # games flip to their final score on their start date (the same cutoff Team and Season use), even if
+            # nothing else changed
+            inputs['played'][team] = len([x for x in entry['schedule'] if RatingIndex.played(x['startDate'], now)])
+            inputs['teams'][team] = {key: entry.get(key) for key in ('conference', 'division', 'schedule', 'sp+',
+                                                                     'primaryColor', 'secondaryColor', 'color')}
+            inputs['teams'][team]['logoURI'] = hashlib.sha1(str(entry.get('logoURI')).encode()).hexdigest()
+            for game in entry['schedule']:
+                opponent = game['opponent']
+                if opponent not in schedule:
+                    continue
+                if opponent not in inputs['opponents']:
+                    inputs['opponents'][opponent] = {
+                        'sp+': schedule[opponent]['sp+'],
+                        'logoURI': hashlib.sha1(str(schedule[opponent].get('logoURI')).encode()).hexdigest(),
+                        'games': []}
+                # the opponent's side of the game carries the points against
+                inputs['opponents'][opponent]['games'].extend(
+                    x for x in schedule[opponent]['schedule'] if x.get('id') == game.get('id'))
+
+        if logo_dir:
+            for name in set(inputs['teams']) | set(inputs['opponents']):
+                inputs['logos'][name] = RenderManifest.logo_digest(logo_dir, name)
+
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def logo_digest(logo_dir, name):
+        """Return the hash of the logo file a graph links for the team (see Graph.get_image_href), or None."""
+        for ext in ('.png', '.jpg'):
+            try:
+                stat = os.stat(os.path.join(logo_dir, name + ext))
+            except OSError:
+                continue
+            return ext + ':' + RenderManifest.file_digest(os.path.join(logo_dir, name + ext), stat.st_size,
+                                                          stat.st_mtime_ns)
+        return None
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def file_digest(file, size, mtime):
+        # keyed on the size and modification time too, so each logo is read once per version rather than once per graph
+        with open(file, 'rb') as infile:
+            return hashlib.sha1(infile.read()).hexdigest()
+
+    def is_current(self, path, digest):
+        return self.entries.get(path) == digest and os.path.exists(path)
+
+    def record(self, path, digest):
+        self.entries[path] = digest
+
+    def save(self):
+        if os.path.dirname(self.file) and not os.path.exists(os.path.dirname(self.file)):
+            os.makedirs(os.path.dirname(self.file))
+        with open(self.file, 'w+', encoding='utf8') as outfile:
+            json.dump(self.entries, outfile, indent=4, sort_keys=True)
@@ -0,0 +1,189 @@
+from datetime import date
+
+import numpy as np
+from ratings import RatingIndex
+from winprob import WinProbability
+
+# Dates are proleptic Gregorian ordinals, well below this, so (team, date) pairs pack into one sortable integer
+DATE_SPAN = 10 ** 7
+
+
+class GameRecord:
+    # One team's side of one game. Teams are integer ids into Season.names.
+    __slots__ = ('id', 'team', 'opponent', 'home', 'date', 'winner', 'canceled', 'points_for', 'points_against')
+
+    def __init__(self, id, team, opponent, home, date, winner, canceled, points_for, points_against=0):
+        self.id = id
+        self.team = team
+        self.opponent = opponent
+        self.home = home
+        self.date = date
+        self.winner = winner
+        self.canceled = canceled
+        self.points_for = points_for
+        self.points_against = points_against
+
+
+class TeamRecord:
+    __slots__ = ('id', 'name', 'conference', 'division', 'games', 'rating_keys', 'rating_dates', 'rating_values')
+
+    def __init__(self, id, name, conference, division):
+        self.id = id
+        self.name = name
+        self.conference = conference
+        self.division = division
+        self.games = []
+        self.rating_keys = []
+        self.rating_dates = []
+        self.rating_values = []
+
+
+class Season:
+    # A normalized, integer-id view of a season. Team names are interned to ids, games are slotted records with the
+    # opponent, home/away, date, result and score stored inline, and the hot fields are mirrored into parallel NumPy
+    # arrays so the per-game probability loops can run as array operations.
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.teams = []
+        self.games = []
+        self.arrays = None
+
+    def intern(self, name, conference=None, division='none'):
+        """Return the integer id for a team name, adding the team if it's new."""
+        try:
+            return self.ids[name]
+        except KeyError:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.teams.append(TeamRecord(self.ids[name], name, conference, division))
+            self.arrays = None
+            return self.ids[name]
+
+    @staticmethod
+    def from_schedule(schedule):
+        """Build a Season from a schedule in the existing JSON layout."""
+        season = Season()
+        for name in schedule:
+            season.intern(name, schedule[name]['conference'], schedule[name].get('division', 'none'))
+
+        by_id = {}
+        for name in schedule:
+            team = season.teams[season.ids[name]]
+            for key in sorted(schedule[name]['sp+'], key=RatingIndex.ordinal):
+                team.rating_keys.append(key)
+                team.rating_dates.append(RatingIndex.ordinal(key))
+                team.rating_values.append(schedule[name]['sp+'][key])
+
+            for g in schedule[name]['schedule']:
+                game = GameRecord(id=g.get('id'),
+                                  team=team.id,
+                                  opponent=season.ids.get(g['opponent'], -1),
+                                  home=g['home-away'] == 'home',
+                                  date=RatingIndex.ordinal(g['startDate']),
+                                  winner=g.get('winner') == 'true',
+                                  canceled=g.get('canceled') == 'true',
+                                  points_for=Season.points(g.get('scoreBreakdown')))
+                team.games.append(len(season.games))
+                season.games.append(game)
+                by_id.setdefault(game.id, []).append(game)
+
+        # the points against are the other side's points for
+        for pair in by_id.values():
+            if len(pair) == 2:
+                pair[0].points_against, pair[1].points_against = pair[1].points_for, pair[0].points_for
+
+        return season
+
+    @staticmethod
+    def points(breakdown):
+        """Return the total of a scoreBreakdown; one that doesn't parse (update_from_NCAA keeps those as they came)
+        counts as no points rather than failing the whole season."""
+        try:
+            return sum(int(x) if x != '' else 0 for x in breakdown or [])
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def from_store(store):
+        """Build a Season straight from the columns of a SeasonStore, without going through the JSON layout."""
+        season = Season()
+        for meta in store.teams:
+            season.intern(meta['name'], meta.get('conference'), meta.get('division', 'none'))
+
+        opponent, home = store['game_opponent'].tolist(), store['game_home'].tolist()
+        dates, ids = store['game_date'].tolist(), store['game_id'].tolist()
+        winner, canceled = store['game_winner'].tolist(), store['game_canceled'].tolist()
+        score, score_offsets = store['score'].tolist(), store['score_offsets'].tolist()
+
+        by_id = {}
+        for team in season.teams:
+            ordinals, values = store.ratings(team.id)
+            team.rating_dates = ordinals.tolist()
+            team.rating_values = values.tolist()
+            team.rating_keys = [date.fromordinal(x).strftime('%Y-%m-%d') for x in team.rating_dates]
+
+            rows = store.games(team.id)
+            for k in range(rows.start, rows.stop):
+                game = GameRecord(id=ids[k], team=team.id, opponent=opponent[k], home=home[k] == 1, date=dates[k],
+                                  winner=winner[k] == 1, canceled=canceled[k] == 1,
+                                  points_for=sum(score[score_offsets[k]:score_offsets[k + 1]]))
+                team.games.append(len(season.games))
+                season.games.append(game)
+                by_id.setdefault(game.id, []).append(game)
+
+        for pair in by_id.values():
+            if len(pair) == 2:
+                pair[0].points_against, pair[1].points_against = pair[1].points_for, pair[0].points_for
+
+        return season
+
+    def get_arrays(self):
+        """Return the parallel game and rating arrays, building them the first time they're needed."""
+        if self.arrays is None:
+            ratings = [(t.id, d, v) for t in self.teams for d, v in zip(t.rating_dates, t.rating_values)]
+            self.arrays = {
+                'team': np.array([x.team for x in self.games], dtype=np.int32),
+                'opponent': np.array([x.opponent for x in self.games], dtype=np.int32),
+                'home': np.array([x.home for x in self.games], dtype=bool),
+                'date': np.array([x.date for x in self.games], dtype=np.int64),
+                'winner': np.array([x.winner for x in self.games], dtype=bool),
+                # ratings sorted by (team, date), packed into one key for searchsorted
+                'rating_key': np.array([t * DATE_SPAN + d for t, d, v in ratings], dtype=np.int64),
+                'rating_value': np.array([v for t, d, v in ratings], dtype=np.float64),
+                'rating_team': np.array([t for t, d, v in ratings], dtype=np.int64),
+            }
+        return self.arrays
+
+    def ratings_at(self, teams, on_or_before):
+        """Return each team's most recent rating on or before the date given, for an array of team ids."""
+        arrays = self.get_arrays()
+        teams = np.asarray(teams, dtype=np.int64)
+        if (teams < 0).any():
+            raise KeyError('opponent is not in the season')
+        i = np.searchsorted(arrays['rating_key'], teams * DATE_SPAN + RatingIndex.ordinal(on_or_before),
+                            side='right') - 1
+        if (i < 0).any() or (arrays['rating_team'][np.maximum(i, 0)] != teams).any():
+            raise ValueError('no rating on or before {}'.format(on_or_before))
+        return arrays['rating_value'][i]
+
+    def win_probabilities(self, team, now=None, home_advantage=None, stdev=None):
+        """Return {rating date: [win probability per game]} for the team, the same table Team builds."""
+        arrays = self.get_arrays()
+        record = self.teams[self.ids[team] if isinstance(team, str) else team]
+        games = np.array(record.games, dtype=np.int64)
+        home = arrays['home'][games]
+        starts = arrays['date'][games]
+
+        # a game that already started is decided: 100% if it was won, 0% otherwise
+        played = starts <= RatingIndex.today(now)
+        outcome = arrays['winner'][games].astype(np.float64)
+
+        result = {}
+        for key, d, value in zip(record.rating_keys, record.rating_dates, record.rating_values):
+            osp = self.ratings_at(arrays['opponent'][games], d)
+            p = WinProbability.batch(value, osp, home, home_advantage=home_advantage, stdev=stdev)
+            decided = played & (starts <= d)
+            result[key] = np.where(decided, outcome, p).tolist()
+        return result
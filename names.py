@@ -0,0 +1,197 @@
+import json
+import re
+import time
+from functools import lru_cache
+
+# State and other abbreviations the data sources use inside team names, replaced as whole tokens
+ABBREVIATIONS = {
+    '&': '',
+    'ak': 'alaska',
+    'al': 'alabama',
+    'ar': 'arkansas',
+    'as': 'american samoa',
+    'az': 'arizona',
+    'ca': 'california',
+    'caro': 'carolina',
+    'co': 'colorado',
+    'ct': 'connecticut',
+    'conn': 'connecticut',
+    'dc': 'district of columbia',
+    'de': 'delaware',
+    'fl': 'florida',
+    '(fla.)': '',
+    'ga': 'georgia',
+    'gu': 'guam',
+    'hi': 'hawaii',
+    'ia': 'iowa',
+    'id': 'idaho',
+    'il': 'illinois',
+    'ill': 'illinois',
+    'in': 'indiana',
+    'ks': 'kansas',
+    'ky': 'kentucky',
+    'la': 'louisiana',
+    'ma': 'massachusetts',
+    'md': 'maryland',
+    'me': 'maine',
+    'mi': 'michigan',
+    'miss': 'mississippi',
+    'mn': 'minnesota',
+    'mo': 'missouri',
+    'mp': 'northern mariana islands',
+    'ms': 'mississippi',
+    'mt': 'montana',
+    'na': 'national',
+    'nc': 'north carolina',
+    'nd': 'north dakota',
+    'ne': 'nebraska',
+    'nh': 'new hampshire',
+    'nj': 'new jersey',
+    'nm': 'new mexico',
+    'n.m.': 'new mexico',
+    'nv': 'nevada',
+    'ny': 'new york',
+    'oh': 'ohio',
+    'ok': 'oklahoma',
+    'or': 'oregon',
+    'pa': 'pennsylvania',
+    'pr': 'puerto rico',
+    'ri': 'rhode island',
+    'sc': 'south carolina',
+    'sd': 'south dakota',
+    'st': 'state',
+    'tn': 'tennessee',
+    'tenn': 'tennessee',
+    'tx': 'texas',
+    'univ': '',
+    'ut': 'utah',
+    'va': 'virginia',
+    'vi': 'virgin islands',
+    'vt': 'vermont',
+    'wa': 'washington',
+    'wi': 'wisconsin',
+    'wv': 'west virginia',
+    'wy': 'wyoming',
+    's': 'south',
+    'se': 'southeastern'
+}
+
+# Cleaned spellings that still don't match the schedule's key for the team, by source
+ALIASES = {
+    # AP
+    'brigham young': 'byu',
+    'mississippi': 'ole miss',
+    # NCAA
+    'army west point': 'army',
+    'massachusetts': 'umass',
+    'southern california': 'usc',
+    # S&P+
+    'central florida': 'ucf',
+    'louisiana state': 'lsu',
+    'southern methodist': 'smu',
+    'texas christian': 'tcu',
+    'alabama birmingham': 'uab',
+    'texas el paso': 'utep',
+    'nevada las vegas': 'unlv',
+    'louisiana lafayette': 'louisiana',
+}
+
+
+def _boundary(token):
+    # tokens that start or end with punctuation ('&', '(fla.)', 'n.m.') can't use \b on that side
+    return '{}{}{}'.format(r'\b' if re.match(r'\w', token[0]) else '', re.escape(token),
+                           r'\b' if re.match(r'\w', token[-1]) else '')
+
+
+# One alternation over every abbreviation, longest first so e.g. 'n.m.' wins over anything shorter
+_TOKENS = re.compile('|'.join(_boundary(x) for x in sorted(ABBREVIATIONS, key=len, reverse=True)))
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_SPACES = re.compile(' +')
+
+
+@lru_cache(maxsize=8192)
+def clean(name):
+    """Return the standardized spelling of a team name: lower case, abbreviations expanded, punctuation dropped."""
+    result = _TOKENS.sub(lambda m: ABBREVIATIONS[m.group(0)], name.lower())
+    result = _PUNCTUATION.sub(' ', result)
+    return _SPACES.sub(' ', result).strip()
+
+
+class TeamNames:
+    # Resolves any source's spelling of a team (NCAA, S&P+, AP, Coaches...) to the team's key in the schedule. A name
+    # is cleaned, then looked up in one table holding the cleaned schedule keys, the cleaned NCAA 'nameRaw' of every
+    # team and the alias table. Resolved names are remembered.
+
+    def __init__(self, schedule, aliases=None):
+        self.schedule = schedule
+        self.table = {}
+        self.resolved = {}
+        for team in schedule:
+            self.table[clean(team)] = team
+            if schedule[team].get('nameRaw'):
+                self.table[clean(schedule[team]['nameRaw'])] = team
+        for alias, team in (aliases if aliases is not None else ALIASES).items():
+            self.add(alias, team)
+
+    def add(self, alias, team):
+        """Teach the table another spelling of a team; aliases for teams not in the schedule are ignored."""
+        if team in self.schedule:
+            self.table[clean(alias)] = team
+            self.resolved = {}
+
+    def resolve(self, name):
+        """Return the schedule key for a team name from any source, or None."""
+        try:
+            return self.resolved[name]
+        except KeyError:
+            self.resolved[name] = self.table.get(clean(name))
+            return self.resolved[name]
+
+    @staticmethod
+    def benchmark(file='NCAA Full Schedule Pull.json', repeat=20, status=True):
+        """Time the one-pass cleaner against the old one-regex-per-abbreviation loop over every NCAA name in file.
+
+        The old loop runs on its own table, typo included, so the names it spells differently are exactly the ones
+        whose cleaned form changed. On the 2018 pull those are the 'nc' names ('NC State', 'nc-at', 'nc-central'),
+        which no longer pick up the typo, and three the old loop mangled by treating '(fla.)' and 'n.m.' as regexes:
+        'Miami (Fla.)' is now 'miami' (was 'miami fla'), 'Western N.M.' is 'western new mexico' (was 'western n m')
+        and 'fla-atlantic' is 'fla atlantic' (was 'atlantic').
+
+        Returns (names, old seconds, new seconds, [(name, old, new)] for names the two spell differently)."""
+        with open(file, 'r', encoding='utf8') as infile:
+            games = json.load(infile)
+        names = sorted({game[side][x] for game in games for side in ('home', 'away') for x in ('nameRaw', 'nameSeo')})
+        abbrv = dict(ABBREVIATIONS, nc='north caroli;na')
+
+        def old(name):
+            result = name.lower()
+            for x in abbrv:
+                result = re.sub(r'\b%s\b' % x, abbrv[x], result)
+            result = re.sub(r'[^\w\s]', ' ', result).lower().strip()
+            return re.sub(' +', ' ', result).strip()
+
+        start_time = time.perf_counter()
+        for i in range(repeat):
+            expected = [old(x) for x in names]
+        old_time = (time.perf_counter() - start_time) / repeat
+
+        start_time = time.perf_counter()
+        for i in range(repeat):
+            clean.cache_clear()
+            result = [clean(x) for x in names]
+        new_time = (time.perf_counter() - start_time) / repeat
+
+        start_time = time.perf_counter()
+        for i in range(repeat):
+            cached = [clean(x) for x in names]
+        cached_time = (time.perf_counter() - start_time) / repeat
+
+        differ = [(x, a, b) for x, a, b in zip(names, expected, result) if a != b]
+        if status:
+            print('{} names'.format(len(names)))
+            print('regex per abbreviation: {:.2f} ms'.format(1000 * old_time))
+            print('one pass:               {:.2f} ms'.format(1000 * new_time))
+            print('one pass, cached:       {:.2f} ms'.format(1000 * cached_time))
+            for x in differ:
+                print('{!r}: {!r} -> {!r}'.format(*x))
+        return names, old_time, new_time, differ
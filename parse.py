@@ -0,0 +1,99 @@
+import json
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup as bs
+from bs4 import SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    FEATURES = 'lxml'
+except ImportError:
+    FEATURES = 'html.parser'
+
+
+class Parser:
+    # One place for the scrapers to turn a page into a tree. Each page is parsed once, with the fastest backend that
+    # is installed, and only the elements the scraper reads are built (SoupStrainer); everything else on the page is
+    # skipped by the tokenizer instead of being turned into Tags.
+    #
+    #   ap poll        the poll page: release date and voter menu
+    #   ap ballot      one AP voter's ballot: outlet, ballot table, or the no-poll-found notice
+    #   coaches poll   the USA Today ballots page: release date, coach key and ranked team names
+    #   coaches team   the USA Today page for one team: who ranked it and where
+    #   sp+            the Football Outsiders S&P+ table
+    #   links          every link on the page (logos, github listings)
+    targets = {
+        'ap poll': SoupStrainer('div'),
+        'ap ballot': SoupStrainer(['div', 'p', 'table']),
+        'coaches poll': SoupStrainer(['span', 'tr']),
+        'coaches team': SoupStrainer('tr', {'class': re.compile(r'ballot-ranking-row*')}),
+        'sp+': SoupStrainer('tr'),
+        'links': SoupStrainer('a'),
+    }
+
+    # how the benchmark tells which target a cached page belongs to
+    urls = (
+        (re.compile(r'collegefootball\.ap\.org/poll/'), 'ap poll'),
+        (re.compile(r'collegefootball\.ap\.org/'), 'ap ballot'),
+        (re.compile(r'usatoday\.com/.*/ballots/.*/schools/'), 'coaches team'),
+        (re.compile(r'usatoday\.com/.*/ballots/'), 'coaches poll'),
+        (re.compile(r'footballoutsiders\.com/'), 'sp+'),
+        (re.compile(r'espn\.com/|github\.com/'), 'links'),
+    )
+
+    @staticmethod
+    def parse(text, target=None, features=None):
+        """Return the tree of a page, restricted to the elements of the named target if one is given."""
+        return bs(text, features=features if features else FEATURES,
+                  parse_only=Parser.targets[target] if target else None)
+
+    @staticmethod
+    def target_for(url):
+        for pattern, target in Parser.urls:
+            if pattern.search(url):
+                return target
+        return None
+
+    @staticmethod
+    def benchmark(path='http cache', repeat=5, status=True):
+        """Time a full html.parser parse against the targeted parse for every saved page under 'path'.
+
+        'path' is either the HTTP cache, whose pages are matched to a target by their URL, or a directory of
+        '<target> - <anything>.html' files. Returns {file: (target, full seconds, targeted seconds)}."""
+        pages = []
+        for file in sorted(os.listdir(path)):
+            if file.endswith('.body'):
+                with open(os.path.join(path, file[:-5] + '.json'), 'r', encoding='utf8') as infile:
+                    target = Parser.target_for(json.load(infile)['url'])
+            elif file.endswith('.html'):
+                target = file.split(' - ')[0]
+            else:
+                continue
+            if target in Parser.targets:
+                with open(os.path.join(path, file), 'rb') as infile:
+                    pages.append((file, target, infile.read().decode('utf8', 'replace')))
+
+        result = {}
+        for file, target, text in pages:
+            timings = []
+            for features, only in (('html.parser', None), (FEATURES, target)):
+                start_time = time.perf_counter()
+                for i in range(repeat):
+                    Parser.parse(text, only, features)
+                timings.append((time.perf_counter() - start_time) / repeat)
+            result[file] = (target, timings[0], timings[1])
+
+        if status:
+            print('backend: {}'.format(FEATURES))
+            for file in result:
+                target, full, targeted = result[file]
+                print('{:<14} {:>9.2f} ms {:>9.2f} ms {:>6.1f}x  {}'.format(target, 1000 * full, 1000 * targeted,
+                                                                         full / targeted, file))
+            if result:
+                full, targeted = sum(x[1] for x in result.values()), sum(x[2] for x in result.values())
+                print('{:<14} {:>9.2f} ms {:>9.2f} ms {:>6.1f}x'.format('total', 1000 * full, 1000 * targeted,
+                                                                        full / targeted))
+
+        return result
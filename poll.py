@@ -1,14 +1,12 @@
 import csv
 import json
+import os
 import re
 import time
 from datetime import datetime
-from random import randint
 
-import requests
-from bs4 import BeautifulSoup as bs
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from fetch import Fetcher
+from parse import Parser
 
 
 class Poll(object):
@@ -109,22 +107,8 @@ class Poll(object):
             return None
 
     def scrape(self, url=None, retries=10):
-        # Local solution to retrying after timeout or errors
-        def requests_retry_session(retries=retries, backoff_factor=0.3, status_forcelist=(500, 502, 504), session=None):
-            session = session or requests.Session()
-            retry = Retry(
-                total=retries,
-                read=retries,
-                connect=retries,
-                backoff_factor=backoff_factor,
-                status_forcelist=status_forcelist,
-            )
-            adapter = HTTPAdapter(max_retries=retry)
-            session.mount('http://', adapter)
-            session.mount('https://', adapter)
-            return session
-
-        return requests_retry_session().get(url)
+        # All scrapers share pooled, retrying clients (one per retry setting) with an on-disk conditional-GET cache
+        return Fetcher.shared(retries=retries).get(url)
 
     def table_csv(self, file=None, transpose=False):
         with open(file, 'w+', newline='') as outfile:
@@ -159,7 +143,49 @@ class APPoll(Poll):
 
         super().json_out(file)
 
-    def scrape(self, url='https://collegefootball.ap.org/poll', status=False, full=True):
+    @staticmethod
+    def backfill(year=2018, weeks=range(1, 16), status=False, workers=4, rate=2.0, save=True):
+        """Scrape a run of weeks, sharing one rate limit across the whole season, and return the polls."""
+        polls = []
+        with Fetcher(workers=workers, rate=rate, cache=Fetcher.shared().cache) as fetcher:
+            for week in weeks:
+                poll = APPoll(year=year, week=week)
+                poll.scrape(status=status, fetcher=fetcher)
+                if save:
+                    poll.json_out()
+                polls.append(poll)
+        return polls
+
+    @staticmethod
+    def parse_ballot(text):
+        """Return {'outlet': ..., 'rankings': [25 teams]} for a voter's ballot page."""
+        soup = Parser.parse(text, 'ap ballot')
+        skip = soup.find('p', {'class': 'no-poll-found'})
+        if not skip:
+            try:
+                outlet = soup.find('div', {'class': 'voter-pub'}).text
+
+                # Find the ballot table
+                table = soup.find('table')
+
+                # get the rows
+                rows = table.findAll('tr', {'class': re.compile('[0-9]*')})
+
+                # Make a length 25 list
+                ballot = {'outlet': outlet, 'rankings': ['' for x in range(0, 25)]}
+
+                for row in rows:
+                    rank = int(row.contents[0].text)
+                    team = row.contents[1].text
+                    team = re.sub(r'\([^)]*\)', '', team).strip()
+                    ballot['rankings'][rank - 1] = team
+                return ballot
+            except AttributeError:
+                pass
+        return {'outlet': None, 'rankings': [None for x in range(0, 25)]}
+
+    def scrape(self, url='https://collegefootball.ap.org/poll', status=False, full=True, workers=4, rate=2.0,
+               checkpoint=None, fetcher=None):
         start_time = time.monotonic()
 
         # the AP records all 2018 seasons as "2019"
@@ -170,9 +196,12 @@ class APPoll(Poll):
         url = '/'.join([url, str(year), str(self.week)])
 
         r = super().scrape(url=url)
+        # an error page has no poll on it; fail here rather than on a missing element further down
+        r.raise_for_status()
+        page = Parser.parse(r.text, 'ap poll')
 
         # record the publishing date
-        date = bs(r.text, features='html.parser').find('div', {'id': 'poll-released'}).text.split(' ')[-2:]
+        date = page.find('div', {'id': 'poll-released'}).text.split(' ')[-2:]
         self.date = datetime.strptime(' '.join(date), '%b %d')
         if self.date.month < 8:
             self.date = self.date.replace(year=year)
@@ -181,7 +210,7 @@ class APPoll(Poll):
         self.ballots['date'] = self.date.strftime('%A %x').replace('/', '-')
 
         # Find the voter menu
-        links = bs(r.text, features='html.parser').find('div', {'class': 'voter-menu filter-menu clearfix'})
+        links = page.find('div', {'class': 'voter-menu filter-menu clearfix'})
 
         # get the links
         links = links.findAll({'a': 'href'})
@@ -190,36 +219,42 @@ class APPoll(Poll):
         voters = {x.contents[0]: 'https://collegefootball.ap.org/' + x['href'] + '/{}/{}'.format(year, self.week)
                   for x in links}
 
-        self.ballots['voters'] = {}
-
-        for v in voters:
-            time.sleep(randint(1, 100) / 100)
-            r = super().scrape(voters[v])
-
-            soup = bs(r.text, features='html.parser')
-            skip = soup.find('p', {'class': 'no-poll-found'})
-            if not skip:
-                try:
-                    outlet = soup.find('div', {'class': 'voter-pub'}).text
-
-                    # Find the ballot table
-                    table = soup.find('table')
-
-                    # get the rows
-                    rows = table.findAll('tr', {'class': re.compile('[0-9]*')})
-
-                    # Make a length 25 list
-                    self.ballots['voters'][v] = {'outlet': outlet, 'rankings': ['' for x in range(0, 25)]}
-
-                    for row in rows:
-                        rank = int(row.contents[0].text)
-                        team = row.contents[1].text
-                        team = re.sub(r'\([^)]*\)', '', team).strip()
-                        self.ballots['voters'][v]['rankings'][rank - 1] = team
-                except AttributeError:
-                    self.ballots['voters'][v] = {'outlet': None, 'rankings': [None for x in range(0, 25)]}
-            else:
-                self.ballots['voters'][v] = {'outlet': None, 'rankings': [None for x in range(0, 25)]}
+        # Voters already scraped by an earlier, interrupted run are picked up from the checkpoint
+        if not checkpoint:
+            checkpoint = ' '.join([str(self.year), 'Week', str(self.week), 'AP Poll checkpoint.json'])
+        try:
+            with open(checkpoint, 'r') as infile:
+                done = json.load(infile)
+        except (OSError, ValueError):
+            done = {}
+
+        # Fetch the remaining ballots concurrently; the token bucket keeps the overall request rate polite. A client
+        # made here is closed here; one passed in (e.g. by backfill) belongs to the caller
+        own = fetcher is None
+        if own:
+            fetcher = Fetcher(workers=workers, rate=rate, cache=Fetcher.shared().cache)
+        urls = {voters[v]: v for v in voters if v not in done}
+        failed = []
+        try:
+            for link, r, error in fetcher.fetch_all(urls):
+                # an error page would parse as an empty ballot and be checkpointed as done; leave it for the rerun
+                if error or not r.ok:
+                    failed.append(urls[link])
+                    continue
+                done[urls[link]] = APPoll.parse_ballot(r.text)
+                with open(checkpoint, 'w+') as outfile:
+                    json.dump(done, outfile)
+        finally:
+            if own:
+                fetcher.close()
+
+        if failed:
+            raise RuntimeError('could not fetch the ballots of {}; rerun to resume from {}'.format(
+                ', '.join(failed), checkpoint))
+
+        self.ballots['voters'] = {v: done[v] for v in voters}
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
 
         self.calculate_ranks()
         if status:
@@ -248,12 +283,24 @@ class CoachesPoll(Poll):
 
         super().json_out(file)
 
-    def scrape(self, url='https://www.usatoday.com/sports/ncaaf/ballots/', status=False):
+    @staticmethod
+    def parse_team_page(text):
+        """Return [(coach, rank)] for every coach who ranked the team on its ballot page."""
+        # The structure of these data are to give us the team, then who voted for them. We'll work backwards.
+        rows = Parser.parse(text, 'coaches team').findAll('tr')
+        return [(row.contents[1].text.strip(), int(row.contents[5].text.strip())) for row in rows]
+
+    def add_votes(self, team, votes):
+        for coach, rank in votes:
+            self.ballots['voters'][coach]['rankings'][rank - 1] = team
+
+    def scrape(self, url='https://www.usatoday.com/sports/ncaaf/ballots/', status=False, workers=8):
         start_time = time.monotonic()
 
         r = super().scrape(url='/'.join([url, 'coaches', self.year.__str__(), '%02d'.format(self.week.__str__())]))
+        r.raise_for_status()
 
-        page = bs(r.text, features='html.parser')
+        page = Parser.parse(r.text, 'coaches poll')
 
         # Get the published date
         date = page.find('span', {'class': 'ncaaf-ballots'}).text.split()[-1][:-1]
@@ -272,24 +319,19 @@ class CoachesPoll(Poll):
                 [url, 'schools', self.year.__str__(), self.week.__str__(), '-'.join(x.text.split()).lower()]) for x in
             names}
 
-        for team in teams:
-            r = super().scrape(teams[team])
-
-            # Find the ballot table
-            rows = bs(r.text, features='html.parser').findAll('tr',
-                                                              {'class': re.compile(r'ballot-ranking-row*')})
-
-            # The structure of these data are to give us the team, then who voted for them. We'll work backwards.
-            for row in rows:
-                coach = row.contents[1].text.strip()
-                rank = int(row.contents[5].text.strip())
-                self.ballots['voters'][coach]['rankings'].append([team, rank])
-
+        # Every ballot starts out empty and is filled in as the team pages land
         for v in self.ballots['voters']:
-            l = ['' for x in range(0, 25)]
-            for x in sorted(self.ballots['voters'][v]['rankings'], key=lambda x: x[1]):
-                l[x[1] - 1] = x[0]
-            self.ballots['voters'][v]['rankings'] = l
+            self.ballots['voters'][v]['rankings'] = ['' for x in range(0, 25)]
+
+        # The team pages are fetched on the client's thread pool and parsed here as they land; each page is small, so
+        # parsing one overlaps with the pool downloading the next
+        urls = {teams[x]: x for x in teams}
+        with Fetcher(workers=workers, cache=Fetcher.shared().cache) as fetcher:
+            for link, r, error in fetcher.fetch_all(urls):
+                if error:
+                    raise error
+                r.raise_for_status()
+                self.add_votes(urls[link], CoachesPoll.parse_team_page(r.text))
 
         if status:
             print("{} Week {} Complete!".format(self.year, self.week), end='\n')
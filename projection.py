@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class Projection:
+    # Batched Poisson-binomial win total engine. Every method works on a 'teams' x 'games' matrix of single game
+    # win probabilities so a whole conference (or all of FBS) is projected in one pass instead of team by team.
+
+    @staticmethod
+    def pad(rows):
+        """Return (matrix, lengths) for a ragged list of win probability vectors.
+
+        Short schedules are padded with 0.0, i.e. certain losses, which leaves the win distribution unchanged.
+        """
+        lengths = np.array([len(x) for x in rows], dtype=np.intp)
+        matrix = np.zeros((len(rows), lengths.max() if len(rows) else 0), dtype=np.float64)
+        for i, x in enumerate(rows):
+            matrix[i, :lengths[i]] = x
+        return matrix, lengths
+
+    @staticmethod
+    def win_distributions(win_probs):
+        """Return the cumulative 'teams' x 'games' x 'wins' table for a 'teams' x 'games' matrix.
+
+        table[t, i, j] is the probability that team t has exactly j wins after its first i + 1 games.
+        """
+        win_probs = np.atleast_2d(np.asarray(win_probs, dtype=np.float64))
+        teams, games = win_probs.shape
+        table = np.zeros((teams, games, games + 1), dtype=np.float64)
+
+        dist = np.zeros((teams, games + 1), dtype=np.float64)
+        dist[:, 0] = 1.0
+        for i in range(games):
+            p = win_probs[:, i, np.newaxis]
+            nxt = dist * (1 - p)  # newest game was a loss
+            nxt[:, 1:] += dist[:, :-1] * p  # newest game was a win
+            dist = nxt
+            table[:, i, :] = dist
+
+        return table
+
+    @staticmethod
+    def final_win_totals(rows):
+        """Return the season-end win distribution of every team in a ragged list of win probability vectors."""
+        matrix, lengths = Projection.pad(rows)
+        if not matrix.shape[1]:
+            # no games at all: zero wins for certain
+            return [[1.0] for i in range(len(lengths))]
+        table = Projection.win_distributions(matrix)
+        return [list(table[i, -1, :lengths[i] + 1]) for i in range(len(lengths))]
+
+    @staticmethod
+    def ragged(table, games=None):
+        """Return the ragged 'games' x 'wins' list view of a single team's cumulative table."""
+        if games is None:
+            games = table.shape[0]
+        return [list(table[i, :i + 2]) for i in range(games)]
+
+    @staticmethod
+    def joint_distributions(win_probs, flags):
+        """Return the season-end 'teams' x 'wins' x 'flagged wins' table for a 'teams' x 'games' matrix.
+
+        flags is a boolean matrix of the same shape marking the games counted on the second axis (e.g. conference
+        games); table[t, w, c] is the probability that team t finishes with w wins, c of them in flagged games.
+        """
+        win_probs = np.atleast_2d(np.asarray(win_probs, dtype=np.float64))
+        flags = np.atleast_2d(np.asarray(flags, dtype=bool))
+        teams, games = win_probs.shape
+        conference = int(flags.sum(axis=1).max()) if teams else 0
+
+        dist = np.zeros((teams, games + 1, conference + 1), dtype=np.float64)
+        dist[:, 0, 0] = 1.0
+        for i in range(games):
+            p = win_probs[:, i, np.newaxis, np.newaxis]
+            flagged = flags[:, i, np.newaxis, np.newaxis]
+            nxt = dist * (1 - p)  # newest game was a loss
+            win = dist[:, :-1, :] * p  # newest game was a win: one more win, and one more flagged win if flagged
+            nxt[:, 1:, :] += np.where(flagged, 0, win)
+            nxt[:, 1:, 1:] += np.where(flagged, win[:, :, :-1], 0)
+            dist = nxt
+
+        return dist
+
+    @staticmethod
+    def final_joint_totals(rows, flag_rows):
+        """Return the (wins x flagged wins) season-end table of every team in ragged lists of probabilities/flags."""
+        matrix, lengths = Projection.pad(rows)
+        flags = np.zeros(matrix.shape, dtype=bool)
+        for i, x in enumerate(flag_rows):
+            flags[i, :len(x)] = x
+        table = Projection.joint_distributions(matrix, flags)
+        return [table[i, :lengths[i] + 1, :int(flags[i].sum()) + 1] for i in range(len(lengths))]
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import PIPE, Popen
+
+# Command line templates for the SVG rasterizers we know how to drive, in order of preference
+CONVERTERS = (('rsvg-convert', ['rsvg-convert', '--format', 'png', '--output', '{png}', '{svg}']),
+              ('inkscape', ['inkscape', '--export-type=png', '--export-filename={png}', '{svg}']),
+              ('magick', ['magick', 'convert', '{svg}', '{png}']))
+
+
+class Rasterizer:
+    # Converts the SVGs under 'svg output/' into the matching PNGs under 'png output/' using an external tool.
+    # A manifest of SVG content hashes is kept next to the PNGs so unchanged graphs are skipped on the next run.
+    # The conversions are separate processes, so a thread pool is enough to keep every core busy.
+
+    def __init__(self, svg_root='svg output', png_root='png output', command=None, workers=None):
+        self.svg_root = svg_root
+        self.png_root = png_root
+        self.workers = workers if workers else os.cpu_count()
+        self.manifest_file = os.path.join(png_root, 'raster manifest.json')
+
+        if command:
+            self.command = command
+        else:
+            self.command = None
+            for name, template in CONVERTERS:
+                if shutil.which(name):
+                    self.command = template
+                    break
+
+    @staticmethod
+    def hash_file(path):
+        h = hashlib.sha1()
+        with open(path, 'rb') as infile:
+            for block in iter(lambda: infile.read(1 << 16), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def find_svgs(self):
+        result = []
+        for root, dirs, files in os.walk(self.svg_root):
+            for file in files:
+                if file.endswith('.svg'):
+                    result.append(os.path.relpath(os.path.join(root, file), self.svg_root))
+        return sorted(result)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_file, 'r', encoding='utf8') as infile:
+                return json.load(infile)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest):
+        if not os.path.exists(self.png_root):
+            os.makedirs(self.png_root)
+        with open(self.manifest_file, 'w+', encoding='utf8') as outfile:
+            json.dump(manifest, outfile, indent=4, sort_keys=True)
+
+    def convert(self, svg, png):
+        """Rasterize a single file and return None on success or the error text on failure."""
+        if not os.path.exists(os.path.dirname(png)):
+            os.makedirs(os.path.dirname(png), exist_ok=True)
+        args = [x.format(svg=svg, png=png) for x in self.command]
+        try:
+            process = Popen(args, stdout=PIPE, stderr=PIPE)
+        except OSError as e:
+            return str(e)
+        out, err = process.communicate()
+        if process.returncode != 0:
+            return err.decode(errors='replace').strip() or 'exit code {}'.format(process.returncode)
+        return None
+
+    def run(self, files=None, force=False, status=True):
+        """Rasterize the SVGs given (relative to svg_root), or every SVG found, and return
+        a list of (file, elapsed seconds, error or None) for the files that were converted."""
+        if not self.command:
+            raise RuntimeError('no SVG rasterizer found; install one of: {}'.format(
+                ', '.join(x[0] for x in CONVERTERS)))
+
+        start_time = time.monotonic()
+        manifest = self.load_manifest()
+        files = self.find_svgs() if files is None else files
+
+        todo = []
+        for file in files:
+            svg = os.path.join(self.svg_root, file)
+            png = os.path.join(self.png_root, os.path.splitext(file)[0] + '.png')
+            digest = Rasterizer.hash_file(svg)
+            if not force and manifest.get(file) == digest and os.path.exists(png):
+                continue
+            todo.append((file, svg, png, digest))
+
+        def work(item):
+            start = time.monotonic()
+            error = self.convert(item[1], item[2])
+            return item, time.monotonic() - start, error
+
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for item, elapsed, error in pool.map(work, todo):
+                if error:
+                    print('problem with {}: {}'.format(item[0], error))
+                else:
+                    manifest[item[0]] = item[3]
+                results.append((item[0], elapsed, error))
+
+        self.save_manifest(manifest)
+        if status:
+            print("Rasterized {} of {} files ({} unchanged)".format(
+                len([x for x in results if not x[2]]), len(files), len(files) - len(todo)), end='\n')
+            print("Elapsed time: {} seconds".format(round(time.monotonic() - start_time, 3)), end='\n')
+        return results
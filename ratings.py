@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _parse(value):
+    return datetime.strptime(value, '%Y-%m-%d').toordinal()
+
+
+class RatingIndex:
+    # Every team keeps its rating history as {'%Y-%m-%d': value}. Rather than parsing those keys over and over for
+    # every game, parse each team's history once into sorted ordinal dates and answer "latest rating on or before
+    # date D" with a bisect. Teams are indexed lazily, the first time they're asked for.
+
+    def __init__(self, schedule, method='sp+'):
+        self.schedule = schedule
+        self.method = method
+        self.history = {}
+
+    @staticmethod
+    def ordinal(value):
+        """Return the proleptic Gregorian ordinal for a '%Y-%m-%d' string, a date or a datetime."""
+        if isinstance(value, str):
+            return _parse(value)
+        elif isinstance(value, datetime):
+            return value.date().toordinal()
+        elif isinstance(value, date):
+            return value.toordinal()
+        return int(value)
+
+    @staticmethod
+    def today(now=None):
+        """Return the ordinal of the day games count as played up to, inclusive: today unless 'now' is given."""
+        return RatingIndex.ordinal(now if now else datetime.now())
+
+    @staticmethod
+    def played(start, now=None):
+        """Return whether a game starting on the date given counts as played; it does from its start date on."""
+        return RatingIndex.ordinal(start) <= RatingIndex.today(now)
+
+    def get_history(self, team):
+        """Return (ordinals, keys) for the team's rating dates, both sorted chronologically."""
+        try:
+            return self.history[team]
+        except KeyError:
+            keys = sorted(self.schedule[team][self.method].keys(), key=RatingIndex.ordinal)
+            self.history[team] = ([RatingIndex.ordinal(x) for x in keys], keys)
+            return self.history[team]
+
+    def invalidate(self, team=None):
+        if team is None:
+            self.history = {}
+        else:
+            self.history.pop(team, None)
+
+    def latest_key(self, team, on_or_before=None):
+        """Return the date key of the most recent rating on or before the date given (or the latest overall)."""
+        ordinals, keys = self.get_history(team)
+        if on_or_before is None:
+            i = len(keys)
+        else:
+            i = bisect_right(ordinals, RatingIndex.ordinal(on_or_before))
+        if i == 0:
+            raise ValueError("no {} rating for {} on or before {}".format(self.method, team, on_or_before))
+        return keys[i - 1]
+
+    def latest_key_between(self, team, start, end):
+        """Return the date key of the most recent rating within [start, end]."""
+        ordinals, keys = self.get_history(team)
+        i = bisect_right(ordinals, RatingIndex.ordinal(end))
+        if i == 0 or i <= bisect_left(ordinals, RatingIndex.ordinal(start)):
+            raise ValueError("no {} rating for {} between {} and {}".format(self.method, team, start, end))
+        return keys[i - 1]
+
+    def latest(self, team, on_or_before=None):
+        """Return the team's most recent rating on or before the date given (or the latest overall)."""
+        return self.schedule[team][self.method][self.latest_key(team, on_or_before)]
+
+    def keys_since(self, team, start):
+        """Return the team's rating date keys on or after the date given."""
+        ordinals, keys = self.get_history(team)
+        return keys[bisect_left(ordinals, RatingIndex.ordinal(start)):]
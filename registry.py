@@ -0,0 +1,130 @@
+from collections import OrderedDict
+
+from history import ProjectionHistory
+from model import Season
+from ratings import RatingIndex
+from team import Team
+
+
+class TeamRegistry:
+    # Building a Team computes its win probability vector for every rating date, and the same teams show up in
+    # every conference, cluster and team graph of a render. The registry builds each Team once per rating snapshot
+    # and hands the same object to everyone who asks for it. Callers must treat those Team objects as read-only.
+    #
+    # A team's rating version is cached until its 'sp+' dict is replaced or gains a date; a rating changed in place
+    # must be followed by invalidate(name). The shared registries of the last 'keep' schedules are kept, keyed by id
+    # and checked against the schedule itself, so a season that is done with doesn't stay in memory for good.
+    # Registries standing in for a schedule (see Scenario.registered) are held apart and never push those out.
+    _shared = OrderedDict()
+    _standins = {}
+    keep = 4
+
+    def __init__(self, schedule, season=None, history=None):
+        self.schedule = schedule
+        self.ratings = RatingIndex(schedule)
+        # optional integer-id Season model of the same schedule; Teams built from it skip the per-game dict lookups
+        self.season = None
+        # the (ratings, games) versions of every team at the time the Season was built
+        self.season_versions = {}
+        # name -> (its 'sp+' dict, the dict's size, the version)
+        self.rating_versions = {}
+        if season:
+            self.use_season(season)
+        # projections of every team, kept across weeks (and across runs when the history has a path)
+        self.history = history if history else ProjectionHistory()
+        self.teams = {}
+
+    @staticmethod
+    def shared(schedule):
+        """Return the season-level registry for this schedule, creating it on first use."""
+        registry = TeamRegistry._standins.get(id(schedule))
+        if registry is not None and registry.schedule is schedule:
+            return registry
+
+        registry = TeamRegistry._shared.get(id(schedule))
+        if registry is None or registry.schedule is not schedule:
+            registry = TeamRegistry(schedule)
+        TeamRegistry._shared[id(schedule)] = registry
+        TeamRegistry._shared.move_to_end(id(schedule))
+        while len(TeamRegistry._shared) > TeamRegistry.keep:
+            TeamRegistry._shared.popitem(last=False)
+        return registry
+
+    @staticmethod
+    def register(schedule, registry):
+        """Make registry the one shared() returns for the schedule until release(schedule)."""
+        TeamRegistry._standins[id(schedule)] = registry
+
+    @staticmethod
+    def release(schedule):
+        TeamRegistry._standins.pop(id(schedule), None)
+
+    def use_season(self, season=None):
+        """Build Teams from an integer-id Season model of the schedule (built here if not given)."""
+        self.season = season if season else Season.from_schedule(self.schedule)
+        self.season_versions = {x: (self.rating_version(x), self.games_version(x)) for x in self.schedule}
+
+    def rating_version(self, name):
+        ratings = self.schedule[name]['sp+']
+        cached = self.rating_versions.get(name)
+        if cached is None or cached[0] is not ratings or cached[1] != len(ratings):
+            cached = (ratings, len(ratings), hash(tuple(ratings.items())))
+            self.rating_versions[name] = cached
+        return cached[2]
+
+    def games_version(self, name):
+        return hash(tuple((g.get('id'), g['opponent'], g['home-away'], g['startDate'], g.get('winner'),
+                           g.get('canceled')) for g in self.schedule[name]['schedule']))
+
+    def fingerprint(self, name):
+        """Return a key that changes whenever the team's S&P+, its opponents' S&P+ or its game results change.
+
+        The key is (team's ratings version, team's games version, ((opponent, opponent's ratings version), ...))."""
+        opponents = tuple((x, self.rating_version(x)) for x in sorted({g['opponent'] for g in
+                                                                         self.schedule[name]['schedule']})
+                          if x in self.schedule)
+        return self.rating_version(name), self.games_version(name), opponents
+
+    def season_is_current(self, name, key):
+        """Return whether the Season model still holds what the team's fingerprint covers."""
+        ratings, games, opponents = key
+        return self.season_versions.get(name) == (ratings, games) and \
+            all(self.season_versions.get(x, (None,))[0] == v for x, v in opponents)
+
+    def get(self, name):
+        """Return the shared Team for the name given, rebuilding it only if its inputs changed."""
+        name = name.lower()
+        key = self.fingerprint(name)
+        # the schedule moved underneath the season model; rebuild it once, whether or not the team was cached
+        if self.season and not self.season_is_current(name, key):
+            self.use_season()
+
+        try:
+            cached_key, team = self.teams[name]
+            if cached_key == key:
+                return team
+        except KeyError:
+            pass
+
+        # something moved; drop the rating history of everyone involved before rebuilding
+        self.ratings.invalidate(name)
+        for game in self.schedule[name]['schedule']:
+            self.ratings.invalidate(game['opponent'])
+
+        team = Team(name=name, schedule=self.schedule, ratings=self.ratings, season=self.season, history=self.history)
+        self.teams[name] = (key, team)
+        return team
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.rating_versions = {}
+        else:
+            self.rating_versions.pop(name.lower(), None)
+        # get() rebuilds the Season model once, however many teams were invalidated before it
+        self.season_versions = {}
+        if name is None:
+            self.teams = {}
+            self.ratings.invalidate()
+        else:
+            self.teams.pop(name.lower(), None)
+            self.ratings.invalidate(name.lower())
@@ -0,0 +1,159 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from cluster import Cluster
+from conference import Conference
+from graph import Graph
+from history import ProjectionHistory
+from manifest import RenderManifest
+from registry import TeamRegistry
+
+# Each worker process receives the schedule once, through the pool initializer, rather than once per job
+_schedule = None
+
+
+def _init_worker(schedule, history=None):
+    global _schedule
+    _schedule = schedule
+    # every job in this worker builds its Teams from one integer-id model of the schedule; if the model can't be
+    # built the Teams come from the schedule dicts instead, so a bad row only fails the graphs that depend on it
+    try:
+        TeamRegistry.shared(schedule).use_season()
+    except Exception as e:
+        print('problem with the season model, building teams without it: {}: {}'.format(type(e).__name__, e))
+    # and reads last week's projections back from the history file instead of recomputing them
+    if history:
+        TeamRegistry.shared(schedule).history = ProjectionHistory(history)
+
+
+def _render(job, schedule=None):
+    kind, name, options = job
+    schedule = schedule if schedule is not None else _schedule
+    options = dict(options)
+    start = time.monotonic()
+    try:
+        if kind == 'team':
+            TeamRegistry.shared(schedule).get(name).make_win_probability_graph(file=name, **options)
+        elif kind == 'conference':
+            Conference(name=name, schedule=schedule).make_standings_projection_graph(file=name, **options)
+        elif kind == 'cluster':
+            teams = options.pop('teams')
+            Cluster(schedule=schedule, teams=teams).make_standings_projection_graph(file=name, **options)
+        else:
+            raise ValueError("unknown render job: {}".format(kind))
+        error = None
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    return job, time.monotonic() - start, error
+
+
+class Renderer:
+    # Collects independent graph jobs and renders them across a process pool. A job that raises is reported in the
+    # results instead of taking the rest of the batch down with it.
+
+    def __init__(self, schedule, workers=None, logo_dir=None, incremental=False, manifest=None, history=None):
+        self.schedule = schedule
+        self.workers = workers if workers else os.cpu_count()
+        self.logo_dir = logo_dir
+        # path of the projection history log shared by the workers (see history.py), if any
+        self.history = history
+        self.jobs = []
+
+        # Every run records in the manifest what each graph it drew was drawn from; in incremental mode a job is
+        # skipped when the manifest shows its output was drawn from identical inputs
+        self.incremental = incremental
+        self.manifest = manifest if manifest else RenderManifest()
+        self.digests = {}
+        self.skipped = []
+
+    def add(self, kind, name, **options):
+        # the logo directory travels with each job, so nothing about it outlives the run
+        if self.logo_dir:
+            options.setdefault('logo_dir', self.logo_dir)
+        job = (kind, name, options)
+        path = Renderer.output_path(job)
+        try:
+            digest = RenderManifest.digest(self.schedule, self.get_teams(job), kind=kind, name=name,
+                                           **{x: options[x] for x in options if x != 'teams'})
+        except KeyError:
+            # let the render itself report the problem
+            self.jobs.append(job)
+            return
+        if self.incremental and self.manifest.is_current(path, digest):
+            self.skipped.append(job)
+            return
+        self.digests[(kind, name, path)] = (path, digest)
+        self.jobs.append(job)
+
+    def get_teams(self, job):
+        """Return the teams whose data the graph drawn by this job depends on."""
+        kind, name, options = job
+        if kind == 'team':
+            return [name]
+        elif kind == 'conference':
+            return [x for x in self.schedule if self.schedule[x]['conference'] == name]
+        return [x for x in self.schedule if x in options['teams']]
+
+    @staticmethod
+    def output_path(job):
+        kind, name, options = job
+        return Graph.output_path(name, options.get('method', 'sp+'), options.get('scale', 'red-green'))
+
+    def run(self, status=True):
+        """Render every queued job and return a list of (job, elapsed seconds, error or None)."""
+        start_time = time.monotonic()
+        results = []
+
+        if self.workers == 1:
+            _init_worker(self.schedule, self.history)
+            for job in self.jobs:
+                results.append(_render(job, schedule=self.schedule))
+                if status:
+                    Renderer.report(results[-1])
+        else:
+            # a worker that dies (or fails to start) breaks the pool; every job it takes down is reported as failed
+            # like any other, and the rest of the run still records what it drew
+            futures = {}
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.schedule, self.history)) as pool:
+                for job in self.jobs:
+                    try:
+                        futures[pool.submit(_render, job)] = job
+                    except BrokenProcessPool as e:
+                        results.append((job, 0.0, '{}: {}'.format(type(e).__name__, e)))
+                        if status:
+                            Renderer.report(results[-1])
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except BrokenProcessPool as e:
+                        results.append((futures[future], 0.0, '{}: {}'.format(type(e).__name__, e)))
+                    if status:
+                        Renderer.report(results[-1])
+
+        for job, elapsed, error in results:
+            key = (job[0], job[1], Renderer.output_path(job))
+            if not error and key in self.digests:
+                self.manifest.record(*self.digests[key])
+        self.manifest.save()
+
+        self.jobs = []
+        self.digests = {}
+        if status:
+            failed = len([x for x in results if x[2]])
+            print("Rendered {} graphs ({} failed, {} up to date)".format(len(results) - failed, failed,
+                                                                         len(self.skipped)), end='\n')
+            print("Elapsed time: {} seconds".format(round(time.monotonic() - start_time, 3)), end='\n')
+        self.skipped = []
+        return results
+
+    @staticmethod
+    def report(result):
+        (kind, name, options), elapsed, error = result
+        label = '{} {} ({})'.format(kind, name, options.get('scale', 'red-green'))
+        if error:
+            print('problem with {}: {}'.format(label, error))
+        else:
+            print('{} in {} seconds'.format(label, round(elapsed, 3)))
@@ -0,0 +1,180 @@
+import copy
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from cluster import Cluster
+from conference import Conference
+from history import ProjectionHistory
+from projection import Projection
+from ratings import RatingIndex
+from registry import TeamRegistry
+from team import Team
+
+
+class ScheduleOverlay(Mapping):
+    # A read-only view of a schedule with some teams replaced. Reads fall through to the base schedule; the first
+    # edit of a team copies that one team's entry (its games and ratings included) into the overlay, so the base is
+    # never written to and a scenario costs a handful of team entries rather than a copy of the whole season.
+
+    def __init__(self, base):
+        self.base = base
+        self.changes = {}
+
+    def __getitem__(self, team):
+        try:
+            return self.changes[team]
+        except KeyError:
+            return self.base[team]
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def __len__(self):
+        return len(self.base)
+
+    def edit(self, team):
+        """Return a writable copy of the team's entry, copying it from the base on first use."""
+        try:
+            return self.changes[team]
+        except KeyError:
+            # a shallow copy keeps the entry's type, e.g. a store entry whose logo is still on disk
+            entry = copy.copy(self.base[team])
+            entry['schedule'] = [dict(x) for x in entry['schedule']]
+            entry['sp+'] = dict(entry['sp+'])
+            self.changes[team] = entry
+            return entry
+
+
+class Scenario:
+    # A what-if on top of a schedule: pin game results, override ratings or swap two teams' schedules, then project.
+    # The edits go into a ScheduleOverlay, and every edit records which teams it touched (the edited teams and their
+    # opponents, whose win probabilities depend on them). Only those teams are rebuilt; every other team is the shared
+    # Team of the base schedule's registry, so evaluating a scenario costs a few teams, not a season.
+    #
+    # Edits return the scenario so they can be chained:
+    #
+    #   Scenario(schedule).pin('ohio state', 'michigan').project(['ohio state', 'michigan', 'penn state'])
+
+    def __init__(self, schedule, registry=None):
+        self.base = registry if registry else TeamRegistry.shared(schedule)
+        self.schedule = ScheduleOverlay(schedule)
+        # the rating dates only change for teams whose history is edited, so start from the base's parsed histories
+        self.ratings = RatingIndex(self.schedule)
+        self.ratings.history = dict(self.base.ratings.history)
+        # Teams built from the overlay go through the dict path, not the base's Season model
+        self.season = None
+        # the scenario's projections are its own; they must not land in the base schedule's history
+        self.history = ProjectionHistory()
+        self.touched = set()
+        self.pins = {}
+        self.teams = {}
+
+    def touch(self, *teams):
+        for team in teams:
+            self.touched.add(team)
+            self.teams.pop(team, None)
+
+    def opponents(self, team):
+        return {x['opponent'] for x in self.schedule[team]['schedule'] if x['opponent'] in self.schedule}
+
+    def find_game(self, team, opponent, game_id=None):
+        """Return the slot of the team's game against the opponent (the one with the id given, if any)."""
+        for i, game in enumerate(self.schedule[team]['schedule']):
+            if game['opponent'] == opponent and (game_id is None or str(game.get('id')) == str(game_id)):
+                return i
+        raise KeyError('{} has no game against {}'.format(team, opponent))
+
+    def pin(self, winner, loser, game_id=None):
+        """Decide the game between two teams, whether or not it has been played yet."""
+        winner, loser = winner.lower(), loser.lower()
+        for team, opponent, result in ((winner, loser, 'true'), (loser, winner, 'false')):
+            try:
+                i = self.find_game(team, opponent, game_id)
+            except KeyError:
+                # the other side isn't in the schedule (e.g. an FCS team without an entry)
+                if team == winner:
+                    raise
+                continue
+            self.schedule.edit(team)['schedule'][i]['winner'] = result
+            self.pins[(team, i)] = 1.0 if result == 'true' else 0.0
+            self.touch(team)
+        return self
+
+    def set_rating(self, team, value, date=None):
+        """Override a team's rating from the date given on (every rating date if None)."""
+        team = team.lower()
+        ratings = self.schedule.edit(team)['sp+']
+        if date is not None and date not in ratings:
+            ratings[date] = value
+            self.ratings.invalidate(team)
+        start = RatingIndex.ordinal(date) if date is not None else None
+        for key in ratings:
+            if start is None or RatingIndex.ordinal(key) >= start:
+                ratings[key] = value
+        self.touch(team, *self.opponents(team))
+        return self
+
+    def swap(self, team_a, team_b):
+        """Give each of the two teams the other's schedule; their opponents now play the other team instead."""
+        team_a, team_b = team_a.lower(), team_b.lower()
+        affected = self.opponents(team_a) | self.opponents(team_b) | {team_a, team_b}
+        names = {team_a: team_b, team_b: team_a}
+        games = {team_a: self.schedule[team_b]['schedule'], team_b: self.schedule[team_a]['schedule']}
+        for team in affected:
+            entry = self.schedule.edit(team)
+            if team in games:
+                entry['schedule'] = [dict(x) for x in games[team]]
+            for game in entry['schedule']:
+                game['opponent'] = names.get(game['opponent'], game['opponent'])
+        # pinned slots belonged to the old schedules
+        self.pins = {(names.get(t, t), i): x for (t, i), x in self.pins.items()}
+        self.touch(*affected)
+        return self
+
+    def get(self, name):
+        """Return the Team for the name: rebuilt on the overlay if the scenario touched it, else the shared one."""
+        name = name.lower()
+        if name not in self.touched:
+            return self.base.get(name)
+        try:
+            return self.teams[name]
+        except KeyError:
+            team = Team(name=name, schedule=self.schedule, ratings=self.ratings)
+            # a pinned game is decided at every rating date, not only once it has been played
+            for (pinned, i), result in self.pins.items():
+                if pinned == name:
+                    for key in team.win_probabilities:
+                        team.win_probabilities[key][i] = result
+            self.teams[name] = team
+            return team
+
+    def project(self, names=None, week=-1):
+        """Return {team: season-end win distribution} for the teams given (the touched ones by default)."""
+        names = sorted(self.touched) if names is None else [x.lower() for x in names]
+        teams = [self.get(x) for x in names]
+        totals = Projection.final_win_totals([x.get_win_probabilities(week) for x in teams])
+        return dict(zip(names, totals))
+
+    def compare(self, names=None, week=-1):
+        """Return {team: (expected wins without the scenario, expected wins with it)}."""
+        names = sorted(self.touched) if names is None else [x.lower() for x in names]
+        base = Projection.final_win_totals([self.base.get(x).get_win_probabilities(week) for x in names])
+        new = self.project(names, week)
+        return {x: (Team.expected_wins(y), Team.expected_wins(new[x])) for x, y in zip(names, base)}
+
+    @contextmanager
+    def registered(self):
+        """Stand in for the base registry while Conference / Cluster objects are built on the scenario's schedule."""
+        TeamRegistry.register(self.schedule, self)
+        try:
+            yield self
+        finally:
+            TeamRegistry.release(self.schedule)
+
+    def conference(self, name):
+        with self.registered():
+            return Conference(name, self.schedule)
+
+    def cluster(self, teams):
+        with self.registered():
+            return Cluster(schedule=self.schedule, teams=teams)
@@ -1,67 +1,64 @@
 import json
+import os
 
-from cluster import Cluster
-from conference import Conference
 from defs import FBS, PFIVE, GFIVE
-from team import Team
+from render import Renderer
+from store import SeasonStore
 
 
-def load_schedule():
-    with open("schedule.json", "r", encoding='utf8') as file:
-        global schedule
-        schedule = json.load(file)
+def load_schedule(file="schedule.json"):
+    global schedule
+    # a directory is a columnar season store (see store.py), which loads much faster than the JSON file
+    if os.path.isdir(file):
+        schedule = SeasonStore(file).to_schedule(logos=False)
+    else:
+        with open(file, "r", encoding='utf8') as infile:
+            schedule = json.load(infile)
 
 
-def make_cluster_graphs(absolute=False, old=None, scale=None, week=-1):
+def make_cluster_graphs(absolute=False, old=None, scale=None, week=-1, workers=None, incremental=False):
     groups = {'fbs': FBS, 'pfive': PFIVE, 'gfive': GFIVE, 'independent': ['independent']}
+    renderer = Renderer(schedule=schedule, workers=workers, incremental=incremental)
     for cluster in groups:
-        current = Cluster(schedule=schedule,
-                          teams=[x for x in schedule if schedule[x]['conference'] in groups[cluster]])
-        if not scale:
-            for color in ['team', 'red-green', 'red-blue']:
-                current.make_standings_projection_graph(method='sp+', absolute=absolute, old=old, file=cluster,
-                                                        scale=color, week=week)
-        else:
-            current.make_standings_projection_graph(method='sp+', absolute=absolute, old=old, file=cluster, scale=scale,
-                                                    week=week)
+        teams = [x for x in schedule if schedule[x]['conference'] in groups[cluster]]
+        for color in ([scale] if scale else ['team', 'red-green', 'red-blue']):
+            renderer.add('cluster', cluster, teams=teams, method='sp+', absolute=absolute, old=old, scale=color,
+                         week=week)
+    return renderer.run()
 
 
-def make_conf_graphs(absolute=False, old=None, scale=None, week=-1):
+def make_conf_graphs(absolute=False, old=None, scale=None, week=-1, workers=None, incremental=False):
+    renderer = Renderer(schedule=schedule, workers=workers, incremental=incremental)
     for conference in PFIVE + GFIVE:
-        conf = Conference(name=conference, schedule=schedule)
-        if not scale:
-            for color in ['team', 'red-green', 'red-blue']:
-                try:
-                    conf.make_standings_projection_graph(absolute=absolute, method='sp+', file=conference, old=old,
-                                                         scale=color, week=week)
-                except KeyError:
-                    print('problem with {}'.format(conf))
-        else:
-            try:
-                conf.make_standings_projection_graph(absolute=absolute, method='sp+', file=conference, old=old,
-                                                     scale=scale, week=week)
-            except KeyError:
-                print('problem with {}'.format(conf))
+        for color in ([scale] if scale else ['team', 'red-green', 'red-blue']):
+            renderer.add('conference', conference, absolute=absolute, method='sp+', old=old, scale=color, week=week)
+    return renderer.run()
 
 
-def make_team_graphs(old=True, scale=None, week=-1):
+def make_team_graphs(old=True, scale=None, week=-1, workers=None, incremental=False):
+    renderer = Renderer(schedule=schedule, workers=workers, incremental=incremental)
     for team in schedule:
         if schedule[team]['conference'] in FBS:
-            val = Team(name=team, schedule=schedule)
             if not scale:
                 for color in ['team', 'red-green', 'red-blue']:
-                    val.make_win_probability_graph(absolute=False, file=team, old=old, scale=color, method='sp+',
-                                                   week=week)
+                    renderer.add('team', team, absolute=False, old=old, scale=color, method='sp+', week=week)
             else:
-                val.make_win_probability_graph(absolute=False, file=team, old=old, scale=scale, method='sp+')
+                renderer.add('team', team, absolute=False, old=old, scale=scale, method='sp+')
+    return renderer.run()
 
 
-load_schedule()
-# groups = {'fbs': FBS, 'pfive': PFIVE, 'gfive': GFIVE, 'independent': ['independent']}
-# current = Cluster(schedule=schedule, teams=[x for x in schedule if schedule[x]['conference'] in FBS])
-# current.rank_schedules(spplus=current.get_avg_spplus(0, 25), txtoutput=True)
-# current.make_schedule_ranking_graph(spplus='top25')
+# worker processes re-import this module on spawn, so only kick off the batch from the main process
+if __name__ == '__main__':
+    load_schedule()
+    # groups = {'fbs': FBS, 'pfive': PFIVE, 'gfive': GFIVE, 'independent': ['independent']}
+    # current = Cluster(schedule=schedule, teams=[x for x in schedule if schedule[x]['conference'] in FBS])
+    # current.rank_schedules(spplus=current.get_avg_spplus(0, 25), txtoutput=True)
+    # current.make_schedule_ranking_graph(spplus='top25')
 
-# make_conf_graphs(old=True, week=4)
-# make_cluster_graphs(old=True, week=4)
-make_team_graphs(old=True, week=4)
+    # make_conf_graphs(old=True, week=4)
+    # make_cluster_graphs(old=True, week=4)
+    # pass incremental=True to only redraw the graphs whose schedule or rating inputs changed
+    make_team_graphs(old=True, week=4)
+
+    # convert the new or changed SVGs into the matching 'png output' files
+    # Rasterizer().run()
@@ -0,0 +1,203 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from defs import FBS
+from model import Season
+from ratings import RatingIndex
+from winprob import WinProbability
+
+
+def _count(won, first, second, base):
+    # wins = remaining games won as the first team - remaining games won by the other side as the second team
+    #        + (decided wins + remaining games as the second team), one column of the game lists at a time
+    wins = np.repeat(base.astype(np.int16)[:, None], won.shape[1], axis=1)
+    for k in range(first.shape[1]):
+        wins += won[first[:, k]]
+    for k in range(second.shape[1]):
+        wins -= won[second[:, k]]
+    return wins
+
+
+def _simulate(tables, seed, simulations):
+    """Play the remaining games 'simulations' times and return the summed histograms (one chunk of a run)."""
+    rng = np.random.default_rng(seed)
+    n_teams, width = len(tables['base']), tables['width']
+
+    # one row per remaining game, one column per simulated season: 1 when the first team wins; the extra last row is
+    # always 0 and pads the per-team game lists
+    won = np.zeros((len(tables['p']) + 1, simulations), dtype=np.int16)
+    won[:-1] = rng.random((len(tables['p']), simulations), dtype=np.float32) < tables['p'][:, None]
+
+    wins = _count(won, tables['first'], tables['second'], tables['base'])
+    conference_wins = _count(won, tables['conference_first'], tables['conference_second'], tables['conference_base'])
+
+    offsets = (np.arange(n_teams) * width)[:, None]
+    result = {
+        'wins': np.bincount((wins + offsets).ravel(), minlength=n_teams * width),
+        'conference_wins': np.bincount((conference_wins + offsets).ravel(), minlength=n_teams * width),
+        'division': np.zeros(n_teams, dtype=np.int64),
+        'ranks': np.zeros((n_teams, tables['group_width']), dtype=np.int64),
+    }
+
+    # rank every division on conference wins, then overall wins; remaining ties are broken at random
+    columns = np.arange(simulations)[None, :]
+    for members in tables['groups']:
+        score = conference_wins[members] * 64 + wins[members] + rng.random((len(members), simulations))
+        order = np.argsort(-score, axis=0)
+        ranks = np.empty_like(order)
+        ranks[order, columns] = np.arange(len(members))[:, None]
+        result['division'][members] += (ranks == 0).sum(axis=1)
+        for k, team in enumerate(members):
+            result['ranks'][team, :len(members)] += np.bincount(ranks[k], minlength=len(members))
+
+    return result
+
+
+class SeasonSimulator:
+    # Monte Carlo over the remaining season. Every game is played once per simulated season, so when A beats B, B
+    # loses in that same season, and correlated questions (who wins the division, where does a team finish) can be
+    # answered. Games already decided are fixed; the rest are drawn as a (games x seasons) outcome matrix and turned
+    # into win totals by adding up each team's rows of it.
+    #
+    # Runs are split into chunks seeded from one SeedSequence, so a seed reproduces the same result whether the chunks
+    # run serially or across processes.
+
+    def __init__(self, season, date=None, now=None, home_advantage=None, stdev=None):
+        self.season = season
+        arrays = season.get_arrays()
+        today = RatingIndex.today(now)
+        date = RatingIndex.ordinal(date) if date else today
+
+        # the shared game list: one entry per game, from the point of view of whichever team lists it first; a game
+        # only counts for the other team if it lists the game as well, and a canceled game counts for neither
+        first, second, home, keep, listed, canceled = [], [], [], [], [], []
+        seen = {}
+        for k, game in enumerate(season.games):
+            key = game.id if game.id else (min(game.team, game.opponent), max(game.team, game.opponent), game.date)
+            if key in seen:
+                listed[seen[key]] = True
+                canceled[seen[key]] = canceled[seen[key]] or game.canceled
+                continue
+            seen[key] = len(first)
+            first.append(game.team)
+            second.append(game.opponent)
+            home.append(game.home)
+            keep.append(k)
+            listed.append(False)
+            canceled.append(game.canceled)
+        first, second, keep = np.array(first, dtype=np.int64), np.array(second, dtype=np.int64), np.array(keep)
+        listed, canceled = np.array(listed, dtype=bool), np.array(canceled, dtype=bool)
+        home = np.array(home, dtype=bool)
+        starts = arrays['date'][keep]
+        decided = (starts <= today) & (starts <= date)
+
+        # an opponent outside the season (e.g. an FCS team the NCAA merge couldn't match) has no rating: a decided
+        # game against it still counts its result, a remaining one can't be played and is left out
+        unrated = (second < 0) & ~decided
+        self.left_out = [(season.names[first[k]], season.games[keep[k]].id) for k in np.flatnonzero(unrated)]
+        for team, game_id in self.left_out:
+            print('problem with game {} of {}: the opponent is not in the season, leaving it out'.format(game_id, team))
+        first, second, home, keep = first[~unrated], second[~unrated], home[~unrated], keep[~unrated]
+        listed, canceled, starts, decided = listed[~unrated], canceled[~unrated], starts[~unrated], decided[~unrated]
+
+        rated = second >= 0
+        p = np.zeros(len(first), dtype=np.float64)
+        p[rated] = WinProbability.batch(season.ratings_at(first[rated], date), season.ratings_at(second[rated], date),
+                                        home[rated], home_advantage=home_advantage, stdev=stdev)
+        p = np.where(decided, arrays['winner'][keep].astype(np.float64), p)
+        # like Team, a played game that was canceled is a loss for both sides
+        void = decided & canceled
+
+        conferences = [x.conference for x in season.teams]
+        conference_game = np.array([b >= 0 and conferences[a] == conferences[b] and
+                                    conferences[a] not in (None, 'independent')
+                                    for a, b in zip(first.tolist(), second.tolist())], dtype=bool)
+
+        self.names = season.names
+        self.first, self.second, self.p = first, second, p
+        self.decided, self.conference_game = decided, conference_game
+        self.listed, self.void = listed, void
+
+        # divisions of the FBS conferences (a conference without divisions is one group)
+        groups = {}
+        for team in season.teams:
+            if team.conference in FBS and team.conference != 'independent':
+                groups.setdefault((team.conference, team.division), []).append(team.id)
+        self.groups = [np.array(groups[x], dtype=np.int64) for x in sorted(groups)]
+        self.group_names = sorted(groups)
+
+    @staticmethod
+    def from_schedule(schedule, **kwargs):
+        return SeasonSimulator(Season.from_schedule(schedule), **kwargs)
+
+    def get_tables(self):
+        """Return the arrays every chunk needs: remaining-game probabilities and which teams they count for."""
+        n_teams = len(self.names)
+        open_games = ~self.decided
+
+        def gather(teams):
+            # teams x (most games) table of the remaining-game rows each team plays in (-1 = not counted), padded
+            # with the always-0 last row
+            lists = [[] for x in range(n_teams)]
+            for column, team in enumerate(teams.tolist()):
+                if team >= 0:
+                    lists[team].append(column)
+            table = np.full((n_teams, max([len(x) for x in lists] + [1])), len(teams), dtype=np.int64)
+            for team, columns in enumerate(lists):
+                table[team, :len(columns)] = columns
+            return table
+
+        def incidence(mask):
+            games = np.flatnonzero(open_games)
+            first = np.where(mask[games], self.first[games], -1)
+            second = np.where(mask[games] & self.listed[games], self.second[games], -1)
+            fixed = mask & self.decided & ~self.void
+            other = fixed & self.listed
+            base = np.bincount(self.first[fixed], weights=self.p[fixed], minlength=n_teams) + \
+                np.bincount(self.second[other], weights=1 - self.p[other], minlength=n_teams) + \
+                np.bincount(second[second >= 0], minlength=n_teams)
+            return gather(first), gather(second), np.rint(base).astype(np.int64)
+
+        first, second, base = incidence(np.ones(len(self.p), dtype=bool))
+        conference_first, conference_second, conference_base = incidence(self.conference_game)
+        games_played = np.bincount(self.first, minlength=n_teams) + \
+            np.bincount(self.second[self.listed], minlength=n_teams)
+        return {'p': self.p[open_games].astype(np.float32), 'first': first, 'second': second, 'base': base,
+                'conference_first': conference_first, 'conference_second': conference_second,
+                'conference_base': conference_base,
+                'width': int(games_played.max()) + 1, 'groups': self.groups,
+                'group_width': max([len(x) for x in self.groups] + [1])}
+
+    def run(self, simulations=100000, seed=None, workers=1, chunk=10000):
+        """Simulate the remaining season and return the distributions for every team.
+
+        Returns {'simulations': n, 'wins': {team: [P(w wins)]}, 'conference_wins': {team: [P(w wins)]},
+        'division': {team: P(finishes first in its division)}, 'ranks': {team: [P(finishes k-th)]}}; the last two
+        only cover the divisions of the FBS conferences."""
+        tables = self.get_tables()
+        sizes = [chunk] * (simulations // chunk) + ([simulations % chunk] if simulations % chunk else [])
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        if workers == 1:
+            parts = [_simulate(tables, s, n) for s, n in zip(seeds, sizes)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers if workers else os.cpu_count()) as pool:
+                parts = list(pool.map(_simulate, [tables] * len(sizes), seeds, sizes))
+
+        total = {x: sum(part[x] for part in parts) for x in parts[0]}
+        width = tables['width']
+        wins = total['wins'].reshape(-1, width) / simulations
+        conference_wins = total['conference_wins'].reshape(-1, width) / simulations
+
+        result = {'simulations': simulations, 'wins': {}, 'conference_wins': {}, 'division': {}, 'ranks': {}}
+        for i, name in enumerate(self.names):
+            n = int(np.flatnonzero(self.first == i).size + np.flatnonzero(self.listed & (self.second == i)).size)
+            result['wins'][name] = wins[i, :n + 1].tolist()
+            result['conference_wins'][name] = conference_wins[i, :n + 1].tolist()
+        for members in self.groups:
+            for i in members.tolist():
+                result['division'][self.names[i]] = float(total['division'][i] / simulations)
+                result['ranks'][self.names[i]] = (total['ranks'][i, :len(members)] / simulations).tolist()
+        return result
@@ -0,0 +1,50 @@
+import numpy as np
+
+from winprob import WinProbability
+
+
+class ScheduleStrength:
+    # Strength of schedule: how many games a reference team (rated e.g. like the average top 25 team) would win
+    # against each team's schedule. The opponent ratings and home flags of every schedule are looked up once into a
+    # 'teams' x 'games' matrix; any number of reference ratings is then evaluated in one broadcast over a third
+    # 'references' axis, so several SOS variants cost one lookup instead of one full recompute each.
+
+    def __init__(self, teams, ratings, dates=None, home_advantage=None, stdev=None):
+        """teams are Team objects; dates is one date for everyone, one per team, or None for the latest ratings."""
+        self.teams = list(teams)
+        self.home_advantage = home_advantage
+        self.stdev = stdev
+        if dates is None or isinstance(dates, str):
+            dates = [dates] * len(self.teams)
+
+        games = [x.schedule[x.name]['schedule'] for x in self.teams]
+        self.lengths = np.array([len(x) for x in games], dtype=np.intp)
+        width = self.lengths.max() if len(games) else 0
+        self.opponents = np.zeros((len(games), width), dtype=np.float64)
+        self.home = np.zeros((len(games), width), dtype=bool)
+        # padding columns past the end of a short schedule count for nothing
+        self.mask = np.arange(width)[None, :] < self.lengths[:, None]
+        for i, (schedule, date) in enumerate(zip(games, dates)):
+            # Use the most recent opponent ratings on or before the date
+            # Note there might be a misalignment between the rating dates for different teams, especially FCS teams
+            self.opponents[i, :len(schedule)] = [ratings.latest(x['opponent'], date) for x in schedule]
+            self.home[i, :len(schedule)] = [x['home-away'] == 'home' for x in schedule]
+
+    def win_probabilities(self, references):
+        """Return the 'teams' x 'games' x 'references' win probabilities of a team of each reference rating."""
+        references = np.atleast_1d(np.asarray(references, dtype=np.float64))
+        p = WinProbability.batch(references[None, None, :], self.opponents[:, :, None], self.home[:, :, None],
+                                 home_advantage=self.home_advantage, stdev=self.stdev)
+        return np.where(self.mask[:, :, None], p, 0.0)
+
+    def schedules(self, reference):
+        """Return the ragged per-team win probability vectors for a single reference rating."""
+        p = self.win_probabilities([reference])[:, :, 0]
+        return [p[i, :n].tolist() for i, n in enumerate(self.lengths)]
+
+    def expected_wins(self, references, games=None):
+        """Return the 'teams' x 'references' matrix of expected wins, over the first 'games' games if given."""
+        p = self.win_probabilities(references)
+        if games is not None:
+            p = p[:, :games, :]
+        return p.sum(axis=1)
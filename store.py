@@ -0,0 +1,387 @@
+import base64
+import json
+import os
+from datetime import date
+
+import numpy as np
+
+from ratings import RatingIndex
+
+# Game fields that get their own typed column; everything else on a game rides along in 'game extras.json'
+GAME_FIELDS = ('id', 'opponent', 'home-away', 'startDate', 'startTime', 'location', 'winner', 'canceled',
+               'scoreBreakdown')
+
+# Team fields that are stored as columns or blobs; everything else lives in 'teams.json'
+TEAM_FIELDS = ('schedule', 'sp+', 'logoURI')
+
+# Codes of the game_mask / team_mask columns, one per field above: whether the typed column holds the value, or the
+# value was None, absent, or something the column can't hold exactly (then it is kept verbatim in 'overrides.json')
+PRESENT, NULL, MISSING, OVERRIDE = 0, 1, 2, 3
+
+# Kinds of the entries of score_kind: the score column holds ints, the NCAA sends digit strings and '' for periods
+# that haven't been played
+SCORE_INT, SCORE_TEXT, SCORE_EMPTY = 0, 1, 2
+
+
+def _date(ordinal):
+    return date.fromordinal(int(ordinal)).strftime('%Y-%m-%d')
+
+
+class TeamEntry(dict):
+    # A team's schedule entry whose 'logoURI' is read from logos.bin the first time it is asked for, so loading a
+    # schedule never touches the logos. Only the file name and byte range are kept, so entries pickle cheaply.
+    # Lookups by key stay lazy; anything that walks or compares the whole entry (json.dump, ==, items()) loads the
+    # logo first, so the entry always looks like the plain dict it stands for.
+
+    def __init__(self, *args, logos=None, span=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logos = logos
+        self.span = span
+
+    def load(self):
+        if self.span is not None and not dict.__contains__(self, 'logoURI'):
+            with open(self.logos, 'rb') as infile:
+                infile.seek(self.span[0])
+                self['logoURI'] = base64.b64encode(infile.read(self.span[1] - self.span[0])).decode()
+        self.span = None
+        return self
+
+    def __missing__(self, key):
+        if key != 'logoURI' or self.span is None:
+            raise KeyError(key)
+        return self.load()['logoURI']
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (key == 'logoURI' and self.span is not None)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __reduce__(self):
+        # pickle (and copy) the stored keys and the byte range, without reading the logo
+        return TeamEntry, (dict(dict.items(self)),), self.__dict__
+
+    def __iter__(self):
+        return super(TeamEntry, self.load()).__iter__()
+
+    def __len__(self):
+        return super(TeamEntry, self.load()).__len__()
+
+    def __eq__(self, other):
+        return super(TeamEntry, self.load()).__eq__(other.load() if isinstance(other, TeamEntry) else other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return super(TeamEntry, self.load()).__repr__()
+
+    def keys(self):
+        return super(TeamEntry, self.load()).keys()
+
+    def values(self):
+        return super(TeamEntry, self.load()).values()
+
+    def items(self):
+        return super(TeamEntry, self.load()).items()
+
+
+class SeasonStore:
+    # A season on disk as typed, memory-mappable columns instead of one big JSON document:
+    #
+    #   teams.json                 team names (row order = team id) and their small scalar fields
+    #   game_*.npy                 one row per (team, game), grouped by team; team_offsets.npy delimits each team
+    #   score_*.npy                the flattened scoreBreakdown lists, delimited by score_offsets.npy
+    #   rating_*.npy               one row per (team, rating date), sorted by date; rating_offsets.npy per team
+    #   logos.bin, logo_offsets    the decoded logo images, kept apart so loading a schedule never touches them
+    #   game_mask, team_mask       per field: present, None, absent, or kept verbatim in overrides.json
+    #   score_kind                 per score entry: int, digit string or ''
+    #
+    # Dates are stored as proleptic Gregorian ordinals and winner/canceled as 1, 0 or -1 (unknown). With the masks
+    # and overrides, to_schedule() gives back exactly the schedule that was written.
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+
+        with open(os.path.join(path, 'teams.json'), 'r', encoding='utf8') as infile:
+            self.teams = json.load(infile)
+        self.names = [x['name'] for x in self.teams]
+        self.ids = {x: i for i, x in enumerate(self.names)}
+        self.columns = {}
+
+    def __getitem__(self, column):
+        # columns are opened the first time they are used
+        try:
+            return self.columns[column]
+        except KeyError:
+            self.columns[column] = np.load(os.path.join(self.path, column + '.npy'), mmap_mode=self.mmap_mode)
+            return self.columns[column]
+
+    @staticmethod
+    def flag(value):
+        if value in ('true', True):
+            return 1
+        elif value in ('false', False):
+            return 0
+        return -1
+
+    @staticmethod
+    def unflag(value):
+        return {1: 'true', 0: 'false'}.get(int(value), '')
+
+    @staticmethod
+    def code(entry, field):
+        if field not in entry:
+            return MISSING
+        return NULL if entry[field] is None else PRESENT
+
+    @staticmethod
+    def score_kinds(scores):
+        """Return the score_kind of every entry of a scoreBreakdown, or None if it can't be stored exactly."""
+        if not isinstance(scores, list):
+            return None
+        kinds = []
+        for x in scores:
+            if x == '':
+                kinds.append(SCORE_EMPTY)
+            elif isinstance(x, str) and x.isdigit() and str(int(x)) == x and int(x) < 2 ** 15:
+                kinds.append(SCORE_TEXT)
+            elif isinstance(x, int) and not isinstance(x, bool) and 0 <= x < 2 ** 15:
+                kinds.append(SCORE_INT)
+            else:
+                return None
+        return kinds
+
+    def mask(self, column, rows, width):
+        # stores written before the masks existed hold every field as present
+        try:
+            return self[column].tolist()
+        except FileNotFoundError:
+            return [[PRESENT] * width for x in range(rows)]
+
+    @staticmethod
+    def from_schedule(schedule, path):
+        """Write a schedule in the existing JSON layout to a columnar store at 'path' and return it."""
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        names = list(schedule)
+        ids = {x: i for i, x in enumerate(names)}
+        teams, extras = [], []
+        cols = {x: [] for x in ('team_offsets', 'game_team', 'game_opponent', 'game_home', 'game_date', 'game_winner',
+                                'game_canceled', 'score_offsets', 'score', 'score_kind', 'rating_offsets',
+                                'rating_date', 'rating_value', 'logo_offsets', 'game_mask', 'team_mask')}
+        text = {x: [] for x in ('game_id', 'game_opponent_name', 'game_time', 'game_location')}
+        overrides = {'teams': {}, 'games': {}}
+        logos = bytearray()
+
+        for name in names:
+            entry = schedule[name]
+            teams.append(dict({x: entry[x] for x in entry if x not in TEAM_FIELDS}, name=name))
+
+            cols['team_offsets'].append(len(cols['game_team']))
+            for game in entry.get('schedule') or []:
+                k = len(cols['game_team'])
+                mask = [SeasonStore.code(game, x) for x in GAME_FIELDS]
+                fields = dict(zip(GAME_FIELDS, mask))
+                value = {x: game[x] if fields[x] == PRESENT else None for x in GAME_FIELDS}
+
+                if fields['home-away'] == PRESENT and value['home-away'] not in ('home', 'away'):
+                    fields['home-away'] = OVERRIDE
+                if fields['startDate'] == PRESENT and _date(RatingIndex.ordinal(value['startDate'])) != \
+                        value['startDate']:
+                    fields['startDate'] = OVERRIDE
+                for x in ('winner', 'canceled'):
+                    if fields[x] == PRESENT and value[x] not in ('true', 'false'):
+                        fields[x] = OVERRIDE
+                for x in ('id', 'opponent', 'startTime', 'location'):
+                    if fields[x] == PRESENT and not isinstance(value[x], str):
+                        fields[x] = OVERRIDE
+                kinds = SeasonStore.score_kinds(value['scoreBreakdown'])
+                if fields['scoreBreakdown'] == PRESENT and kinds is None:
+                    fields['scoreBreakdown'] = OVERRIDE
+                for x in GAME_FIELDS:
+                    if fields[x] == OVERRIDE:
+                        overrides['games'].setdefault(str(k), {})[x] = game[x]
+
+                cols['game_mask'].append([fields[x] for x in GAME_FIELDS])
+                cols['game_team'].append(ids[name])
+                cols['game_opponent'].append(ids.get(game.get('opponent'), -1))
+                cols['game_home'].append(1 if game.get('home-away') == 'home' else 0)
+                cols['game_date'].append(RatingIndex.ordinal(game['startDate']) if game.get('startDate') else 1)
+                cols['game_winner'].append(SeasonStore.flag(game.get('winner')))
+                cols['game_canceled'].append(SeasonStore.flag(game.get('canceled')))
+                cols['score_offsets'].append(len(cols['score']))
+                if fields['scoreBreakdown'] == PRESENT:
+                    cols['score'].extend(int(x) if x != '' else 0 for x in value['scoreBreakdown'])
+                    cols['score_kind'].extend(kinds)
+                text['game_id'].append(value['id'] if fields['id'] == PRESENT else '')
+                text['game_opponent_name'].append(value['opponent'] if fields['opponent'] == PRESENT else '')
+                text['game_time'].append(value['startTime'] if fields['startTime'] == PRESENT else '')
+                text['game_location'].append(value['location'] if fields['location'] == PRESENT else '')
+                extras.append({x: game[x] for x in game if x not in GAME_FIELDS})
+
+            team_fields = {x: SeasonStore.code(entry, x) for x in TEAM_FIELDS}
+            if team_fields['schedule'] == PRESENT and not isinstance(entry['schedule'], list):
+                team_fields['schedule'] = OVERRIDE
+            ratings = entry.get('sp+') if team_fields['sp+'] == PRESENT else {}
+            try:
+                # ints, or dates not written as '%Y-%m-%d', still fill the columns but are given back verbatim
+                ratings = {x: float(v) for x, v in ratings.items() if RatingIndex.ordinal(x)}
+                if team_fields['sp+'] == PRESENT and not all(isinstance(v, float) and
+                                                             _date(RatingIndex.ordinal(x)) == x
+                                                             for x, v in entry['sp+'].items()):
+                    team_fields['sp+'] = OVERRIDE
+            except (AttributeError, TypeError, ValueError):
+                team_fields['sp+'], ratings = OVERRIDE, {}
+            logo = entry.get('logoURI') if team_fields['logoURI'] == PRESENT else ''
+            try:
+                decoded = base64.b64decode(logo, validate=True)
+                if base64.b64encode(decoded).decode() != logo:
+                    raise ValueError
+            except (TypeError, ValueError):
+                team_fields['logoURI'], decoded = OVERRIDE, b''
+            for x in TEAM_FIELDS:
+                if team_fields[x] == OVERRIDE:
+                    overrides['teams'].setdefault(str(len(cols['team_mask'])), {})[x] = entry[x]
+            cols['team_mask'].append([team_fields[x] for x in TEAM_FIELDS])
+
+            cols['rating_offsets'].append(len(cols['rating_date']))
+            for key in sorted(ratings, key=RatingIndex.ordinal):
+                cols['rating_date'].append(RatingIndex.ordinal(key))
+                cols['rating_value'].append(ratings[key])
+
+            cols['logo_offsets'].append(len(logos))
+            logos.extend(decoded)
+
+        cols['team_offsets'].append(len(cols['game_team']))
+        cols['score_offsets'].append(len(cols['score']))
+        cols['rating_offsets'].append(len(cols['rating_date']))
+        cols['logo_offsets'].append(len(logos))
+
+        dtypes = {'game_home': np.int8, 'game_winner': np.int8, 'game_canceled': np.int8, 'score': np.int16,
+                  'score_kind': np.int8, 'rating_value': np.float64, 'logo_offsets': np.int64, 'game_mask': np.int8,
+                  'team_mask': np.int8}
+        shapes = {'game_mask': (-1, len(GAME_FIELDS)), 'team_mask': (-1, len(TEAM_FIELDS))}
+        for column, values in cols.items():
+            values = np.array(values, dtype=dtypes.get(column, np.int32))
+            if column in shapes:
+                values = values.reshape(shapes[column])
+            np.save(os.path.join(path, column + '.npy'), values)
+        for column, values in text.items():
+            np.save(os.path.join(path, column + '.npy'), np.array(values, dtype=np.str_))
+
+        with open(os.path.join(path, 'teams.json'), 'w+', encoding='utf8') as outfile:
+            json.dump(teams, outfile, ensure_ascii=False)
+        with open(os.path.join(path, 'game extras.json'), 'w+', encoding='utf8') as outfile:
+            json.dump(extras, outfile, ensure_ascii=False)
+        with open(os.path.join(path, 'overrides.json'), 'w+', encoding='utf8') as outfile:
+            json.dump(overrides, outfile, ensure_ascii=False)
+        with open(os.path.join(path, 'logos.bin'), 'wb') as outfile:
+            outfile.write(logos)
+
+        return SeasonStore(path)
+
+    @staticmethod
+    def from_json(file, path):
+        with open(file, 'r', encoding='utf8') as infile:
+            return SeasonStore.from_schedule(json.load(infile), path)
+
+    def games(self, team):
+        """Return the slice of the game columns that belongs to the team (by name or id)."""
+        i = self.ids[team] if isinstance(team, str) else team
+        return slice(int(self['team_offsets'][i]), int(self['team_offsets'][i + 1]))
+
+    def ratings(self, team):
+        """Return (ordinals, values) of the team's rating history, oldest first."""
+        i = self.ids[team] if isinstance(team, str) else team
+        lo, hi = int(self['rating_offsets'][i]), int(self['rating_offsets'][i + 1])
+        return self['rating_date'][lo:hi], self['rating_value'][lo:hi]
+
+    def logo(self, team):
+        """Return the team's logo as the base64 string the graphs embed."""
+        i = self.ids[team] if isinstance(team, str) else team
+        lo, hi = int(self['logo_offsets'][i]), int(self['logo_offsets'][i + 1])
+        if lo == hi:
+            return ''
+        with open(os.path.join(self.path, 'logos.bin'), 'rb') as infile:
+            infile.seek(lo)
+            return base64.b64encode(infile.read(hi - lo)).decode()
+
+    def to_schedule(self, logos=True):
+        """Rebuild the schedule in the existing JSON layout.
+
+        With logos=False the logos are left in logos.bin and each team's 'logoURI' is read the first time it is used."""
+        with open(os.path.join(self.path, 'game extras.json'), 'r', encoding='utf8') as infile:
+            extras = json.load(infile)
+        try:
+            with open(os.path.join(self.path, 'overrides.json'), 'r', encoding='utf8') as infile:
+                overrides = json.load(infile)
+        except OSError:
+            overrides = {'teams': {}, 'games': {}}
+
+        # pull each column out of the map once; element-wise indexing into numpy is slow
+        cols = {x: self[x].tolist() for x in ('game_id', 'game_opponent_name', 'game_home', 'game_date', 'game_time',
+                                              'game_location', 'game_winner', 'game_canceled', 'score',
+                                              'score_offsets', 'logo_offsets')}
+        try:
+            kinds = self['score_kind'].tolist()
+        except FileNotFoundError:
+            kinds = [SCORE_INT] * len(cols['score'])
+        game_mask = self.mask('game_mask', len(cols['game_id']), len(GAME_FIELDS))
+        team_mask = self.mask('team_mask', len(self.teams), len(TEAM_FIELDS))
+        score = [str(x) if kind == SCORE_TEXT else '' if kind == SCORE_EMPTY else x
+                 for x, kind in zip(cols['score'], kinds)]
+
+        result = {}
+        for i, meta in enumerate(self.teams):
+            fields = dict(zip(TEAM_FIELDS, team_mask[i]))
+            lo, hi = cols['logo_offsets'][i], cols['logo_offsets'][i + 1]
+            entry = TeamEntry({x: meta[x] for x in meta if x != 'name'})
+            entry['sp+'] = {_date(d): float(v) for d, v in zip(*self.ratings(i))}
+            if fields['logoURI'] == PRESENT:
+                if logos:
+                    entry['logoURI'] = self.logo(i)
+                else:
+                    entry.logos, entry.span = os.path.join(self.path, 'logos.bin'), (lo, hi)
+
+            entry['schedule'] = []
+            rows = self.games(i)
+            for k in range(rows.start, rows.stop):
+                game = dict(extras[k])
+                game['id'] = cols['game_id'][k]
+                game['opponent'] = cols['game_opponent_name'][k]
+                game['home-away'] = 'home' if cols['game_home'][k] else 'away'
+                game['startDate'] = _date(cols['game_date'][k])
+                game['startTime'] = cols['game_time'][k]
+                game['location'] = cols['game_location'][k]
+                game['winner'] = SeasonStore.unflag(cols['game_winner'][k])
+                game['canceled'] = SeasonStore.unflag(cols['game_canceled'][k])
+                game['scoreBreakdown'] = score[cols['score_offsets'][k]:cols['score_offsets'][k + 1]]
+                SeasonStore.restore(game, GAME_FIELDS, game_mask[k], overrides['games'].get(str(k), {}))
+                entry['schedule'].append(game)
+            SeasonStore.restore(entry, TEAM_FIELDS, team_mask[i], overrides['teams'].get(str(i), {}))
+            result[self.names[i]] = entry
+
+        return result
+
+    @staticmethod
+    def restore(entry, fields, mask, overrides):
+        # put back what the typed columns can't express: None values, absent keys and verbatim values
+        for field, code in zip(fields, mask):
+            if code == NULL:
+                entry[field] = None
+            elif code == MISSING:
+                entry.pop(field, None)
+            elif code == OVERRIDE:
+                entry[field] = overrides[field]
+
+    def to_json(self, file):
+        with open(file, 'w+', encoding='utf8') as outfile:
+            json.dump(self.to_schedule(), outfile, indent=4, sort_keys=True, ensure_ascii=False)
@@ -2,14 +2,22 @@ import csv
 import os
 from datetime import datetime
 
+from colors import ColorScale
 from defs import WEEKS
 from graph import Graph
+from projection import Projection
+from ratings import RatingIndex
 from utils import Utils
+from winprob import WinProbability
 
 
 class Team:
-    def __init__(self, name=None, schedule=None):
+    def __init__(self, name=None, schedule=None, ratings=None, season=None, history=None):
         self.schedule = schedule
+        # share a single rating index between teams of the same schedule when the caller provides one
+        self.ratings = ratings if ratings else RatingIndex(schedule)
+        # projections already made for this team are read back from the history instead of being recomputed
+        self.history = history
 
         if not name:
             self.name = ""
@@ -22,35 +30,11 @@ class Team:
 
             # Create an array of individual game win probabilities
             # Each vector corresponds to an entry in the S&P+ values list, indicating chronological change
-            self.win_probabilities = {}
-            for x in self.spplus:
-                cur = self.spplus[x]
-                self.win_probabilities[x] = []
-                date = datetime.strptime(x, "%Y-%m-%d")
-                for i in range(len(self.schedule[self.name]['schedule'])):
-                    # Get the opponent S&P+ value
-                    opp_sp = self.schedule[self.schedule[self.name]['schedule'][i]['opponent']]['sp+']
-                    # Use the most recent S&P+ values prior to the specified date
-                    # Note there might be a misalignment between the S&P+ value dates for different teams, especially FCS teams
-                    best_match = max(
-                        datetime.strptime(dt, '%Y-%m-%d') for dt in opp_sp.keys() if
-                        datetime.strptime(dt, '%Y-%m-%d') <= date).strftime('%Y-%m-%d')
-                    osp = opp_sp[best_match]
-                    # Who has the 2.5 point home field advantage?
-                    loc = self.schedule[self.name]['schedule'][i]['home-away']
-                    # Calculate the win probability and record it
-                    self.win_probabilities[x].append(Utils.calculate_win_prob_from_spplus(cur, osp, loc))
-
-            # If a game was already played, assign 100% or 0% win probability
-            for x in range(len(self.schedule[self.name]['schedule'])):
-                start = datetime.strptime(self.schedule[self.name]['schedule'][x]['startDate'], '%Y-%m-%d')
-                if start < datetime.now():
-                    if self.schedule[self.name]['schedule'][x]['winner'] == 'true':
-                        out = 1.0
-                    else:
-                        out = 0.0
-                    for i in [x for x in self.win_probabilities.keys() if datetime.strptime(x, '%Y-%m-%d') >= start]:
-                        self.win_probabilities[i][x] = out
+            # An integer-id Season model, when given, builds the same table with array operations
+            if season:
+                self.win_probabilities = season.win_probabilities(self.name)
+            else:
+                self.win_probabilities = self.calculate_win_probabilities()
 
             try:
                 self.primary_color = Utils.hex_to_rgb(self.schedule[self.name]['primaryColor'])
@@ -64,20 +48,49 @@ class Team:
             except KeyError:
                 self.division = "none"
 
+    def calculate_win_probabilities(self):
+        win_probabilities = {}
+        games = self.schedule[self.name]['schedule']
+        # Who has the 2.5 point home field advantage?
+        home = [x['home-away'] for x in games]
+        for x in self.spplus:
+            # Get the opponent S&P+ values
+            # Use the most recent S&P+ values prior to the specified date
+            # Note there might be a misalignment between the S&P+ value dates for different teams, especially FCS teams
+            osp = [self.ratings.latest(game['opponent'], x) for game in games]
+            # Calculate the win probabilities for the whole schedule at once
+            win_probabilities[x] = WinProbability.batch(self.spplus[x], osp, home).tolist()
+
+        # If a game was already played, assign 100% or 0% win probability
+        for x in range(len(self.schedule[self.name]['schedule'])):
+            start = datetime.strptime(self.schedule[self.name]['schedule'][x]['startDate'], '%Y-%m-%d')
+            if RatingIndex.played(start):
+                if self.schedule[self.name]['schedule'][x]['winner'] == 'true':
+                    out = 1.0
+                else:
+                    out = 0.0
+                for i in self.ratings.keys_since(self.name, start):
+                    win_probabilities[i][x] = out
+
+        return win_probabilities
+
+    def get_conference_games(self):
+        """Return a flag per game: True for games against a team of the same conference (independents have none)."""
+        return [self.conference != 'independent' and
+                self.schedule.get(x['opponent'], {}).get('conference') == self.conference
+                for x in self.schedule[self.name]['schedule']]
+
     @staticmethod
     def expected_wins(vec):
         return sum(x * vec[x] for x in range(len(vec)))
 
     def get_best_sp_match(self, week):
-        start, end = datetime.strptime(WEEKS[week - 1][0], '%Y-%m-%d'), datetime.strptime(WEEKS[week - 1][1],
-                                                                                          '%Y-%m-%d')
+        # The win probability vectors are keyed by the same dates as the S&P+ history
+        start, end = WEEKS[week - 1]
         try:
-            date = max(
-                datetime.strptime(dt, '%Y-%m-%d') for dt in self.win_probabilities.keys() if
-                start <= datetime.strptime(dt, '%Y-%m-%d') <= end).strftime('%Y-%m-%d')
+            date = self.ratings.latest_key_between(self.name, start, end)
         except ValueError:
-            date = max(datetime.strptime(dt, '%Y-%m-%d') for dt in self.win_probabilities.keys() if
-                       datetime.strptime(dt, '%Y-%m-%d') <= end).strftime('%Y-%m-%d')
+            date = self.ratings.latest_key(self.name, end)
         return date
 
     def get_played_games(self):
@@ -89,7 +102,7 @@ class Team:
             for y in self.schedule[x['opponent']]['schedule']:
                 if x['id'] == y['id']:
                     pa = sum(y['scoreBreakdown'])
-            if datetime.strptime(x['startDate'], '%Y-%m-%d') < datetime.now():
+            if RatingIndex.played(x['startDate']):
                 if x['canceled'] == 'true':
                     status = 'canceled'
                 else:
@@ -100,7 +113,8 @@ class Team:
         return played
 
     def make_win_probability_graph(self, file='out', hstep=50, vstep=50, margin=5, logowidth=40, logoheight=40,
-                                   menuheight=40, absolute=False, old=None, week=0, method='sp+', scale='red-green'):
+                                   menuheight=40, absolute=False, old=None, week=0, method='sp+', scale='red-green',
+                                   logo_dir=None):
 
         cur_date = self.get_best_sp_match(week=week)
         cur_win_prob = self.win_probabilities[cur_date]
@@ -116,8 +130,7 @@ class Team:
             prior = self.project_win_totals(week - 1)
         if not os.path.exists(".\svg output\{} - {}".format(method, scale)):
             os.makedirs(".\svg output\{} - {}".format(method, scale))
-        path = os.path.join(".\svg output\{} - {}".format(method, scale),
-                            '{} - {} - {}.svg'.format(file, method, scale))
+        path = Graph.output_path(file, method, scale)
 
         if not old:
             rows = 1 + len(cur_win_prob)
@@ -126,7 +139,8 @@ class Team:
             rows = 1 + len(cur_win_prob)
             cols = 6 + len(cur_win_prob)
 
-        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 4 * margin + menuheight)
+        graph = Graph(path=path, width=hstep * cols + 2 * margin, height=vstep * rows + 4 * margin + menuheight,
+                      logo_dir=logo_dir)
 
         # Add the team logo
         try:
@@ -134,7 +148,7 @@ class Team:
                             margin + (vstep - logoheight) / 2,
                             logowidth,
                             logoheight,
-                            self.schedule[self.name]['logoURI'])
+                            self.schedule[self.name]['logoURI'], name=self.name)
         except IndexError:
             pass
 
@@ -195,24 +209,21 @@ class Team:
             else:
                 upper, lower = max(record[i]), min(record[i])
 
+            # color the whole row in one lookup
+            fills, text_colors = ColorScale.get(scale, primaryColor=self.primary_color,
+                                                secondaryColor=self.secondary_color).row(record[i], lower, upper)
+
             for j in range(0, len(record) + 1):
                 # where wins <= games played, make the table
                 if j < len(record[i]):
-                    if absolute:
-                        r, g, b = Utils.gradient_color(0, 1, record[i][j], scale=scale,
-                                                       primaryColor=self.primary_color,
-                                                       secondaryColor=self.secondary_color)
-                    else:
-                        r, g, b = Utils.gradient_color(lower, upper, record[i][j], scale=scale,
-                                                       primaryColor=self.primary_color,
-                                                       secondaryColor=self.secondary_color)
+                    r, g, b = fills[j]
 
                     # Draw the color-coded box
                     graph.add_rect(margin + hstep * (4 + j), margin + vstep * (2 + i), hstep, vstep, color='none',
                                    fill=(r, g, b))
 
                     # Should the text be white or black?
-                    text_color = Utils.get_text_contrast_color(r, g, b)
+                    text_color = text_colors[j]
 
                     graph.add_text(margin + hstep * (4.5 + j),
                                    margin + vstep * (2.5 + i) - 2,
@@ -288,14 +299,9 @@ class Team:
 
             else:
                 # Add the opponent S&P+ value
-                opp_sp = self.schedule[self.schedule[self.name]['schedule'][i]['opponent']]['sp+']
                 # Use the most recent S&P+ values prior to the specified date
                 # Note there might be a misalignment between the S&P+ value dates for different teams, especially FCS teams
-                d = datetime.strptime(cur_date, '%Y-%m-%d')
-                date = max(
-                    datetime.strptime(dt, '%Y-%m-%d') for dt in opp_sp.keys() if
-                    datetime.strptime(dt, '%Y-%m-%d') <= d).strftime('%Y-%m-%d')
-                osp = opp_sp[date]
+                osp = self.ratings.latest(self.schedule[self.name]['schedule'][i]['opponent'], cur_date)
                 if osp > 0:
                     txt = '+{}'.format(osp)
                     r, g, b = 0, 205, 0
@@ -392,7 +398,7 @@ class Team:
                     opponent = self.schedule[self.name]['schedule'][i]['opponent']
                     graph.add_image(2 * hstep + margin + (hstep - logowidth) / 2,
                                     vstep * (2 + i) + margin + (vstep - logoheight) / 2, logowidth, logoheight,
-                                    self.schedule[opponent]['logoURI'])
+                                    self.schedule[opponent]['logoURI'], name=opponent)
                 except KeyError:
                     pass
 
@@ -425,25 +431,30 @@ class Team:
 
         graph.write_file()
 
-    def project_win_totals(self, week=-1):
+    def get_rating_date(self, week=-1):
+        # the rating date whose win probabilities stand for the week
         if (week < 0) or (week > len(self.win_probabilities)):
             week = -1
 
-        best_match = self.get_best_sp_match(week)
+        return self.get_best_sp_match(week)
 
-        win_probs = [x for x in self.win_probabilities[best_match]]
+    def get_win_probabilities(self, week=-1):
+        return self.win_probabilities[self.get_rating_date(week)]
 
-        # Make a ragged table to store 'games' x 'wins'
-        record = [[0 for y in range(0, x + 1)] for x in range(1, len(win_probs) + 1)]
-        record[0][0] = 1 - win_probs[0]  # first game was a loss
-        record[0][1] = win_probs[0]  # first game was a win
-
-        for i in range(1, len(record)):
-            for j in range(0, i + 1):
-                record[i][j] += record[i - 1][j] * (1 - win_probs[i])  # newest game was a loss
-                record[i][j + 1] += record[i - 1][j] * (win_probs[i])  # newest game was a win
-
-        return record
+    def project_win_totals(self, week=-1):
+        if self.history:
+            record = self.history.get(self, week, 'table')
+            if record:
+                return record['table']
+
+        # The ragged 'games' x 'wins' table is a view of the batched projection for this one team
+        win_probs = self.get_win_probabilities(week)
+        table = Projection.ragged(Projection.win_distributions([win_probs])[0])
+
+        if self.history:
+            table = [[float(x) for x in row] for row in table]
+            self.history.append(self, week, table=table, wins=table[-1], expected=Team.expected_wins(table[-1]))
+        return table
 
     def write_win_probability_csv(self, file='out'):
         record = self.project_win_totals()
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def synthetic_schedule(teams=12, weeks=8, played=3, seed=0, start=date(2018, 9, 1)):
+    """Return a schedule in the Schedule layout: two conferences of two divisions, a round robin of 'weeks' weeks.
+
+    Teams are rated the week before each game week; the first 'played' weeks have results, the rest are to play."""
+    rng = np.random.default_rng(seed)
+    names = ['team{:02d}'.format(i) for i in range(teams)]
+    schedule = {}
+    for i, name in enumerate(names):
+        rating = float(np.round(rng.normal(0, 10), 1))
+        schedule[name] = {'conference': 'sec' if i < teams // 2 else 'big ten',
+                          'division': 'east' if i % 2 else 'west',
+                          'nameRaw': name.title(), 'logoURI': None, 'color': '#000000', 'schedule': [],
+                          'sp+': {(start + timedelta(7 * k - 2)).strftime('%Y-%m-%d'): float(rating + k)
+                                  for k in range(weeks)}}
+
+    # circle method: every team plays once a week, each week against a new opponent
+    order = list(range(teams))
+    for week in range(weeks):
+        day = (start + timedelta(7 * week)).strftime('%Y-%m-%d')
+        for k in range(teams // 2):
+            home, away = order[k], order[-1 - k]
+            won = bool(rng.random() < 0.5)
+            for team, other, side, result in ((home, away, 'home', won), (away, home, 'away', not won)):
+                schedule[names[team]]['schedule'].append({
+                    'id': '{}{:02d}'.format(week, k), 'opponent': names[other], 'home-away': side,
+                    'startDate': day, 'startTime': '12:00 PM ET', 'location': '', 'canceled': 'false',
+                    'winner': ('true' if result else 'false') if week < played else '',
+                    'scoreBreakdown': [], 'teamRank': '0'})
+        order = [order[0]] + [order[-1]] + order[1:-1]
+    return schedule
+
+
+def today(weeks_played=3, start=date(2018, 9, 1)):
+    """Return the day after the last played week of synthetic_schedule, as a '%Y-%m-%d' string."""
+    return (start + timedelta(7 * (weeks_played - 1) + 1)).strftime('%Y-%m-%d')
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import HTTPCache
+from fetch import Fetcher
+
+
+def response(body):
+    result = requests.models.Response()
+    result.status_code = 200
+    result._content = body
+    return result
+
+
+class HTTPCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = HTTPCache(path=self.dir, max_size=1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_size_is_tracked_without_listing(self):
+        scans = []
+        bodies = self.cache.bodies
+        self.cache.bodies = lambda: scans.append(1) or bodies()
+        for i in range(8):
+            self.cache.store('http://example.com/{}'.format(i), response(b'x' * 100))
+        # overwriting an entry replaces its size rather than adding to it
+        self.cache.store('http://example.com/0', response(b'x' * 50))
+        self.assertEqual(self.cache.size, 750)
+        self.assertEqual(len(scans), 1)
+
+    def test_evicts_oldest_below_limit(self):
+        for i in range(12):
+            self.cache.store('http://example.com/{}'.format(i), response(b'x' * 100))
+            os.utime(self.cache.get_paths('http://example.com/{}'.format(i))[1], (i, i))
+        self.assertLessEqual(self.cache.size, 1000)
+        self.assertEqual(self.cache.size, sum(x[1] for x in self.cache.bodies()))
+        self.assertIsNone(self.cache.load('http://example.com/0')[0])
+        self.assertIsNotNone(self.cache.load('http://example.com/11')[0])
+
+
+class SharedFetcherTest(unittest.TestCase):
+    def setUp(self):
+        self.clients = Fetcher.clients
+        Fetcher.clients = {(): Fetcher(cache=HTTPCache(path=tempfile.mkdtemp()))}
+
+    def tearDown(self):
+        shutil.rmtree(Fetcher.clients[()].cache.path)
+        for client in Fetcher.clients.values():
+            client.close()
+        Fetcher.clients = self.clients
+
+    def test_clients_are_kept_per_configuration(self):
+        self.assertIs(Fetcher.shared(retries=10), Fetcher.shared())
+        self.assertIs(Fetcher.shared(retries=3), Fetcher.shared(retries=3))
+        self.assertIsNot(Fetcher.shared(retries=3), Fetcher.shared())
+        self.assertIs(Fetcher.shared(retries=3).cache, Fetcher.shared().cache)
+        self.assertEqual(len(Fetcher.clients), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colors import ColorScale
+from Utils import Utils
+
+SCALES = [('red-green', None, None), ('red-blue', None, None), ('black-red', None, None),
+          ('team', (200, 16, 46), (255, 205, 0))]
+
+
+def per_cell(values, lower=0, upper=1, scale='red-green', primaryColor=None, secondaryColor=None):
+    """The fill and text colors as the graphs computed them before the lookup tables, one cell at a time."""
+    fills, text = [], []
+    for x in values:
+        r, g, b = Utils.gradient_color(lower, upper, x, scale=scale, primaryColor=primaryColor,
+                                       secondaryColor=secondaryColor)
+        fills.append((r, g, b))
+        text.append(Utils.get_text_contrast_color(r, g, b))
+    return fills, text
+
+
+class ColorScaleTest(unittest.TestCase):
+    def test_samples_match_gradient_color(self):
+        for scale, primary, secondary in SCALES:
+            table = ColorScale.get(scale, resolution=64, primaryColor=primary, secondaryColor=secondary)
+            # the endpoints and every sampled point in between map to exactly the old colors
+            values = np.linspace(0, 1, 65)
+            fills, text = table.row(values)
+            expected_fills, expected_text = per_cell(values, scale=scale, primaryColor=primary,
+                                                     secondaryColor=secondary)
+            np.testing.assert_allclose(fills, expected_fills, rtol=0, atol=1e-9, err_msg=scale)
+            self.assertEqual(text, expected_text, scale)
+
+    def test_values_between_samples(self):
+        rng = np.random.default_rng(2)
+        values = rng.random(500)
+        for scale, primary, secondary in SCALES:
+            table = ColorScale.get(scale, primaryColor=primary, secondaryColor=secondary)
+            for lower, upper in ((0, 1), (0.2, 0.7)):
+                fills, text = table.row(values * (upper - lower) + lower, lower, upper)
+                expected, _ = per_cell(values * (upper - lower) + lower, lower, upper, scale=scale,
+                                       primaryColor=primary, secondaryColor=secondary)
+                # half a sample step off at most, which is within one unit of every channel
+                np.testing.assert_allclose(fills, expected, rtol=0, atol=1, err_msg=scale)
+                self.assertEqual(text, [Utils.get_text_contrast_color(*x) for x in fills], scale)
+
+    def test_values_outside_the_range_are_clamped(self):
+        for scale, primary, secondary in SCALES:
+            table = ColorScale.get(scale, primaryColor=primary, secondaryColor=secondary)
+            fills, text = table.row([-0.5, 0.1 - 1e-9, 0.1, 0.9, 0.9 + 1e-9, 1.7], 0.1, 0.9)
+            low, low_text = per_cell([0], scale=scale, primaryColor=primary, secondaryColor=secondary)
+            high, high_text = per_cell([1], scale=scale, primaryColor=primary, secondaryColor=secondary)
+            np.testing.assert_allclose(fills, low * 3 + high * 3, rtol=0, atol=1e-9, err_msg=scale)
+            self.assertEqual(text, low_text * 3 + high_text * 3, scale)
+
+    def test_interpolate(self):
+        values = np.linspace(-0.5, 1.5, 41)
+        for method in ('linear', 'cubic'):
+            np.testing.assert_allclose(ColorScale.interpolate(0.25, 0.75, values, method),
+                                       [Utils.interpolate(0.25, 0.75, x, method) for x in values], rtol=0, atol=1e-12)
+        self.assertEqual(list(ColorScale.interpolate(0.5, 0.5, values[:3])), [1.0] * 3)
+
+    def test_contrast(self):
+        rng = np.random.default_rng(3)
+        colors = rng.integers(0, 256, (2000, 3))
+        # the threshold itself: 123 is dark, anything brighter is light
+        colors[:2] = [[123, 123, 123], [124, 123, 123]]
+        expected = [Utils.get_text_contrast_color(*x) for x in colors.tolist()]
+        self.assertEqual([tuple(x) for x in ColorScale.contrast(colors).tolist()], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
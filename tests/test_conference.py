@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conference import Conference
+from projection import Projection
+from registry import TeamRegistry
+from tests.seasons import synthetic_schedule
+
+
+class ConferenceTest(unittest.TestCase):
+    def setUp(self):
+        self.schedule = synthetic_schedule()
+        self.conference = Conference('sec', self.schedule)
+
+    def tearDown(self):
+        TeamRegistry._shared.pop(id(self.schedule), None)
+
+    def test_totals_are_the_two_marginals(self):
+        teams = sorted(self.conference.teams, key=lambda x: x.name)
+        for week in (-1, 2):
+            rows = [t.get_win_probabilities(week) for t in teams]
+            flags = [t.get_conference_games() for t in teams]
+            wins = Projection.final_win_totals(rows)
+            conference = Projection.final_win_totals([[p for p, f in zip(x, y) if f] for x, y in zip(rows, flags)])
+            totals = self.conference.get_totals(week)[week]
+            for i, t in enumerate(teams):
+                np.testing.assert_allclose(totals[t.name][0], wins[i], rtol=0, atol=1e-12, err_msg=t.name)
+                np.testing.assert_allclose(totals[t.name][1], conference[i], rtol=0, atol=1e-12, err_msg=t.name)
+
+        # a second call reads the history and gives the same
+        self.assertEqual(self.conference.get_totals(-1), self.conference.get_totals(-1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph import Graph
+
+
+class StreamingGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'out.svg')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def draw(self, fail=False):
+        with Graph(path=self.path, width=100, height=100, stream=True) as graph:
+            graph.add_rect(0, 0, 10, 10)
+            if fail:
+                raise KeyError('opponent')
+            graph.add_text(5, 5, text='done')
+
+    def test_complete_graph_replaces_output(self):
+        self.draw()
+        with open(self.path, 'r', encoding='utf-8') as infile:
+            content = infile.read()
+        self.assertIn('done', content)
+        self.assertTrue(content.endswith('</svg>'))
+        self.assertEqual(os.listdir(self.dir), ['out.svg'])
+
+    def test_failed_graph_keeps_previous_output(self):
+        self.draw()
+        with open(self.path, 'r', encoding='utf-8') as infile:
+            before = infile.read()
+        with self.assertRaises(KeyError):
+            self.draw(fail=True)
+        with open(self.path, 'r', encoding='utf-8') as infile:
+            self.assertEqual(infile.read(), before)
+        self.assertEqual(os.listdir(self.dir), ['out.svg'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import ProjectionHistory
+
+
+class FakeTeam:
+    # the parts of Team the history reads
+    def __init__(self, name, probabilities):
+        self.name = name
+        self.win_probabilities = {'2018-09-10': probabilities}
+
+    def get_rating_date(self, week=-1):
+        return '2018-09-10'
+
+
+class ProjectionHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'projection history.jsonl')
+        self.team = FakeTeam('ohio state', [0.5, 0.75])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def lines(self):
+        with open(self.path, 'r', encoding='utf8') as infile:
+            return infile.read().splitlines()
+
+    def test_repeated_writes_are_skipped(self):
+        for i in range(3):
+            history = ProjectionHistory(self.path)
+            history.append(self.team, 4, wins=[0.125, 0.5, 0.375], rank=1)
+            history.append(self.team, 3, rank=1)
+        self.assertEqual(len(self.lines()), 1)
+
+        history = ProjectionHistory(self.path)
+        history.append(self.team, 4, rank=2)
+        self.assertEqual(len(self.lines()), 2)
+        self.assertEqual(ProjectionHistory(self.path).get(self.team, 4, 'wins', 'rank')['rank'], 2)
+
+    def test_stale_record_starts_over(self):
+        history = ProjectionHistory(self.path)
+        history.append(self.team, 4, rank=1)
+        self.team.win_probabilities['2018-09-10'] = [1.0, 0.75]
+        self.assertIsNone(history.get(self.team, 4))
+        history.append(self.team, 4, rank=1)
+        self.assertEqual(len(self.lines()), 2)
+
+    def test_truncated_last_line(self):
+        history = ProjectionHistory(self.path)
+        history.append(self.team, 4, rank=1)
+        with open(self.path, 'a', encoding='utf8') as outfile:
+            outfile.write('{"team": "ohio state", "date": "2018-09-10", "ra')
+
+        history = ProjectionHistory(self.path)
+        self.assertEqual(history.get(self.team, 4)['rank'], 1)
+        history.append(self.team, 4, rank=3)
+        self.assertEqual(ProjectionHistory(self.path).get(self.team, 4)['rank'], 3)
+        self.assertEqual(len(self.lines()), 2)
+
+    def test_corrupt_line_in_the_middle(self):
+        history = ProjectionHistory(self.path)
+        history.append(self.team, 4, rank=1)
+        with open(self.path, 'a', encoding='utf8') as outfile:
+            outfile.write('{"team": \n')
+        history.append(FakeTeam('michigan', [0.5]), 4, rank=2)
+        with self.assertRaises(ValueError):
+            ProjectionHistory(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from index import GameIndex
+
+
+def game(id, opponent, date, home='home'):
+    return {'id': id, 'opponent': opponent, 'home-away': home, 'startDate': date, 'winner': '', 'canceled': 'false'}
+
+
+class GameIndexTest(unittest.TestCase):
+    def setUp(self):
+        # the two teams meet in the regular season and again in the conference championship
+        self.schedule = {
+            'ohio state': {'nameRaw': 'Ohio St.', 'schedule': [game('1', 'northwestern', '2018-10-27'),
+                                                                game('2', 'michigan', '2018-11-24'),
+                                                                game('3', 'northwestern', '2018-12-01', 'away')]},
+            'northwestern': {'nameRaw': 'Northwestern', 'schedule': [game('1', 'ohio state', '2018-10-27', 'away'),
+                                                                      game('3', 'ohio state', '2018-12-01')]},
+        }
+        self.index = GameIndex(self.schedule)
+
+    def test_rematch_matches_by_id(self):
+        self.assertEqual(self.index.opponent_slot('ohio state', 0), 0)
+        self.assertEqual(self.index.opponent_slot('ohio state', 2), 1)
+        self.assertEqual(self.index.opponent_slot('northwestern', 1), 2)
+
+    def test_missing_game_is_not_matched_by_name(self):
+        # the championship game is missing from the opponent's list; the regular season game must not stand in for it
+        del self.schedule['northwestern']['schedule'][1]
+        self.index.reindex('northwestern')
+        self.assertIsNone(self.index.opponent_slot('ohio state', 2))
+        self.assertEqual(self.index.opponent_slot('ohio state', 0), 0)
+
+    def test_games_without_id_match_by_name_and_date(self):
+        for team in self.schedule:
+            for x in self.schedule[team]['schedule']:
+                x['id'] = ''
+        self.index.rebuild()
+        self.assertEqual(self.index.opponent_slot('ohio state', 2), 1)
+        self.assertEqual(self.index.opponent_slot('northwestern', 0), 0)
+
+    def test_opponent_without_entry(self):
+        self.assertIsNone(self.index.opponent_slot('ohio state', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
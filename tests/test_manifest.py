@@ -0,0 +1,59 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manifest import RenderManifest
+
+
+class DigestTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.schedule = {
+            'akron': {'conference': 'mac', 'logoURI': 'a', 'sp+': {'2018-08-27': 1.0},
+                      'schedule': [{'id': '1', 'opponent': 'buffalo', 'home-away': 'home', 'startDate': '2018-09-01'}]},
+            'buffalo': {'conference': 'mac', 'logoURI': 'b', 'sp+': {'2018-08-27': 2.0},
+                        'schedule': [{'id': '1', 'opponent': 'akron', 'home-away': 'away', 'startDate': '2018-09-01'}]},
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def digest(self, logo_dir=None):
+        return RenderManifest.digest(self.schedule, ['akron'], logo_dir=logo_dir, kind='team', name='akron')
+
+    def write_logo(self, name, data):
+        file = os.path.join(self.dir, name)
+        with open(file, 'wb') as outfile:
+            outfile.write(data)
+        # a new mtime, as a real edit would give, however fast the test runs
+        os.utime(file, ns=(time.time_ns(), time.time_ns() + len(data)))
+
+    def test_game_day_counts_as_played(self):
+        # the graph shows the game as played from its start date, so the digest must change on that day too
+        self.assertNotEqual(RenderManifest.digest(self.schedule, ['akron'], now=date(2018, 8, 31)),
+                            RenderManifest.digest(self.schedule, ['akron'], now=date(2018, 9, 1)))
+        self.assertEqual(RenderManifest.digest(self.schedule, ['akron'], now=date(2018, 9, 1)),
+                         RenderManifest.digest(self.schedule, ['akron'], now=date(2018, 9, 2)))
+
+    def test_logo_dir_counts(self):
+        self.assertNotEqual(self.digest(), self.digest(self.dir))
+
+    def test_logo_contents_count(self):
+        before = self.digest(self.dir)
+        # the opponent's logo appears on the team's graph too
+        self.write_logo('buffalo.png', b'one')
+        linked = self.digest(self.dir)
+        self.assertNotEqual(before, linked)
+        self.write_logo('buffalo.png', b'two')
+        self.assertNotEqual(linked, self.digest(self.dir))
+        self.assertEqual(self.digest(self.dir), self.digest(self.dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
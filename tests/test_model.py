@@ -0,0 +1,25 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Season
+from tests.seasons import synthetic_schedule
+
+
+class SeasonTest(unittest.TestCase):
+    def test_unparsed_scores(self):
+        schedule = synthetic_schedule()
+        games = schedule['team00']['schedule']
+        # update_from_NCAA keeps a breakdown it can't parse as it came
+        games[0]['scoreBreakdown'] = ['7', '0', 'x', '']
+        games[1]['scoreBreakdown'] = ['7', '0', '', '14']
+        games[2]['scoreBreakdown'] = [3, 10, 0, 7]
+        season = Season.from_schedule(schedule)
+        points = [season.games[x].points_for for x in season.teams[season.ids['team00']].games[:3]]
+        self.assertEqual(points, [0, 21, 20])
+
+
+if __name__ == '__main__':
+    unittest.main()
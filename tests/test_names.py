@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from names import TeamNames, clean
+
+
+class TeamNamesTest(unittest.TestCase):
+    def setUp(self):
+        schedule = {x: {'nameRaw': y} for x, y in (('texas am', 'Texas A&M'), ('byu', 'BYU'), ('ole miss', 'Ole Miss'),
+                                                   ('miami', 'Miami (FL)'), ('miami (oh)', 'Miami (OH)'),
+                                                   ('ucf', 'UCF'), ('nc state', 'NC State'))}
+        self.names = TeamNames(schedule)
+
+    def test_sources_resolve_to_schedule_keys(self):
+        # AP, S&P+ and NCAA spellings of the same teams
+        for name, team in (('Texas A&M', 'texas am'), ('Brigham Young', 'byu'), ('Mississippi', 'ole miss'),
+                           ('Miami (Fla.)', 'miami'), ('Miami (OH)', 'miami (oh)'), ('Central Florida', 'ucf'),
+                           ('NC State', 'nc state')):
+            self.assertEqual(self.names.resolve(name), team, name)
+
+    def test_unknown_name(self):
+        self.assertIsNone(self.names.resolve('Slippery Rock'))
+
+    def test_clean(self):
+        self.assertEqual(clean('Western N.M.'), 'western new mexico')
+        self.assertEqual(clean('NC State'), 'north carolina state')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import HTTPCache
+from fetch import Fetcher
+from poll import APPoll
+from tests.server import serve
+
+POLL = '''<html><body><div id="poll-released">Poll released Aug 20</div>
+<div class="voter-menu filter-menu clearfix"><a href="voter/a">Voter A</a><a href="voter/b">Voter B</a></div>
+</body></html>'''
+
+BALLOT = '''<html><body><div class="voter-pub">{}</div><table>{}</table></body></html>'''
+
+
+def ballot(outlet, teams):
+    rows = ''.join('<tr class="{0}"><td>{0}</td><td>{1} (1)</td></tr>'.format(i + 1, x) for i, x in enumerate(teams))
+    return BALLOT.format(outlet, rows)
+
+
+class Ballots(Fetcher):
+    # serves the ballot pages, whose urls are absolute ap.org links, from the local server instead
+    def __init__(self, root, cache):
+        super().__init__(workers=2, retries=0, cache=cache)
+        self.root = root
+
+    def request(self, url, **kwargs):
+        return super().request(self.root + '/' + url.split('ap.org/', 1)[1], **kwargs)
+
+
+class APPollTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.clients = Fetcher.clients
+        Fetcher.clients = {(): Fetcher(cache=HTTPCache(path=os.path.join(self.dir, 'cache')))}
+        self.checkpoint = os.path.join(self.dir, 'checkpoint.json')
+
+    def tearDown(self):
+        for client in Fetcher.clients.values():
+            client.close()
+        Fetcher.clients = self.clients
+        shutil.rmtree(self.dir)
+
+    def scrape(self, routes):
+        poll = APPoll(year=2018, week=1)
+        with serve(routes) as root:
+            with Ballots(root, Fetcher.shared().cache) as fetcher:
+                poll.scrape(url=root + '/poll', checkpoint=self.checkpoint, fetcher=fetcher)
+        return poll
+
+    def test_error_pages_are_not_checkpointed(self):
+        routes = {'/poll/2018/1': (200, POLL),
+                  '/voter/a/2018/1': (200, ballot('Outlet A', ['Alabama', 'Clemson'])),
+                  '/voter/b/2018/1': (403, 'forbidden')}
+        with self.assertRaises(RuntimeError):
+            self.scrape(routes)
+        with open(self.checkpoint, 'r') as infile:
+            self.assertEqual(list(json.load(infile)), ['Voter A'])
+
+        # the rerun only fetches the missing ballot and finishes
+        routes['/voter/a/2018/1'] = (500, 'should not be fetched again')
+        routes['/voter/b/2018/1'] = (200, ballot('Outlet B', ['Clemson', 'Alabama']))
+        poll = self.scrape(routes)
+        self.assertEqual(poll.ballots['voters']['Voter A']['rankings'][:2], ['Alabama', 'Clemson'])
+        self.assertEqual(poll.ballots['voters']['Voter B']['rankings'][:2], ['Clemson', 'Alabama'])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_error_poll_page_raises(self):
+        with self.assertRaises(requests.HTTPError):
+            self.scrape({'/poll/2018/1': (503, 'unavailable')})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+if __name__ == '__main__':
+    unittest.main()
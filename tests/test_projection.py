@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projection import Projection
+
+
+def ragged_record(win_probs):
+    """The ragged 'games' x 'wins' table as Team.project_win_totals built it before the batched engine."""
+    record = [[0 for y in range(0, x + 1)] for x in range(1, len(win_probs) + 1)]
+    record[0][0] = 1 - win_probs[0]  # first game was a loss
+    record[0][1] = win_probs[0]  # first game was a win
+
+    for i in range(1, len(record)):
+        for j in range(0, i + 1):
+            record[i][j] += record[i - 1][j] * (1 - win_probs[i])  # newest game was a loss
+            record[i][j + 1] += record[i - 1][j] * (win_probs[i])  # newest game was a win
+
+    return record
+
+
+class ProjectionTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        # uneven schedule lengths, with games already decided either way among them
+        self.rows = [list(rng.random(n)) for n in (12, 1, 9, 13, 11)]
+        self.rows[2][3], self.rows[3][0], self.rows[3][-1] = 0.0, 1.0, 1.0
+
+    def test_win_distributions_match_the_ragged_loop(self):
+        for row in self.rows:
+            expected = ragged_record(row)
+            table = Projection.win_distributions([row])[0]
+            result = Projection.ragged(table)
+            self.assertEqual([len(x) for x in result], [len(x) for x in expected])
+            for i in range(len(row)):
+                np.testing.assert_allclose(result[i], expected[i], rtol=0, atol=1e-12)
+                # nothing beyond i + 1 wins after i + 1 games
+                self.assertFalse(table[i, i + 2:].any())
+
+    def test_final_win_totals_match_the_ragged_loop(self):
+        totals = Projection.final_win_totals(self.rows)
+        for row, result in zip(self.rows, totals):
+            self.assertEqual(len(result), len(row) + 1)
+            np.testing.assert_allclose(result, ragged_record(row)[-1], rtol=0, atol=1e-12)
+
+    def test_padding(self):
+        # a short row padded with certain losses keeps its distribution, whatever it is batched with
+        alone = Projection.final_win_totals(self.rows[1:2])
+        self.assertEqual(Projection.final_win_totals(self.rows)[1], alone[0])
+        self.assertEqual(len(alone[0]), 2)
+
+        matrix, lengths = Projection.pad(self.rows)
+        self.assertEqual(matrix.shape, (len(self.rows), 13))
+        self.assertEqual(list(lengths), [len(x) for x in self.rows])
+        self.assertFalse(matrix[1, 1:].any())
+
+        # a team with no games left to project has zero wins for certain
+        self.assertEqual(Projection.final_win_totals([[], [0.5]]), [[1.0], [0.5, 0.5]])
+        self.assertEqual(Projection.final_win_totals([[], []]), [[1.0], [1.0]])
+        self.assertEqual(Projection.final_win_totals([]), [])
+
+    def test_joint_marginals(self):
+        rng = np.random.default_rng(6)
+        flags = [list(rng.random(len(x)) < 0.6) for x in self.rows]
+        # a team without conference games
+        flags[1] = [False]
+        wins = Projection.final_win_totals(self.rows)
+        conference = Projection.final_win_totals([[p for p, f in zip(x, y) if f] for x, y in zip(self.rows, flags)])
+        tables = Projection.final_joint_totals(self.rows, flags)
+        for i, table in enumerate(tables):
+            self.assertEqual(table.shape, (len(self.rows[i]) + 1, sum(flags[i]) + 1))
+            np.testing.assert_allclose(table.sum(axis=1), wins[i], rtol=0, atol=1e-12)
+            np.testing.assert_allclose(table.sum(axis=0), conference[i], rtol=0, atol=1e-12)
+            # no more conference wins than wins
+            self.assertFalse(np.triu(table, 1).any())
+
+        # the unpadded matrix form agrees with the ragged one
+        matrix, lengths = Projection.pad(self.rows)
+        padded = np.zeros(matrix.shape, dtype=bool)
+        for i, x in enumerate(flags):
+            padded[i, :len(x)] = x
+        joint = Projection.joint_distributions(matrix, padded)
+        wins = Projection.win_distributions(matrix)[:, -1, :]
+        np.testing.assert_allclose(joint.sum(axis=2), wins, rtol=0, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
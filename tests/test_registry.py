@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import TeamRegistry
+
+
+def season():
+    """Three teams that play each other, rated on two dates."""
+    schedule = {}
+    for i, name in enumerate(('akron', 'buffalo', 'kent state')):
+        schedule[name] = {'conference': 'mac', 'logoURI': None, 'color': '#000000', 'schedule': [],
+                          'sp+': {'2018-08-27': float(i), '2018-09-03': float(2 * i)}}
+    for k, (home, away) in enumerate((('akron', 'buffalo'), ('buffalo', 'kent state'), ('kent state', 'akron'))):
+        for team, other, side in ((home, away, 'home'), (away, home, 'away')):
+            schedule[team]['schedule'].append({'id': str(k), 'opponent': other, 'home-away': side,
+                                               'startDate': '2018-09-0{}'.format(k + 1), 'winner': '',
+                                               'canceled': 'false'})
+    return schedule
+
+
+class TeamRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.shared, self.standins = TeamRegistry._shared, TeamRegistry._standins
+        TeamRegistry._shared, TeamRegistry._standins = type(self.shared)(), {}
+
+    def tearDown(self):
+        TeamRegistry._shared, TeamRegistry._standins = self.shared, self.standins
+
+    def test_shared_registries_are_bounded(self):
+        schedules = [season() for i in range(TeamRegistry.keep + 3)]
+        registries = [TeamRegistry.shared(x) for x in schedules]
+        self.assertEqual(len(TeamRegistry._shared), TeamRegistry.keep)
+        self.assertIs(TeamRegistry.shared(schedules[-1]), registries[-1])
+        # an evicted schedule simply gets a new registry
+        self.assertIsNot(TeamRegistry.shared(schedules[0]), registries[0])
+
+    def test_standins_keep_the_base_registry(self):
+        base = season()
+        registry = TeamRegistry.shared(base)
+        # more scenarios than 'keep', each standing in for its own copy of the schedule
+        for i in range(TeamRegistry.keep + 1):
+            overlay = season()
+            standin = TeamRegistry(overlay)
+            TeamRegistry.register(overlay, standin)
+            self.assertIs(TeamRegistry.shared(overlay), standin)
+            TeamRegistry.release(overlay)
+        self.assertIs(TeamRegistry.shared(base), registry)
+        self.assertEqual(TeamRegistry._standins, {})
+
+    def test_invalidate_rebuilds_the_season_model(self):
+        schedule = season()
+        registry = TeamRegistry(schedule)
+        registry.use_season()
+        registry.get('akron')
+        # what Schedule.update_spplus does when it runs twice on one day
+        schedule['buffalo']['sp+']['2018-09-03'] = 40.0
+        registry.invalidate('buffalo')
+        registry.get('akron')
+        buffalo = registry.season.teams[registry.season.ids['buffalo']]
+        self.assertEqual(buffalo.rating_values[-1], 40.0)
+
+    def test_rating_versions_are_cached(self):
+        schedule = season()
+        registry = TeamRegistry(schedule)
+        team = registry.get('akron')
+        cached = dict(registry.rating_versions)
+        self.assertIs(registry.get('akron'), team)
+        self.assertTrue(all(registry.rating_versions[x] is cached[x] for x in cached))
+
+        # a new rating date for an opponent is picked up without being told
+        schedule['buffalo']['sp+']['2018-09-10'] = 30.0
+        self.assertIsNot(registry.get('akron'), team)
+
+        # a rating changed in place is picked up once the team is invalidated
+        team = registry.get('akron')
+        schedule['kent state']['sp+']['2018-09-03'] = -30.0
+        registry.invalidate('kent state')
+        self.assertIsNot(registry.get('akron'), team)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projection import Projection
+from registry import TeamRegistry
+from scenario import Scenario
+from tests.seasons import synthetic_schedule
+
+# the week whose rating date leaves every game of the synthetic season still to play
+WEEK = 2
+
+
+class ScenarioTest(unittest.TestCase):
+    def setUp(self):
+        self.schedule = synthetic_schedule()
+        self.before = copy.deepcopy(self.schedule)
+        self.registry = TeamRegistry.shared(self.schedule)
+        self.teams = {x: self.registry.get(x) for x in self.schedule}
+        self.totals = self.project(self.registry, self.schedule)
+
+    def tearDown(self):
+        TeamRegistry._shared.pop(id(self.schedule), None)
+
+    def project(self, registry, names):
+        names = sorted(names)
+        totals = Projection.final_win_totals([registry.get(x).get_win_probabilities(WEEK) for x in names])
+        return dict(zip(names, totals))
+
+    def check_base(self, scenario, touched):
+        """The base schedule and its Teams are as they were; only the touched teams project differently."""
+        self.assertEqual(self.schedule, self.before)
+        self.assertLessEqual(set(scenario.schedule.changes), touched)
+        for name in self.schedule:
+            self.assertIs(self.registry.get(name), self.teams[name])
+            if name not in touched:
+                self.assertIs(scenario.get(name), self.teams[name])
+        self.assertEqual(self.project(self.registry, self.schedule), self.totals)
+        projected = scenario.project(self.schedule, WEEK)
+        for name in self.schedule:
+            if name not in scenario.touched:
+                self.assertEqual(projected[name], self.totals[name], name)
+        return projected
+
+    def test_pin(self):
+        game = self.schedule['team00']['schedule'][5]
+        opponent = game['opponent']
+        scenario = Scenario(self.schedule).pin('team00', opponent)
+        self.assertEqual(scenario.touched, {'team00', opponent})
+        projected = self.check_base(scenario, {'team00', opponent})
+        self.assertEqual(scenario.schedule['team00']['schedule'][5]['winner'], 'true')
+        self.assertEqual(self.schedule['team00']['schedule'][5]['winner'], '')
+
+        for name, result in (('team00', 1.0), (opponent, 0.0)):
+            probabilities = list(self.teams[name].get_win_probabilities(WEEK))
+            i = [x['id'] for x in self.schedule[name]['schedule']].index(game['id'])
+            probabilities[i] = result
+            self.assertEqual(projected[name], Projection.final_win_totals([probabilities])[0], name)
+
+    def test_set_rating(self):
+        opponents = {x['opponent'] for x in self.schedule['team00']['schedule']}
+        scenario = Scenario(self.schedule).set_rating('team00', 80.0)
+        self.assertEqual(scenario.touched, opponents | {'team00'})
+        projected = self.check_base(scenario, opponents | {'team00'})
+        self.assertEqual(set(scenario.schedule['team00']['sp+'].values()), {80.0})
+        self.assertNotEqual(set(self.schedule['team00']['sp+'].values()), {80.0})
+
+        # every game is now a near-certain win for team00, and a loss for each opponent
+        expected = sum(x * y for x, y in enumerate(projected['team00']))
+        self.assertGreater(expected, sum(x * y for x, y in enumerate(self.totals['team00'])))
+        self.assertGreater(expected, len(self.schedule['team00']['schedule']) - 0.5)
+        for name in opponents:
+            self.assertNotEqual(projected[name], self.totals[name], name)
+
+    def test_swap(self):
+        scenario = Scenario(self.schedule).swap('team00', 'team01')
+        affected = {x['opponent'] for x in self.schedule['team00']['schedule'] + self.schedule['team01']['schedule']}
+        self.assertEqual(scenario.touched, affected | {'team00', 'team01'})
+        self.check_base(scenario, affected | {'team00', 'team01'})
+
+        names = {'team00': 'team01', 'team01': 'team00'}
+        for team, other in names.items():
+            self.assertEqual([names.get(x['opponent'], x['opponent']) for x in scenario.schedule[team]['schedule']],
+                             [x['opponent'] for x in self.schedule[other]['schedule']])
+        for name in affected - {'team00', 'team01'}:
+            self.assertEqual([names.get(x['opponent'], x['opponent']) for x in scenario.schedule[name]['schedule']],
+                             [x['opponent'] for x in self.schedule[name]['schedule']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import HTTPCache
+from fetch import Fetcher
+from Schedule import Schedule
+from tests.server import serve
+
+
+def scoreboard(*games):
+    return 'callbackWrapper({})'.format(json.dumps({'scoreboard': [{'games': list(games)}]}))
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.clients = Fetcher.clients
+        Fetcher.clients = {(): Fetcher(cache=HTTPCache(path=os.path.join(self.dir, 'cache')))}
+        self.file = os.path.join(self.dir, 'new schedule.json')
+
+    def tearDown(self):
+        for client in Fetcher.clients.values():
+            client.close()
+        Fetcher.clients = self.clients
+        shutil.rmtree(self.dir)
+
+    def test_download(self):
+        # recorded scoreboards for two weeks; every other week is a 404
+        routes = {
+            '/jsonp/scoreboard/football/fbs/2018/01/scoreboard.json': scoreboard('game/3.json', 'game/1.json',
+                                                                                'game/10.json'),
+            '/jsonp/scoreboard/football/fbs/2018/02/scoreboard.json': scoreboard('game/2.json', 'game/bad.json',
+                                                                                'game/gone.json', 'game/denied.json'),
+            '/jsonp/game/1.json': (200, json.dumps({'id': '1', 'startDate': '2018-09-01'})),
+            '/jsonp/game/3.json': (200, json.dumps({'id': '3', 'startDate': '2018-08-30'})),
+            '/jsonp/game/10.json': (200, json.dumps({'id': '10', 'startDate': '2018-09-01'})),
+            '/jsonp/game/2.json': (200, json.dumps({'id': '2', 'startDate': '2018-09-08'})),
+            '/jsonp/game/bad.json': (200, '<html>maintenance</html>'),
+            '/jsonp/game/denied.json': (403, 'forbidden'),
+        }
+        routes = {x: (200, y) if isinstance(y, str) else y for x, y in routes.items()}
+        with open(self.file, 'w') as outfile:
+            outfile.write('previous pull')
+
+        with serve(routes) as root:
+            result = Schedule.download_schedules(year=2018, root=root, file=self.file, workers=4)
+
+        self.assertEqual([x['id'] for x in result], ['3', '1', '10', '2'])
+        with open(self.file, 'r') as infile:
+            self.assertEqual(json.load(infile), result)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['cache', 'new schedule.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Season
+from projection import Projection
+from ratings import RatingIndex
+from simulate import SeasonSimulator
+from tests.seasons import synthetic_schedule, today
+
+
+class SeasonSimulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.schedule = synthetic_schedule()
+        self.now = today()
+        self.season = Season.from_schedule(self.schedule)
+        self.simulator = SeasonSimulator(self.season, now=self.now)
+
+    def test_marginals_match_projection(self):
+        # the rating date Team would use today; games after it are still open at that date, as in the projection
+        now = RatingIndex.ordinal(self.now)
+        key = max((x for x in self.schedule['team00']['sp+'] if RatingIndex.ordinal(x) <= now), key=RatingIndex.ordinal)
+        result = SeasonSimulator(self.season, date=key, now=self.now).run(200000, seed=3, chunk=50000)
+        for name in self.schedule:
+            probabilities = self.season.win_probabilities(name, now=self.now)
+            expected = Projection.final_win_totals([probabilities[key]])[0]
+            np.testing.assert_allclose(result['wins'][name], expected, atol=0.006, err_msg=name)
+
+    def test_seed_reproduces_across_workers(self):
+        serial = self.simulator.run(20000, seed=11, workers=1, chunk=5000)
+        parallel = self.simulator.run(20000, seed=11, workers=2, chunk=5000)
+        self.assertEqual(serial, parallel)
+
+    def test_opponent_outside_the_season(self):
+        # an unmatched FCS opponent: one game already won, one still to play
+        games = self.schedule['team00']['schedule']
+        games.append(dict(games[0], id='fcs1', opponent='slippery rock', startDate='2018-08-25', winner='true'))
+        games.append(dict(games[-2], id='fcs2', opponent='slippery rock', startDate='2018-11-24', winner=''))
+        simulator = SeasonSimulator(Season.from_schedule(self.schedule), now=self.now)
+        self.assertEqual(simulator.left_out, [('team00', 'fcs2')])
+
+        result = simulator.run(2000, seed=1)
+        before = self.simulator.run(2000, seed=1)
+        # the played game counts as a win, the unplayed one isn't there
+        self.assertEqual(len(result['wins']['team00']), len(before['wins']['team00']) + 1)
+        self.assertEqual(result['wins']['team00'][0], 0.0)
+        self.assertAlmostEqual(sum(result['wins']['team00']), 1.0)
+        self.assertEqual(result['wins']['team01'], before['wins']['team01'])
+
+
+if __name__ == '__main__':
+    unittest.main()
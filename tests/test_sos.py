@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import TeamRegistry
+from sos import ScheduleStrength
+from tests.seasons import synthetic_schedule
+from winprob import WinProbability
+
+
+class ScheduleStrengthTest(unittest.TestCase):
+    def setUp(self):
+        self.schedule = synthetic_schedule()
+        # a ninth game for one team, so the schedules are of uneven length
+        games = self.schedule['team00']['schedule']
+        games.append(dict(games[0], id='bowl', opponent='team07', **{'home-away': 'away', 'startDate': '2018-12-29'}))
+        self.registry = TeamRegistry(self.schedule)
+        self.teams = [self.registry.get(x) for x in sorted(self.schedule)]
+        self.references = [-5.0, 0.0, 12.5]
+
+    def direct(self, dates, games=None, **options):
+        """Expected wins of a team of each reference rating, one team, game and reference at a time."""
+        result = []
+        for team, date in zip(self.teams, dates):
+            row = []
+            for reference in self.references:
+                wins = 0
+                for game in self.schedule[team.name]['schedule'][:games]:
+                    opponent = self.registry.ratings.latest(game['opponent'], date)
+                    wins += WinProbability.single(reference, opponent, game['home-away'], **options)
+                row.append(wins)
+            result.append(row)
+        return result
+
+    def test_expected_wins_match_a_direct_loop(self):
+        keys = sorted(self.schedule['team00']['sp+'])
+        for dates in (None, keys[3], [keys[i % len(keys)] for i in range(len(self.teams))]):
+            per_team = dates if isinstance(dates, list) else [dates] * len(self.teams)
+            sos = ScheduleStrength(self.teams, self.registry.ratings, dates=dates)
+            np.testing.assert_allclose(sos.expected_wins(self.references), self.direct(per_team), rtol=0, atol=1e-12)
+            np.testing.assert_allclose(sos.expected_wins(self.references, games=4), self.direct(per_team, games=4),
+                                       rtol=0, atol=1e-12)
+
+        sos = ScheduleStrength(self.teams, self.registry.ratings, home_advantage=0, stdev=10)
+        expected = self.direct([None] * len(self.teams), home_advantage=0, stdev=10)
+        np.testing.assert_allclose(sos.expected_wins(self.references), expected, rtol=0, atol=1e-12)
+
+    def test_schedules(self):
+        sos = ScheduleStrength(self.teams, self.registry.ratings)
+        schedules = sos.schedules(0.0)
+        self.assertEqual([len(x) for x in schedules], [9] + [8] * (len(self.teams) - 1))
+        np.testing.assert_allclose([sum(x) for x in schedules], sos.expected_wins([0.0])[:, 0], rtol=0, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import base64
+import copy
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from store import SeasonStore
+
+
+def ncaa_schedule():
+    """Build a schedule in the Schedule layout from the NCAA pull shipped with the repo, keeping its raw values."""
+    with open(os.path.join(ROOT, 'schedule.json'), 'r', encoding='utf8') as infile:
+        pull = json.load(infile)
+
+    schedule = {}
+    for game in pull:
+        for side, other in (('home', 'away'), ('away', 'home')):
+            name = game[side]['nameSeo']
+            entry = schedule.setdefault(name, {'conference': game['conference'], 'nameRaw': game[side]['nameRaw'],
+                                               'color': game[side]['color'], 'schedule': []})
+            entry['schedule'].append({'id': game['id'], 'opponent': game[other]['nameSeo'], 'home-away': side,
+                                      'startDate': game['startDate'], 'startTime': game['startTime'],
+                                      'location': game['location'], 'winner': game[side]['winner'],
+                                      'canceled': 'false', 'scoreBreakdown': game[side]['scoreBreakdown'],
+                                      'teamRank': game[side]['teamRank']})
+
+    for i, name in enumerate(sorted(schedule)):
+        entry = schedule[name]
+        logo = os.path.join(ROOT, 'Resources', name + '.png')
+        if os.path.exists(logo):
+            with open(logo, 'rb') as infile:
+                entry['logoURI'] = base64.b64encode(infile.read()).decode()
+        # most teams are rated weekly, some never are
+        if i % 7:
+            entry['sp+'] = {'2018-08-2{}'.format(k): round(i * 0.37 - k, 1) for k in range(0, 9, 3)}
+    return schedule
+
+
+class SeasonStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.schedule = ncaa_schedule()
+
+        # the odd values a hand-maintained schedule picks up over a season
+        games = [x for name in sorted(self.schedule) for x in self.schedule[name]['schedule']]
+        games[0]['scoreBreakdown'] = ['7', '0', '', '14']
+        games[1]['scoreBreakdown'] = [3, 10, 0, 7]
+        games[2]['scoreBreakdown'] = ['07']
+        del games[3]['winner']
+        del games[4]['id']
+        del games[5]['canceled']
+        games[6]['startTime'] = None
+        games[7]['location'] = None
+        games[8]['winner'] = ''
+        games[9]['id'] = 12345
+        games[10]['home-away'] = 'neutral'
+        games[11]['spplus'] = [0.5]
+        names = sorted(self.schedule)
+        self.schedule[names[1]]['sp+'] = {'2018-8-27': 5}
+        self.schedule[names[2]]['logoURI'] = None
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        expected = copy.deepcopy(self.schedule)
+        store = SeasonStore.from_schedule(self.schedule, self.path)
+        self.assertEqual(SeasonStore(self.path).to_schedule(), expected)
+        self.assertEqual(store.to_schedule(logos=False), expected)
+
+    def test_lazy_logos(self):
+        SeasonStore.from_schedule(self.schedule, self.path)
+        result = SeasonStore(self.path).to_schedule(logos=False)
+        name = next(x for x in sorted(self.schedule) if self.schedule[x].get('logoURI'))
+        self.assertNotIn('logoURI', dict.keys(result[name]))
+        self.assertNotIn('logoURI', dict.keys(pickle.loads(pickle.dumps(result[name]))))
+        self.assertEqual(json.loads(json.dumps(result[name])), self.schedule[name])
+        # entries travel to worker processes and into scenario overlays without loading their logos
+        for entry in (pickle.loads(pickle.dumps(result[name])), copy.copy(result[name]), result[name]):
+            self.assertEqual(entry['logoURI'], self.schedule[name]['logoURI'])
+            self.assertEqual(entry.get('logoURI'), self.schedule[name]['logoURI'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+from scipy.special import ndtr
+
+
+class WinProbability:
+    # The S&P+ win probability: the margin of a game is taken to be normally distributed around the difference of
+    # the two ratings plus the home-field advantage, with a fixed standard deviation. The class attributes are the
+    # defaults for every caller; pass home_advantage / stdev to override them for one call.
+    home_advantage = 2.5
+    stdev = 17
+
+    @staticmethod
+    def cdf(x):
+        """Return the standard normal CDF of a number or an array."""
+        if isinstance(x, np.ndarray):
+            # a float64 ufunc: no per-element Python calls and no object arrays
+            return ndtr(x.astype(np.float64, copy=False))
+        return 0.5 * math.erfc(-x / math.sqrt(2))
+
+    @staticmethod
+    def single(rating, opponent, loc, home_advantage=None, stdev=None):
+        """Return the probability that a team rated 'rating' beats one rated 'opponent'; loc is 'home' or 'away'."""
+        home_advantage = WinProbability.home_advantage if home_advantage is None else home_advantage
+        stdev = WinProbability.stdev if stdev is None else stdev
+        if loc == 'home':
+            return WinProbability.cdf((rating - opponent + home_advantage) / stdev)
+        else:
+            return WinProbability.cdf((rating - opponent - home_advantage) / stdev)
+
+    @staticmethod
+    def batch(ratings, opponents, home, home_advantage=None, stdev=None):
+        """Return an array of win probabilities for arrays of ratings, opponent ratings and home flags.
+
+        'home' may be booleans or the schedule's 'home' / 'away' strings; ratings may be a single number."""
+        home_advantage = WinProbability.home_advantage if home_advantage is None else home_advantage
+        stdev = WinProbability.stdev if stdev is None else stdev
+        home = np.asarray(home)
+        if home.dtype != bool:
+            home = home == 'home'
+        margin = np.asarray(ratings, dtype=np.float64) - np.asarray(opponents, dtype=np.float64)
+        return WinProbability.cdf((margin + np.where(home, home_advantage, -home_advantage)) / stdev)